@@ -0,0 +1 @@
+"""Offline benchmarks, each module is runnable with `python -m benchmarks.<name>` and prints JSON results."""
@@ -0,0 +1,94 @@
+"""
+Compares computing a series with one calculate call per value, the way the tool was used before it took
+lists, with a single vectorized call, and evaluating the same expression over and over through numexpr's
+per-call path and through the tool's shared compiled-expression cache.
+
+    python -m benchmarks.calculator --sizes 10 100 1000 --repeat 5
+"""
+import argparse
+import json
+import statistics
+import time
+
+import numexpr
+
+from src.agent.tools import calculator
+from src.agent.tools.calculator import calculate, get_calculator_stats
+
+
+def per_call_calculate(expression: str) -> str:
+    """The calculate tool before it took lists and statements, one expression per call."""
+    try:
+        return str(numexpr.evaluate(expression))
+    except Exception as e:
+        return f"Error: Invalid expression - {e}"
+
+
+def time_call(func, repeat: int) -> tuple[float, object]:
+    times, result = [], None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times), result
+
+
+def bench_series(size: int, repeat: int) -> dict:
+    """Compound growth over `size` years: a call per year against a call for all of them."""
+    per_call_ms, per_call = time_call(
+        lambda: [per_call_calculate(f"1000 * (1 + 0.05) ** {year}") for year in range(1, size + 1)], repeat
+    )
+    vectorized_ms, table = time_call(
+        lambda: calculate(f"years = range(1, {size + 1})\nbalance = 1000 * (1 + 0.05) ** years"), repeat
+    )
+    last_row = table.splitlines()[min(size, calculator._config["max_rows"])]
+    return {
+        "values": size,
+        "per_call_ms": round(per_call_ms, 3),
+        "vectorized_ms": round(vectorized_ms, 3),
+        "speedup": round(per_call_ms / vectorized_ms, 2),
+        "tool_calls": size,
+        "tool_calls_saved": size - 1,
+        "per_call_last": per_call[min(size, calculator._config["max_rows"]) - 1],
+        "vectorized_last": last_row.split(" | ")[1],
+    }
+
+
+def bench_repeated(calls: int) -> dict:
+    """The same conversion with a new value per call, e.g. across a conversation's questions."""
+    start = time.perf_counter()
+    for value in range(calls):
+        per_call_calculate(f"{value} * 2.54 + 0.5")
+    per_call_us = (time.perf_counter() - start) / calls * 1e6
+
+    before = get_calculator_stats()
+    start = time.perf_counter()
+    for value in range(calls):
+        calculate(f"x = {value}; x * 2.54 + 0.5")
+    cached_us = (time.perf_counter() - start) / calls * 1e6
+    after = get_calculator_stats()
+    hits, misses = after.get("hits", 0) - before.get("hits", 0), after.get("misses", 0) - before.get("misses", 0)
+    return {
+        "calls": calls,
+        "per_call_us": round(per_call_us, 2),
+        "cached_us": round(cached_us, 2),
+        "cache_hit_rate": round(hits / (hits + misses), 4) if hits + misses else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--calls", type=int, default=2000, help="Calls of the repeated expression benchmark.")
+    args = parser.parse_args()
+    results = {
+        "series": [bench_series(size, args.repeat) for size in args.sizes],
+        "repeated": bench_repeated(args.calls),
+        "cache": get_calculator_stats(),
+    }
+    print(json.dumps({"benchmark": "calculator", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
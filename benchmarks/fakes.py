@@ -0,0 +1,176 @@
+"""
+Local stand-ins for everything the agent reaches over the network: a chat model replaying scripted ReAct
+turns, the web tools and the embedding model. They are deterministic and cheap, so the benchmarks built on
+them measure the agent's own orchestration, parsing and store code.
+"""
+import asyncio
+import hashlib
+import json
+import re
+from typing import Any, AsyncIterator, Iterator
+
+import numpy as np
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from langchain_core.runnables import RunnableLambda
+from pydantic import PrivateAttr
+
+
+def react_script(steps: int, width: int = 1, tool: str = "search_web") -> list[AIMessage]:
+    """
+    The turns of a ReAct run with `steps` tool calling turns of `width` parallel calls each, followed by a
+    turn without tool calls after which the agent writes its final answer.
+    """
+    arg = "url" if tool == "read_web_page" else "query"
+    turns = []
+    for step in range(steps):
+        calls = [
+            {"name": tool, "args": {arg: f"step {step} call {call}"}, "id": f"call-{step}-{call}"}
+            for call in range(width)
+        ]
+        turns.append(AIMessage(
+            content=f"THOUGHT: Step {step} needs {width} more lookups before the question can be answered.",
+            tool_calls=calls
+        ))
+    turns.append(AIMessage(content="THOUGHT: The observations answer the question, writing the final answer."))
+    return turns
+
+
+class ScriptedChatModel(BaseChatModel):
+    """
+    Chat model replaying scripted turns, the turn of a call being the number of model turns since the
+    question, so concurrent runs of the script don't interfere. Content is streamed word by word and tool
+    calls as one chunk, like a provider streams them. `with_structured_output` answers with the scripted answer.
+    """
+
+    answer: str = "The scripted final answer."
+    # Seconds to wait before each streamed chunk, zero measures pure orchestration overhead
+    chunk_delay: float = 0.0
+    _turns: list[AIMessage] = PrivateAttr(default_factory=list)
+
+    @property
+    def _llm_type(self) -> str:
+        return "scripted"
+
+    def load(self, turns: list[AIMessage], answer: str | None = None):
+        """Replays a new script from the next question on."""
+        self._turns = turns
+        if answer is not None:
+            self.answer = answer
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def with_structured_output(self, schema, **kwargs):
+        return RunnableLambda(lambda _: schema(final_answer=self.answer), name="ScriptedStructuredOutput")
+
+    def _next_turn(self, messages: list[BaseMessage]) -> AIMessage:
+        position = 0
+        for message in reversed(messages):
+            if isinstance(message, HumanMessage):
+                break
+            position += isinstance(message, AIMessage)
+        if position >= len(self._turns):
+            raise RuntimeError(f"The script has only {len(self._turns)} turns")
+        return self._turns[position]
+
+    @staticmethod
+    def _usage(messages: list[BaseMessage], turn: AIMessage) -> dict[str, int]:
+        input_tokens = sum(len(str(message.content)) for message in messages) // 4
+        output_tokens = len(str(turn.content)) // 4
+        return {"input_tokens": input_tokens, "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens}
+
+    def _chunks(self, messages: list[BaseMessage]) -> Iterator[ChatGenerationChunk]:
+        turn = self._next_turn(messages)
+        words = str(turn.content).split(" ")
+        for i, word in enumerate(words):
+            yield ChatGenerationChunk(message=AIMessageChunk(content=word if i == 0 else " " + word))
+        yield ChatGenerationChunk(message=AIMessageChunk(
+            content="",
+            tool_call_chunks=[
+                {"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": i}
+                for i, call in enumerate(turn.tool_calls)
+            ],
+            usage_metadata=self._usage(messages, turn)
+        ))
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                  run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        turn = self._next_turn(messages)
+        message = AIMessage(content=turn.content, tool_calls=turn.tool_calls,
+                            usage_metadata=self._usage(messages, turn))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                       run_manager: AsyncCallbackManagerForLLMRun | None = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for chunk in self._chunks(messages):
+            if self.chunk_delay:
+                await asyncio.sleep(self.chunk_delay)
+            if run_manager and chunk.message.content:
+                await run_manager.on_llm_new_token(chunk.message.content, chunk=chunk)
+            yield chunk
+
+
+def observation_text(size: int, seed: str) -> str:
+    """About `size` characters of search-result-like lines, the same for the same seed."""
+    line = f"Result for {seed}: the highest peak is 5165 metres high and the third highest 4168 metres. "
+    return (line * (size // len(line) + 1))[:size]
+
+
+def stub_tools(observation_size: int = 2000, latency: float = 0.0) -> list:
+    """
+    Stand-ins for the web tools with the same names and arguments, answering after `latency` seconds with
+    about `observation_size` characters. The calculator is local already and is kept as it is.
+    """
+    from src.agent.tools import calculate
+
+    async def search_web(query: str) -> dict[str, list[dict[str, str]]]:
+        """Performs a web search using the Tavily search engine."""
+        await asyncio.sleep(latency)
+        return {"results": [{"url": f"https://example.com/{hashlib.md5(query.encode()).hexdigest()}",
+                             "content": observation_text(observation_size, query)}]}
+
+    async def search_wikipedia(query: str) -> str:
+        """Searches Wikipedia for a given query and returns a summary of the top result."""
+        await asyncio.sleep(latency)
+        return observation_text(observation_size, query)
+
+    async def read_web_page(url: str) -> str:
+        """Reads the textual content of a web page from a given URL."""
+        await asyncio.sleep(latency)
+        return observation_text(observation_size, url)
+
+    return [calculate, search_web, search_wikipedia, read_web_page]
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic bag-of-words embeddings: the sum of a hash-seeded random vector per word. Equal texts
+    get equal vectors and texts sharing words similar ones, so nearest neighbours are meaningful, which is
+    all the store, its index and the answer cache need to be exercised.
+    """
+
+    def __init__(self, dims: int = 64):
+        self.dims = dims
+        self._words: dict[str, np.ndarray] = {}
+
+    def _word(self, word: str) -> np.ndarray:
+        if word not in self._words:
+            seed = int.from_bytes(hashlib.blake2b(word.encode(), digest_size=8).digest(), "little")
+            self._words[word] = np.random.default_rng(seed).standard_normal(self.dims, dtype=np.float32)
+        return self._words[word]
+
+    def _embed(self, text: str) -> list[float]:
+        words = re.findall(r"\w+", text.lower()) or [text]
+        return np.sum([self._word(word) for word in words], axis=0).tolist()
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed(text)
@@ -0,0 +1,78 @@
+"""
+Compares the lxml page extraction used by read_web_page with the previous BeautifulSoup/html.parser one
+over the saved HTML fixtures, scaled up to multi-megabyte pages by repeating their body.
+
+    python -m benchmarks.html_extraction --scales 1 50 400
+"""
+import argparse
+import json
+import re
+import statistics
+import time
+from pathlib import Path
+
+from bs4 import BeautifulSoup
+
+from src.agent.tools.html_text import extract_text
+
+FIXTURES = Path(__file__).parent / "fixtures" / "html"
+
+
+def bs4_extract_text(content: bytes) -> str:
+    """The extraction read_web_page used before switching to lxml."""
+    soup = BeautifulSoup(content, 'html.parser')
+    for script_or_style in soup(['script', 'style']):
+        script_or_style.decompose()
+    text = soup.get_text()
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
+
+
+def scale_page(content: bytes, times: int) -> bytes:
+    """Repeats the body of a page, keeping a single document around it."""
+    match = re.search(rb"(<body[^>]*>)(.*)(</body>)", content, re.S | re.I)
+    if match is None or times == 1:
+        return content
+    return content[:match.end(1)] + match.group(2) * times + content[match.start(3):]
+
+
+def time_call(func, content: bytes, repeat: int) -> tuple[float, str]:
+    timings, result = [], ""
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(content)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000, result
+
+
+def run(scales: list[int], repeat: int) -> list[dict]:
+    results = []
+    for fixture in sorted(FIXTURES.glob("*.html")):
+        for scale in scales:
+            content = scale_page(fixture.read_bytes(), scale)
+            baseline_ms, baseline_text = time_call(bs4_extract_text, content, repeat)
+            lxml_ms, lxml_text = time_call(extract_text, content, repeat)
+            results.append({
+                "fixture": fixture.name,
+                "scale": scale,
+                "bytes": len(content),
+                "bs4_ms": round(baseline_ms, 3),
+                "lxml_ms": round(lxml_ms, 3),
+                "speedup": round(baseline_ms / lxml_ms, 2),
+                "bs4_chars": len(baseline_text),
+                "lxml_chars": len(lxml_text),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--scales", type=int, nargs="+", default=[1, 50, 400])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    print(json.dumps({"benchmark": "html_extraction", "results": run(args.scales, args.repeat)}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
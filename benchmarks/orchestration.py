@@ -0,0 +1,188 @@
+"""
+Measures the agent's own overhead with a scripted chat model, local stand-ins for the web tools and fake
+embeddings: building the agent, parsing messages, whole streamed runs over 1 to 50 ReAct steps, wide
+parallel tool calls and large observations, and tiered model routing against a single slow model. No API
+keys or network are needed.
+
+    python -m benchmarks.orchestration --repeat 5 --steps 1 5 10 25 50
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import tempfile
+import time
+import uuid
+from contextlib import aclosing
+from pathlib import Path
+
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from benchmarks.fakes import HashEmbeddings, ScriptedChatModel, react_script, stub_tools
+from src.config import AgentSettings
+
+
+def bench_settings(directory: str, max_steps: int) -> AgentSettings:
+    """Settings keeping every file of the agent in a scratch directory."""
+    root = Path(directory)
+    return AgentSettings(
+        store_path=str(root / "store"),
+        checkpoint_path=str(root / "checkpoints.sqlite"),
+        tool_cache_path=str(root / "tool_cache.sqlite"),
+        embedding_dims=64,
+        recursion_limit=2 * max_steps + 5,
+        question_timeout=None,
+        question_max_steps=None,
+        question_max_tool_calls=None,
+        checkpoint_compaction_interval=3600.0,
+    )
+
+
+def milliseconds(timings: list[float]) -> dict[str, float]:
+    return {
+        "median_ms": round(statistics.median(timings) * 1000, 3),
+        "min_ms": round(min(timings) * 1000, 3),
+        "max_ms": round(max(timings) * 1000, 3),
+    }
+
+
+def bench_init_agent(directory: str, repeat: int) -> dict:
+    from src.agent.agent import init_agent
+
+    timings = []
+    for i in range(repeat):
+        settings = bench_settings(f"{directory}/init-{i}", 1)
+        start = time.perf_counter()
+        agent = init_agent(settings, model=ScriptedChatModel(), tools=stub_tools(), embeddings=HashEmbeddings(64))
+        timings.append(time.perf_counter() - start)
+        agent.checkpointer.close()
+    return {"scenario": "init_agent", **milliseconds(timings)}
+
+
+def bench_parse_message(repeat: int, messages: int = 10_000) -> dict:
+    from src.stream.parser import parse_message
+
+    turns = react_script(steps=messages // 2, width=2)
+    observations = [ToolMessage(content="x" * 2000, tool_call_id=f"call-{i}") for i in range(messages // 2)]
+    batch = [HumanMessage("question")] + [m for pair in zip(turns, observations) for m in pair]
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for message in batch:
+            parse_message(message)
+        timings.append(time.perf_counter() - start)
+    return {"scenario": "parse_message", "messages": len(batch),
+            "per_message_us": round(statistics.median(timings) / len(batch) * 1e6, 3)}
+
+
+async def _streamed_run(stream, model: ScriptedChatModel, turns: list[AIMessage]) -> tuple[float, int]:
+    """Runs one question in a new thread, returns its latency and the number of messages streamed."""
+    from src.stream.parser import MessageType, StreamMetrics
+
+    model.load(turns)
+    count = 0
+    start = time.perf_counter()
+    question = f"Benchmark question {uuid.uuid4()}"
+    async with aclosing(stream(question, thread_id=f"bench-{uuid.uuid4()}", metrics=StreamMetrics())) as messages:
+        async for message in messages:
+            count += 1
+            if message.message_type == MessageType.FINAL_ANSWER and not message.delta:
+                break
+    return time.perf_counter() - start, count
+
+
+async def _bench_runs(directory: str, name: str, scenarios: list[dict], repeat: int,
+                      observation_size: int = 2000) -> list[dict]:
+    from src.agent.agent import init_agent
+    from src.stream.parser import console_agent_stream_wrapper
+
+    max_steps = max(scenario["steps"] for scenario in scenarios)
+    model = ScriptedChatModel()
+    agent = init_agent(
+        bench_settings(f"{directory}/{name}-{observation_size}", max_steps), model=model,
+        tools=stub_tools(observation_size=observation_size), embeddings=HashEmbeddings(64)
+    )
+    stream = console_agent_stream_wrapper(agent)
+    await _streamed_run(stream, model, react_script(1))  # warm up
+
+    results = []
+    for scenario in scenarios:
+        turns = react_script(scenario["steps"], scenario.get("width", 1))
+        timings, count = [], 0
+        for _ in range(repeat):
+            elapsed, count = await _streamed_run(stream, model, turns)
+            timings.append(elapsed)
+        results.append({
+            "scenario": name, **scenario, "observation_chars": observation_size, **milliseconds(timings),
+            "per_step_ms": round(statistics.median(timings) * 1000 / scenario["steps"], 3),
+            "streamed_messages": count,
+        })
+    agent.checkpointer.close()
+    return results
+
+
+async def bench_tiered_routing(directory: str, steps: int, repeat: int,
+                               strong_delay: float = 0.004, fast_delay: float = 0.001) -> list[dict]:
+    """
+    The same run on a slow model alone and routed between it and a faster one, the slow model planning and
+    the fast one taking the tool-selection turns. The delays are per streamed chunk.
+    """
+    from src.agent.agent import init_agent
+    from src.stream.parser import console_agent_stream_wrapper
+
+    turns = react_script(steps)
+    results = []
+    for routed in (False, True):
+        strong = ScriptedChatModel(chunk_delay=strong_delay)
+        fast = ScriptedChatModel(chunk_delay=fast_delay) if routed else None
+        settings = bench_settings(f"{directory}/tiered-{routed}", steps)
+        settings.escalate_after_steps = steps + 1
+        agent = init_agent(settings, model=strong, fast_model=fast, tools=stub_tools(),
+                           embeddings=HashEmbeddings(64))
+        stream = console_agent_stream_wrapper(agent)
+        timings = []
+        for _ in range(repeat):
+            if routed:
+                fast.load(turns)
+            elapsed, _ = await _streamed_run(stream, strong, turns)
+            timings.append(elapsed)
+        entry = {"scenario": "tiered_routing", "routed": routed, "steps": steps, **milliseconds(timings)}
+        if routed:
+            entry["tiers"] = {tier: {"calls": usage.calls, "time_ms": round(usage.time * 1000, 3)}
+                              for tier, usage in (("fast", agent.model_router.stats.fast),
+                                                  ("strong", agent.model_router.stats.strong))}
+        results.append(entry)
+        agent.checkpointer.close()
+    return results
+
+
+def run(steps: list[int], widths: list[int], observation_sizes: list[int], repeat: int) -> list[dict]:
+    with tempfile.TemporaryDirectory() as directory:
+        results = [bench_init_agent(directory, repeat), bench_parse_message(repeat)]
+        results += asyncio.run(_bench_runs(directory, "react_steps", [{"steps": n} for n in steps], repeat))
+        results += asyncio.run(_bench_runs(
+            directory, "parallel_tool_calls", [{"steps": 1, "width": width} for width in widths], repeat
+        ))
+        for size in observation_sizes:
+            results += asyncio.run(_bench_runs(
+                directory, "large_observations", [{"steps": 3}], repeat, observation_size=size
+            ))
+        results += asyncio.run(bench_tiered_routing(directory, 5, repeat))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--steps", type=int, nargs="+", default=[1, 5, 10, 25, 50])
+    parser.add_argument("--widths", type=int, nargs="+", default=[1, 8, 32, 64],
+                        help="Parallel tool calls of the single step of the parallel scenarios.")
+    parser.add_argument("--observation-sizes", type=int, nargs="+", default=[2_000, 100_000, 1_000_000],
+                        help="Characters of every observation of the large observation scenarios.")
+    args = parser.parse_args()
+    results = run(args.steps, args.widths, args.observation_sizes, args.repeat)
+    print(json.dumps({"benchmark": "orchestration", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Load-tests the multi-session server on a scripted chat model, stub web tools and fake embeddings: at each
+concurrency level, every client asks a series of questions over HTTP in its own session, and the run reports
+throughput, end-to-end and first event latency percentiles, and the questions turned away.
+
+    python -m benchmarks.server_load --clients 1 8 32 128 --questions 5 --steps 3
+"""
+import argparse
+import asyncio
+import json
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+from benchmarks.fakes import HashEmbeddings, ScriptedChatModel, react_script, stub_tools
+from benchmarks.orchestration import bench_settings
+from benchmarks.store import percentiles
+
+
+async def _client(session, url: str, client: int, questions: int, latencies: list, first_events: list,
+                  statuses: Counter):
+    for _ in range(questions):
+        start = time.perf_counter()
+        payload = {"question": f"Load test question {uuid.uuid4()}"}
+        # Every client comes from the same address, a token of its own makes it a session of its own
+        headers = {"Authorization": f"Bearer client-{client}"}
+        async with session.post(url, json=payload, headers=headers) as response:
+            statuses[response.status] += 1
+            if response.status != 200:
+                await response.read()
+                continue
+            first = None
+            async for line in response.content:
+                if first is None:
+                    first = time.perf_counter() - start
+                if json.loads(line)["type"] == "ERROR":
+                    statuses["error"] += 1
+        latencies.append(time.perf_counter() - start)
+        first_events.append(first)
+
+
+async def bench_clients(agent, clients: int, questions: int, max_active_runs: int, max_queued_runs: int) -> dict:
+    import aiohttp
+    from aiohttp import web
+
+    from src.server import AgentServer
+
+    server = AgentServer(agent, max_active_runs=max_active_runs, max_queued_runs=max_queued_runs,
+                         session_rate=1e6, session_burst=questions,
+                         api_tokens=[f"client-{client}" for client in range(clients)])
+    runner = web.AppRunner(server.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    url = f"http://127.0.0.1:{runner.addresses[0][1]}/chat"
+
+    latencies, first_events, statuses = [], [], Counter()
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0)) as session:
+        await asyncio.gather(*(
+            _client(session, url, client, questions, latencies, first_events, statuses)
+            for client in range(clients)
+        ))
+    elapsed = time.perf_counter() - start
+    await runner.cleanup()
+    return {
+        "clients": clients, "questions": clients * questions, "answered": len(latencies),
+        "throughput_qps": round(len(latencies) / elapsed, 2),
+        "latency": percentiles(latencies) if latencies else None,
+        "first_event": percentiles(first_events) if first_events else None,
+        "statuses": {str(status): count for status, count in statuses.items()},
+    }
+
+
+async def run(clients: list[int], questions: int, steps: int, chunk_delay: float, tool_latency: float,
+              max_active_runs: int, max_queued_runs: int) -> list[dict]:
+    from src.agent.agent import init_agent
+
+    with tempfile.TemporaryDirectory() as directory:
+        settings = bench_settings(directory, steps)
+        settings.answer_cache_enabled = False
+        model = ScriptedChatModel(chunk_delay=chunk_delay)
+        model.load(react_script(steps))
+        agent = init_agent(settings, model=model, tools=stub_tools(latency=tool_latency),
+                           embeddings=HashEmbeddings(64))
+        results = [
+            await bench_clients(agent, level, questions, max_active_runs, max_queued_runs) for level in clients
+        ]
+        agent.checkpointer.close()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--clients", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--questions", type=int, default=5, help="Questions each client asks in turn.")
+    parser.add_argument("--steps", type=int, default=3, help="ReAct steps of every question.")
+    parser.add_argument("--chunk-delay", type=float, default=0.002,
+                        help="Seconds the fake model takes per streamed chunk.")
+    parser.add_argument("--tool-latency", type=float, default=0.05, help="Seconds every stub web tool takes.")
+    parser.add_argument("--max-active-runs", type=int, default=16)
+    parser.add_argument("--max-queued-runs", type=int, default=64)
+    args = parser.parse_args()
+    results = asyncio.run(run(args.clients, args.questions, args.steps, args.chunk_delay, args.tool_latency,
+                              args.max_active_runs, args.max_queued_runs))
+    print(json.dumps({"benchmark": "server_load", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
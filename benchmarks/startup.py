@@ -0,0 +1,95 @@
+"""
+Measures how fast the CLI starts: the import time of main.py, the time until the main menu is drawn and,
+for reference, the import time of the agent the menu no longer waits for. Fails when the median import
+time or time to menu is over its threshold.
+
+    python -m benchmarks.startup --repeat 5 --max-time-to-menu 1.5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = """
+import time
+start = time.perf_counter()
+import {module}
+print(time.perf_counter() - start)
+"""
+
+
+def _env() -> dict[str, str]:
+    return {**os.environ, "PYTHONPATH": str(ROOT), "PYTHONUNBUFFERED": "1", "TERM": "dumb",
+            "PYTHONWARNINGS": "ignore"}
+
+
+def import_time(module: str, cwd: str) -> float:
+    """Import time of a module in a fresh interpreter, so nothing is already imported."""
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET.format(module=module)],
+        cwd=cwd, env=_env(), capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def time_to_menu(cwd: str, timeout: float = 60.0) -> float:
+    """Time from launching `python main.py` until the main menu is printed, interpreter startup included."""
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, str(ROOT / "main.py")],
+        cwd=cwd, env=_env(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        output = b""
+        while b"Main Menu" not in output:
+            chunk = process.stdout.read1(4096)
+            if not chunk or time.perf_counter() - start > timeout:
+                raise RuntimeError(f"The main menu was not shown, output: {output.decode(errors='replace')}")
+            output += chunk
+        elapsed = time.perf_counter() - start
+        process.communicate(b"3\n", timeout=timeout)  # 3 exits the CLI
+        return elapsed
+    finally:
+        if process.poll() is None:
+            process.kill()
+
+
+def run(repeat: int) -> dict:
+    # A scratch working directory, so the agent built in the background doesn't touch the real data
+    with tempfile.TemporaryDirectory() as cwd:
+        measurements = {
+            "import_main_s": [import_time("main", cwd) for _ in range(repeat)],
+            "time_to_menu_s": [time_to_menu(cwd) for _ in range(repeat)],
+            "import_agent_s": [import_time("src.agent.agent", cwd) for _ in range(repeat)],
+        }
+    return {name: round(statistics.median(values), 4) for name, values in measurements.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-import-time", type=float, default=1.0,
+                        help="Threshold of the median import time of main.py in seconds.")
+    parser.add_argument("--max-time-to-menu", type=float, default=1.5,
+                        help="Threshold of the median time to menu in seconds.")
+    args = parser.parse_args()
+
+    results = run(args.repeat)
+    regressions = []
+    if results["import_main_s"] > args.max_import_time:
+        regressions.append(f"import_main_s {results['import_main_s']} > {args.max_import_time}")
+    if results["time_to_menu_s"] > args.max_time_to_menu:
+        regressions.append(f"time_to_menu_s {results['time_to_menu_s']} > {args.max_time_to_menu}")
+    print(json.dumps({"benchmark": "startup", "results": results, "regressions": regressions}, indent=2))
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Measures the SQLite vector store behind the agent's memory at 10k, 100k and 1M items with fake embeddings:
+bulk loading, reopening, exact gets, keyword lookups in the full text index, and semantic search over one
+namespace and over all of them, both exact and through the IVF index at several `nprobe` values with its
+recall against exact search.
+
+    python -m benchmarks.store --sizes 10000 100000 1000000 --queries 100 --nprobe 8 32 128
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+
+from langgraph.store.base import IndexConfig, PutOp
+
+from benchmarks.fakes import HashEmbeddings
+from src.agent.store import SQLiteVectorStore
+from src.agent.vector_index import IVFIndex, VectorIndex
+
+LOAD_BATCH = 10_000
+TOPICS = 1000
+TOPIC_WORDS = 50
+LIMIT = 5
+
+
+def _words(i: int) -> list[str]:
+    """A topic and three of its words, memories cluster by subject like real embeddings do."""
+    rng = random.Random(i)
+    topic = rng.randrange(TOPICS)
+    return [f"topic{topic}"] + [f"t{topic}w{rng.randrange(TOPIC_WORDS)}" for _ in range(3)]
+
+
+def _item(i: int, namespaces: int) -> tuple[tuple[str, ...], str, dict]:
+    return ("bench", f"ns{i % namespaces}"), f"item-{i}", {"fact": " ".join(_words(i))}
+
+
+def _query(i: int) -> str:
+    """The topic and two words of an item and an unrelated word, so its neighbourhood is worth searching."""
+    return " ".join(_words(i)[:3] + [f"other{random.Random(-i).randrange(TOPICS)}"])
+
+
+def open_store(path: str, dims: int, vector_index: VectorIndex | None = None) -> SQLiteVectorStore:
+    return SQLiteVectorStore(
+        path, index=IndexConfig(embed=HashEmbeddings(dims), dims=dims, fields=["$"]), vector_index=vector_index
+    )
+
+
+def percentiles(timings: list[float]) -> dict[str, float]:
+    ordered = sorted(timings)
+    return {f"p{p}_ms": round(ordered[round(p / 100 * (len(ordered) - 1))] * 1000, 3) for p in (50, 99)}
+
+
+def time_searches(store: SQLiteVectorStore, searches: list[tuple[tuple[str, ...], str]]):
+    timings, found = [], []
+    for namespace, query in searches:
+        start = time.perf_counter()
+        results = store.search(namespace, query=query, limit=LIMIT)
+        timings.append(time.perf_counter() - start)
+        found.append({(item.namespace, item.key) for item in results})
+    return percentiles(timings), found
+
+
+def recall(found: list[set], expected: list[set]) -> float:
+    return round(sum(len(f & e) for f, e in zip(found, expected)) / max(sum(len(e) for e in expected), 1), 4)
+
+
+def bench_size(directory: str, size: int, dims: int, namespaces: int, queries: int, nprobes: list[int]) -> dict:
+    store = open_store(directory, dims)
+    start = time.perf_counter()
+    for offset in range(0, size, LOAD_BATCH):
+        store.batch([PutOp(*_item(i, namespaces)) for i in range(offset, min(offset + LOAD_BATCH, size))])
+    load_s = time.perf_counter() - start
+    store.close()
+
+    probes = random.Random(size).sample(range(size), min(queries, size))
+    scopes = {
+        "search_namespace": [(_item(i, namespaces)[0], _query(i)) for i in probes],
+        "search_all": [(("bench",), _query(i)) for i in probes],
+    }
+
+    start = time.perf_counter()
+    store = open_store(directory, dims)
+    results = {"items": size, "dims": dims, "namespaces": namespaces, "load_s": round(load_s, 3),
+               "load_items_per_s": round(size / load_s), "reopen_ms": round((time.perf_counter() - start) * 1000, 3)}
+    get_timings = []
+    for i in probes:
+        namespace, key, _ = _item(i, namespaces)
+        start = time.perf_counter()
+        store.get(namespace, key)
+        get_timings.append(time.perf_counter() - start)
+    results["get"] = percentiles(get_timings)
+
+    lexical_timings = []
+    for i in probes:
+        start = time.perf_counter()
+        store.lexical_search(("bench",), " ".join(_words(i)), LIMIT, match_all=True)
+        lexical_timings.append(time.perf_counter() - start)
+    results["lexical_all_words"] = percentiles(lexical_timings)
+
+    expected = {}
+    results["exact"] = {}
+    for scope, searches in scopes.items():
+        results["exact"][scope], expected[scope] = time_searches(store, searches)
+    store.close()
+
+    results["ivf"] = []
+    for nprobe in nprobes:
+        store = open_store(directory, dims, IVFIndex(nprobe=nprobe))
+        # The first search of each namespace starts clustering it in the background
+        start = time.perf_counter()
+        store.search(("bench",), query=_query(0), limit=LIMIT)
+        store.vector_index.wait_for_builds()
+        entry = {"nprobe": nprobe, "build_ms": round((time.perf_counter() - start) * 1000, 3)}
+        for scope, searches in scopes.items():
+            latency, found = time_searches(store, searches)
+            entry[scope] = {**latency, f"recall_at_{LIMIT}": recall(found, expected[scope])}
+        results["ivf"].append(entry)
+        store.close()
+    return results
+
+
+def run(sizes: list[int], dims: int, namespaces: int, queries: int, nprobes: list[int]) -> list[dict]:
+    results = []
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            results.append(bench_size(directory, size, dims, namespaces, queries, nprobes))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--dims", type=int, default=64)
+    parser.add_argument("--namespaces", type=int, default=2, help="Namespaces the items are spread over.")
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[8, 32, 128],
+                        help="Clusters the IVF index scores per query, one run per value.")
+    args = parser.parse_args()
+    results = run(args.sizes, args.dims, args.namespaces, args.queries, args.nprobe)
+    print(json.dumps({"benchmark": "store", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
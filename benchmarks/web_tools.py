@@ -0,0 +1,176 @@
+"""
+Compares the async web tools on the shared keep-alive HTTP pool with blocking calls opening a new connection
+each, the way the tools worked before, against a local stand-in for the web pages, the Tavily API and the
+MediaWiki API: the latency of calls made one after another, and the throughput of many concurrent calls,
+the blocking ones running in worker threads as LangGraph runs sync tools.
+
+    python -m benchmarks.web_tools --calls 200 --concurrency 1 16 64 --latency 0.02
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import requests
+
+from benchmarks.fakes import observation_text
+from src.agent.tools import read_web_page, search_web, search_wikipedia, wikipedia
+from src.agent.tools.html_text import extract_text
+from src.agent.tools.http_pool import close_http_pool, configure_http_pool
+from src.agent.tools.web_reader import configure_web_reader
+from src.agent.tools.web_search import configure_web_search
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Answers like a web page, the Tavily search API and the MediaWiki API, after the configured latency."""
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, with Nagle on a kept-alive connection waits for a delayed ACK
+    disable_nagle_algorithm = True
+    latency = 0.0
+
+    def _send(self, body: bytes, content_type: str):
+        time.sleep(self.latency)
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        if url.path == "/w/api.php":
+            params = {name: values[0] for name, values in parse_qs(url.query, keep_blank_values=True).items()}
+            if params.get("list") == "search":
+                data = {"query": {"search": [{"title": params["srsearch"]}]}}
+            else:
+                data = {"query": {"pages": {"1": {"title": params["titles"],
+                                                  "extract": observation_text(1000, params["titles"])}}}}
+            self._send(json.dumps(data).encode(), "application/json")
+        else:
+            text = observation_text(20_000, url.path)
+            self._send(f"<html><body><p>{text}</p></body></html>".encode(), "text/html")
+
+    def do_POST(self):
+        query = json.loads(self.rfile.read(int(self.headers["Content-Length"])))["query"]
+        data = {"results": [{"title": query, "url": f"http://stand-in/{i}", "content": observation_text(300, query)}
+                            for i in range(5)]}
+        self._send(json.dumps(data).encode(), "application/json")
+
+    def log_message(self, *args):
+        pass
+
+
+def blocking_read_web_page(base: str, item: str) -> str:
+    response = requests.get(f"{base}/page/{item}", timeout=10)
+    response.raise_for_status()
+    return extract_text(response.content, response.encoding)
+
+
+def blocking_search_web(base: str, item: str) -> dict:
+    response = requests.post(f"{base}/search", json={"query": item}, timeout=10)
+    return response.json()
+
+
+def blocking_search_wikipedia(base: str, item: str) -> str:
+    api = f"{base}/w/api.php"
+    search = requests.get(api, params={"format": "json", "action": "query", "list": "search", "srsearch": item},
+                          timeout=10).json()
+    title = search["query"]["search"][0]["title"]
+    pages = requests.get(api, params={"format": "json", "action": "query", "prop": "extracts", "titles": title},
+                         timeout=10).json()
+    return next(iter(pages["query"]["pages"].values()))["extract"]
+
+
+def _tools(base: str) -> dict:
+    async def async_read_web_page(item: str) -> str:
+        return await read_web_page(f"{base}/page/{item}")
+
+    return {
+        "read_web_page": (blocking_read_web_page, async_read_web_page),
+        "search_web": (blocking_search_web, search_web),
+        "search_wikipedia": (blocking_search_wikipedia, search_wikipedia),
+    }
+
+
+async def _sequential(call, calls: int) -> float:
+    """Median milliseconds of a call, the calls made one after another."""
+    times = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        await call()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+async def _concurrent(call, calls: int, concurrency: int) -> float:
+    """Calls per second with `concurrency` calls in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def limited():
+        async with semaphore:
+            await call()
+    start = time.perf_counter()
+    await asyncio.gather(*(limited() for _ in range(calls)))
+    return calls / (time.perf_counter() - start)
+
+
+async def bench_tool(name: str, blocking, pooled, base: str, calls: int, levels: list[int]) -> dict:
+    counter = iter(range(10 ** 9))
+
+    # Every call asks for something new, so the tool cache never answers
+    async def blocking_call():
+        return await asyncio.to_thread(blocking, base, f"{name}-blocking-{next(counter)}")
+
+    async def pooled_call():
+        return await pooled(f"{name}-pooled-{next(counter)}")
+
+    await pooled_call()  # opens the pool
+    blocking_ms, pooled_ms = await _sequential(blocking_call, calls), await _sequential(pooled_call, calls)
+    throughput = []
+    for level in levels:
+        blocking_qps = await _concurrent(blocking_call, calls, level)
+        pooled_qps = await _concurrent(pooled_call, calls, level)
+        throughput.append({"concurrency": level, "blocking_qps": round(blocking_qps, 1),
+                           "pooled_qps": round(pooled_qps, 1), "speedup": round(pooled_qps / blocking_qps, 2)})
+    return {"tool": name, "blocking_ms": round(blocking_ms, 3), "pooled_ms": round(pooled_ms, 3),
+            "throughput": throughput}
+
+
+async def run(calls: int, levels: list[int], latency: float) -> list[dict]:
+    StandInHandler.latency = latency
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandInHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    os.environ.setdefault("TAVILY_API_KEY", "stand-in")
+    configure_web_search(api_url=base)
+    configure_web_reader(prefetch_top_k=0)
+    wikipedia.WIKIPEDIA_API_URL = f"{base}/w/api.php"
+    # The stand-in is a single host, let every concurrent call have a connection
+    configure_http_pool(max_connections_per_host=max(levels), max_keepalive_connections=max(levels))
+    try:
+        return [await bench_tool(name, blocking, pooled, base, calls, levels)
+                for name, (blocking, pooled) in _tools(base).items()]
+    finally:
+        await close_http_pool()
+        server.shutdown()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200, help="Calls per tool and measurement.")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--latency", type=float, default=0.02, help="Seconds the stand-in server takes per request.")
+    args = parser.parse_args()
+    results = asyncio.run(run(args.calls, args.concurrency, args.latency))
+    print(json.dumps({"benchmark": "web_tools", "results": results}, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,76 @@
+import argparse
 import asyncio
+import json
 import uuid
 
 from src.config import agent_settings
 from src.cli.console import ConsoleApp
-from src.agent import init_agent
+from src.agent import LazyAgent
 from src.stream import console_agent_stream_wrapper
 
 
-agent = init_agent(agent_settings)
-stream_wrapper = console_agent_stream_wrapper(agent=agent)
-console_app = ConsoleApp(stream=stream_wrapper)
-
-if __name__ == "__main__":
-    # init some data to the agent store
+def seed_memories(agent):
+    """Puts some data into the agent store, seed keys are stable so only the missing ones are put."""
     for to_put in [
-        (("1", "memories"), str(uuid.uuid4()), {"movie_preference": "Pulp Fiction is good one"}),
-        (("1", "memories"), str(uuid.uuid4()), {"movie_preference": "2001: A Space Odyssey is very epic"}),
-        (("1", "memories"), str(uuid.uuid4()), {"movie_preference": "Jackie Chan has funny roles"}),
-        (("1", "memories"), str(uuid.uuid4()), {"movie_preference": "Iranian movies are non ordinary"})
+        (("1", "memories"), {"movie_preference": "Pulp Fiction is good one"}),
+        (("1", "memories"), {"movie_preference": "2001: A Space Odyssey is very epic"}),
+        (("1", "memories"), {"movie_preference": "Jackie Chan has funny roles"}),
+        (("1", "memories"), {"movie_preference": "Iranian movies are non ordinary"})
     ]:
-        agent.store.put(namespace=to_put[0], key=to_put[1], value=to_put[2])
+        key = str(uuid.uuid5(uuid.NAMESPACE_OID, str(to_put[1])))
+        if agent.store.get(namespace=to_put[0], key=key) is None:
+            agent.store.put(namespace=to_put[0], key=key, value=to_put[1])
+
+
+# The agent is built in the background, the menu doesn't wait for it
+agent = LazyAgent(agent_settings, setup=seed_memories)
+stream_wrapper = console_agent_stream_wrapper(agent=agent, trace_path=agent_settings.trace_path)
+console_app = ConsoleApp(stream=stream_wrapper, history=lambda: agent.checkpointer)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="ReAct AI agent CLI.")
+    subparsers = parser.add_subparsers(dest="command")
+    batch = subparsers.add_parser(
+        "batch", help="Answer the questions of a JSONL file without the interactive console."
+    )
+    batch.add_argument("input", help="JSONL file with one question per line.")
+    batch.add_argument("-o", "--output", required=True,
+                       help="JSONL file results are appended to, a rerun skips questions answered in it.")
+    batch.add_argument("--id-field", default="id", help="Field identifying a question (default: id).")
+    batch.add_argument("--question-field", default="question", help="Field holding the question (default: question).")
+    batch.add_argument("--concurrency", type=int, default=agent_settings.batch_concurrency)
+    batch.add_argument("--max-retries", type=int, default=agent_settings.batch_max_retries)
+    batch.add_argument("--retry-backoff", type=float, default=agent_settings.batch_retry_backoff)
+    batch.add_argument("--keep-threads", action="store_true",
+                       help="Keep the questions' threads in the chat history.")
+    return parser.parse_args()
 
+
+def run_batch(args):
+    from src.cli.batch import BatchRunner
+
+    runner = BatchRunner(
+        agent.get(), concurrency=args.concurrency, max_retries=args.max_retries, retry_backoff=args.retry_backoff,
+        keep_threads=args.keep_threads
+    )
+    summary = asyncio.run(runner.run(args.input, args.output, args.id_field, args.question_field))
+    print(json.dumps(summary, indent=2))
+
+
+if __name__ == "__main__":
+    args = parse_args()
     try:
-        asyncio.run(console_app.run())
-    except KeyboardInterrupt:
-        print("\n[bold red]Application interrupted by user. Exiting...[/bold red]")
+        if args.command == "batch":
+            run_batch(args)
+            raise SystemExit
+
+        agent.start()
+        try:
+            asyncio.run(console_app.run())
+        except KeyboardInterrupt:
+            print("\n[bold red]Application interrupted by user. Exiting...[/bold red]")
+    finally:
+        # Parser processes started by large pages, imported here to keep the tools out of the startup path
+        from src.agent.tools.web_reader import close_parse_pool
+        close_parse_pool()
@@ -0,0 +1,31 @@
+import argparse
+
+from src.config import agent_settings
+from src.agent import LazyAgent
+from src.server import AgentServer
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Serves the ReAct agent to many concurrent chat sessions.")
+    parser.add_argument("--host", default=agent_settings.server_host)
+    parser.add_argument("--port", type=int, default=agent_settings.server_port)
+    parser.add_argument("--max-active-runs", type=int, default=agent_settings.server_max_active_runs,
+                        help="Questions answered at once, more wait for a slot.")
+    parser.add_argument("--max-queued-runs", type=int, default=agent_settings.server_max_queued_runs,
+                        help="Questions waiting for a slot, more are turned away with a 503.")
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    from aiohttp import web
+
+    args = parse_args()
+    agent = LazyAgent(agent_settings)
+    agent.start()
+    server = AgentServer(
+        agent, max_active_runs=args.max_active_runs, max_queued_runs=args.max_queued_runs,
+        queue_timeout=agent_settings.server_queue_timeout, session_rate=agent_settings.server_session_rate,
+        session_burst=agent_settings.server_session_burst, api_tokens=agent_settings.server_api_tokens,
+        trace_path=agent_settings.trace_path
+    )
+    web.run_app(server.app(), host=args.host, port=args.port)
@@ -1 +1,10 @@
-from src.agent.agent import init_agent  # noqa
+from src.agent.lazy import LazyAgent  # noqa
+
+
+def __getattr__(name):
+    # Importing the agent pulls in LangGraph, LangChain and the model clients, which takes seconds,
+    # so it only happens once `init_agent` is actually used
+    if name == "init_agent":
+        from src.agent.agent import init_agent
+        return init_agent
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,16 +1,32 @@
 from typing import List, Tuple
 
-from langgraph.checkpoint.memory import InMemorySaver
 from langgraph.prebuilt import create_react_agent
 from langgraph.store.base import BaseStore
 from langchain.chat_models import init_chat_model
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
 from langchain_core.tools import BaseTool
 from langchain_core.messages import SystemMessage
 from pydantic import BaseModel
 
+from src.agent.answer_cache import AnswerCache
+from src.agent.budget import BudgetedModel, RunBudget
+from src.agent.checkpointer import SQLiteDeltaSaver, init_checkpointer
+from src.agent.model_router import TieredChatModel
+from src.agent.observations import ObservationBudget
 from src.agent.prompt import SYSTEM_PROMPT
 from src.agent.store import get_store_with_embeddings
+from src.agent.store_maintenance import StoreMaintenance
+from src.agent.tool_node import ConcurrentToolNode
+from src.agent.vector_index import IVFIndex
 from src.agent.tools import tools as default_tools
+from src.agent.tools.cache import configure_tool_cache
+from src.agent.tools.calculator import configure_calculator
+from src.agent.tools.http_pool import configure_http_pool
+from src.agent.tools.concurrency import configure_tool_concurrency
+from src.agent.tools.multi import MULTI_TOOLS, configure_multi_tools, multi_call_timeout
+from src.agent.tools.web_reader import configure_web_reader
+from src.agent.tools.web_search import configure_web_search
 from src.agent.tools.store_wrapper import StoreInteractionToolWrapper
 from src.config import AgentSettings
 
@@ -19,36 +35,123 @@ class ResponseFormat(BaseModel):
     final_answer: str
 
 
-def _initialize_model(settings: AgentSettings):
-    """Initializes the chat model based on the provided settings."""
+def _initialize_model(settings: AgentSettings, model_name: str | None = None):
+    """Initializes the chat model based on the provided settings, `intelligence_model` unless another is named."""
     return init_chat_model(
-        model=settings.intelligence_model,
+        model=model_name or settings.intelligence_model,
         model_provider=settings.provider,
         temperature=settings.temperature
     )
 
 
-def _initialize_tools(settings: AgentSettings) -> Tuple[List[BaseTool], BaseStore]:
-    """Initializes and returns the list of tools for the agent and the data store."""
-    store = get_store_with_embeddings(settings.embedding_model)
-    store_tools = StoreInteractionToolWrapper(store=store).get_tools()
-    return default_tools + store_tools, store
+def _initialize_tools(
+    settings: AgentSettings, tools: list | None = None, embeddings: Embeddings | None = None
+) -> Tuple[List[BaseTool], BaseStore, StoreMaintenance]:
+    """Initializes and returns the list of tools for the agent, the data store and its maintenance."""
+    configure_http_pool(
+        max_connections=settings.http_max_connections,
+        max_connections_per_host=settings.http_max_connections_per_host,
+        timeout=settings.http_timeout
+    )
+    configure_web_reader(
+        max_bytes=settings.web_page_max_bytes, parse_workers=settings.web_page_parse_workers,
+        prefetch_top_k=settings.prefetch_top_k, prefetch_concurrency=settings.prefetch_concurrency,
+        prefetch_ttl=settings.prefetch_ttl, prefetch_max_bytes=settings.prefetch_max_bytes
+    )
+    configure_web_search(api_url=settings.tavily_api_url)
+    configure_multi_tools(
+        max_items=settings.multi_tool_max_items, concurrency=settings.multi_tool_concurrency,
+        item_timeout=settings.multi_tool_item_timeout
+    )
+    configure_calculator(
+        cache_size=settings.calculator_cache_size, max_rows=settings.calculator_max_rows,
+        max_values=settings.calculator_max_values
+    )
+    configure_tool_concurrency(
+        concurrency=settings.tool_concurrency, default_concurrency=settings.tool_default_concurrency
+    )
+    configure_tool_cache(path=settings.tool_cache_path, ttls=settings.tool_cache_ttls)
+    store = get_store_with_embeddings(
+        settings.embedding_model, settings.store_path, settings.embedding_dims,
+        cache_size=settings.embedding_cache_size, embeddings=embeddings,
+        vector_index=IVFIndex(
+            nprobe=settings.store_index_nprobe, min_size=settings.store_index_min_size
+        ) if settings.store_vector_index == "ivf" else None
+    )
+    maintenance = StoreMaintenance(store, settings.store_policies)
+    maintenance.start(settings.store_maintenance_interval)
+    store_tools = StoreInteractionToolWrapper(store=store, maintenance=maintenance).get_tools()
+    return (default_tools if tools is None else tools) + store_tools, store, maintenance
 
 
-def init_agent(settings: AgentSettings):
-    """Initializes and configures the ReAct agent."""
-    model = _initialize_model(settings)
-    all_tools, store = _initialize_tools(settings)
-    memory = InMemorySaver()
+def init_agent(
+    settings: AgentSettings,
+    checkpointer: SQLiteDeltaSaver | None = None,
+    model: BaseChatModel | None = None,
+    tools: list | None = None,
+    embeddings: Embeddings | None = None,
+    fast_model: BaseChatModel | None = None,
+):
+    """
+    Initializes and configures the ReAct agent.
 
+    `model`, `fast_model`, `tools` and `embeddings` replace the chat models, the web and calculator tools and
+    the embedding model of the settings, e.g. with local fakes for the offline benchmarks. A given `model`
+    runs every turn unless a `fast_model` is given too.
+    """
+    if model is None:
+        model = _initialize_model(settings)
+        if fast_model is None and settings.fast_model:
+            fast_model = _initialize_model(settings, settings.fast_model)
+    if fast_model is not None:
+        model = TieredChatModel(
+            fast=fast_model, strong=model, escalate_after_steps=settings.escalate_after_steps,
+            escalate_on_tool_error=settings.escalate_on_tool_error
+        )
+    all_tools, store, store_maintenance = _initialize_tools(settings, tools, embeddings)
+    observation_budget = ObservationBudget(
+        max_tokens=settings.observation_max_tokens,
+        thread_max_tokens=settings.thread_observation_max_tokens,
+        chunk_tokens=settings.observation_chunk_tokens
+    )
+    tool_node = ConcurrentToolNode(
+        all_tools + observation_budget.get_tools(),
+        # A multi tool call may take as long as its batches of items, a shorter timeout would lose them all
+        timeouts={**dict.fromkeys(MULTI_TOOLS, multi_call_timeout() + 5.0), **settings.tool_timeouts},
+        default_timeout=settings.tool_default_timeout,
+        observation_budget=observation_budget
+    )
+    memory = checkpointer or init_checkpointer(settings)
+    run_budget = RunBudget(
+        timeout=settings.question_timeout, max_steps=settings.question_max_steps,
+        max_tool_calls=settings.question_max_tool_calls, answer_reserve=settings.question_answer_reserve
+    )
+
+    # v1 hands the tool node the whole state and all tool calls of a turn at once,
+    # which the observation budget needs to see the question and the thread's usage
     agent = create_react_agent(
-        model=model,
-        tools=all_tools,
+        model=BudgetedModel(bound=model),
+        tools=tool_node,
         prompt=SystemMessage(content=SYSTEM_PROMPT),
         checkpointer=memory,
-        response_format=ResponseFormat
-    ).with_config(thread_id=settings.thread_id)
+        response_format=ResponseFormat,
+        version="v1"
+    ).with_config(
+        thread_id=settings.thread_id, recursion_limit=settings.recursion_limit,
+        # The step and tool call limits hold for any run, the timeout needs the run's start to count from
+        configurable=run_budget.model_copy(update={"timeout": None}).configurable()
+    )
     # The store is attached to the tools, but we attach it to the agent instance
     # for convenience so it can be accessed directly, e.g. for populating data.
     agent.store = store
+    agent.store_maintenance = store_maintenance
+    agent.observation_budget = observation_budget
+    agent.checkpointer = memory
+    # The default limits of a question, a run passes `run_budget.configurable()` in its config to start its timeout
+    agent.run_budget = run_budget
+    # Per-tier calls, time and tokens in `model_router.stats`, None without a fast model
+    agent.model_router = model if isinstance(model, TieredChatModel) else None
+    agent.answer_cache = AnswerCache(
+        store, threshold=settings.answer_cache_threshold, ttl=settings.answer_cache_ttl
+    ) if settings.answer_cache_enabled else None
     return agent
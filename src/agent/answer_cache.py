@@ -0,0 +1,94 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, NamedTuple
+
+if TYPE_CHECKING:
+    from langgraph.store.base import BaseStore
+
+NAMESPACE = ("answer_cache",)
+
+
+class CachedAnswer(NamedTuple):
+    question: str
+    answer: str
+    score: float
+    # How long the agent took for the cached answer, i.e. roughly the time the hit saves
+    latency: float
+
+
+class AnswerCache:
+    """
+    Final answers of earlier runs, looked up by the similarity of their question before the agent runs.
+
+    A repeated question is answered straight from the store instead of going through the whole ReAct loop
+    again. By default only the same question, up to case and whitespace, is reused: templated questions
+    like "population of France" and "population of Spain" are very similar by embedding and still need
+    different answers. Only the first question of a thread is looked up and recorded, later ones usually
+    depend on the conversation before them.
+    """
+
+    def __init__(self, store: "BaseStore", threshold: float | None = None, ttl: float | None = 7 * 86400):
+        """
+        :param store: the store holding the answers under the `answer_cache` namespace, with embeddings
+        :param threshold: similarity a cached question needs to be reused, None reuses only the same question
+        :param ttl: seconds after which an answer is too old to be reused, None keeps them forever
+        """
+        self.store = store
+        self.threshold = threshold
+        self.ttl = ttl
+        self.lookups = 0
+        self.hits = 0
+        self.lookup_time = 0.0
+        self.saved_time = 0.0
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            "lookups": self.lookups,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.lookups if self.lookups else 0.0,
+            "average_lookup_time": self.lookup_time / self.lookups if self.lookups else 0.0,
+            "saved_time": self.saved_time,
+        }
+
+    @staticmethod
+    def _key(question: str) -> str:
+        return hashlib.sha256(" ".join(question.lower().split()).encode()).hexdigest()
+
+    def _is_fresh(self, updated_at: datetime) -> bool:
+        return self.ttl is None or (datetime.now(timezone.utc) - updated_at).total_seconds() <= self.ttl
+
+    async def lookup(self, question: str) -> CachedAnswer | None:
+        """Returns the answer of the same or most similar earlier question, if it is similar and fresh enough."""
+        start = time.perf_counter()
+        self.lookups += 1
+        try:
+            if self.threshold is None:
+                item = await self.store.aget(NAMESPACE, self._key(question))
+                results = [(item, 1.0)] if item is not None else []
+            else:
+                results = [(item, item.score) for item in await self.store.asearch(NAMESPACE, query=question, limit=3)]
+        finally:
+            self.lookup_time += time.perf_counter() - start
+
+        for item, score in results:
+            if score is None or self.threshold is not None and score < self.threshold:
+                break
+            if self._is_fresh(item.updated_at):
+                self.hits += 1
+                self.saved_time += max(item.value.get("latency", 0.0) - (time.perf_counter() - start), 0.0)
+                return CachedAnswer(item.value["question"], item.value["answer"], score,
+                                    item.value.get("latency", 0.0))
+        return None
+
+    async def record(self, question: str, answer: str, latency: float):
+        """
+        Stores the final answer of a run, replacing the one of an identical earlier question. The question is
+        only embedded when lookups are by similarity, exact lookups never read the vector. Answers recorded
+        before a threshold was set are then only found by their exact question.
+        """
+        await self.store.aput(
+            NAMESPACE, self._key(question), {"question": question, "answer": answer, "latency": latency},
+            index=False if self.threshold is None else ["question"]
+        )
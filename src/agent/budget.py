@@ -0,0 +1,114 @@
+import asyncio
+import time
+from typing import Any
+
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableBinding, RunnableConfig
+from pydantic import BaseModel
+
+# The run's budget in `configurable`, set by `RunBudget.configurable`
+BUDGET_KEY = "run_budget"
+
+
+class RunBudget(BaseModel):
+    """Limits of one question, None leaves a limit off."""
+    # Seconds from the question to its final answer
+    timeout: float | None = None
+    # ReAct steps that may call tools, the final answer is written after the last one
+    max_steps: int | None = None
+    # Tool calls over all steps of the question
+    max_tool_calls: int | None = None
+    # Seconds of the timeout kept for the final answer, no tool or model turn runs into them. At most a
+    # quarter of the timeout, so a short timeout still leaves time for lookups.
+    answer_reserve: float = 20.0
+
+    def configurable(self) -> dict[str, dict[str, Any]]:
+        """The run's `configurable` entry, its timeout counted from now."""
+        deadline = None
+        if self.timeout is not None:
+            deadline = time.time() + self.timeout - min(self.answer_reserve, self.timeout / 4)
+        return {BUDGET_KEY: {"tools_deadline": deadline, "max_steps": self.max_steps,
+                             "max_tool_calls": self.max_tool_calls}}
+
+
+def _limits(config: RunnableConfig | None) -> dict[str, Any]:
+    return ((config or {}).get("configurable") or {}).get(BUDGET_KEY) or {}
+
+
+def _question_turns(messages: list[BaseMessage]) -> list[AIMessage]:
+    """The AI turns since the last question."""
+    start = len(messages)
+    while start and not isinstance(messages[start - 1], HumanMessage):
+        start -= 1
+    return [message for message in messages[start:] if isinstance(message, AIMessage)]
+
+
+def time_left(config: RunnableConfig | None) -> float | None:
+    """Seconds tools and model turns of the run may still take, None without a timeout."""
+    deadline = _limits(config).get("tools_deadline")
+    return None if deadline is None else deadline - time.time()
+
+
+def tool_calls_left(messages: list[BaseMessage], config: RunnableConfig | None) -> int | None:
+    """Tool calls the question may still make besides those of its last turn, None without a limit."""
+    max_tool_calls = _limits(config).get("max_tool_calls")
+    if max_tool_calls is None:
+        return None
+    return max_tool_calls - sum(len(turn.tool_calls) for turn in _question_turns(messages)[:-1])
+
+
+# Why a question stopped calling tools when its time ran out
+_TIME_UP = "The question's time budget is used up"
+
+
+def exhausted(messages: list[BaseMessage], config: RunnableConfig | None) -> str | None:
+    """Why the question may not call any more tools, None while it still may."""
+    limits, turns = _limits(config), _question_turns(messages)
+    left = time_left(config)
+    if left is not None and left <= 0:
+        reason = _TIME_UP
+    elif limits.get("max_steps") is not None and sum(bool(turn.tool_calls) for turn in turns) >= limits["max_steps"]:
+        reason = f"The question reached its limit of {limits['max_steps']} steps"
+    elif limits.get("max_tool_calls") is not None \
+            and sum(len(turn.tool_calls) for turn in turns) >= limits["max_tool_calls"]:
+        reason = f"The question reached its limit of {limits['max_tool_calls']} tool calls"
+    else:
+        return None
+    return f"{reason}, answering with what was found so far."
+
+
+class BudgetedModel(RunnableBinding):
+    """
+    The agent's model, answering a turn itself once the question's budget is used up. The turn has no
+    tool calls, so the graph goes on to the final answer written from what was found so far, and the
+    model isn't called for a turn whose tool calls couldn't run anyway. A turn still running when the
+    time for tools and turns is up is cancelled the same way, leaving the final answer its reserve; the
+    final answer itself is not cut off, the question would have no answer at all.
+    """
+
+    def bind_tools(self, tools, **kwargs) -> "BudgetedModel":
+        bound = self.bound.bind_tools(tools, **kwargs)
+        if isinstance(bound, RunnableBinding):
+            # Flattened, the agent takes the chat model for the final answer from `bound`
+            return BudgetedModel(bound=bound.bound, kwargs=bound.kwargs, config=bound.config)
+        return BudgetedModel(bound=bound)
+
+    @staticmethod
+    def _stopped_turn(reason: str) -> AIMessage:
+        return AIMessage(content=reason, response_metadata={"budget_exhausted": True})
+
+    def _exhausted_turn(self, input: Any, config: RunnableConfig | None) -> AIMessage | None:
+        reason = exhausted(input, config) if isinstance(input, list) else None
+        return None if reason is None else self._stopped_turn(reason)
+
+    def invoke(self, input: Any, config: RunnableConfig | None = None, **kwargs: Any) -> Any:
+        return self._exhausted_turn(input, config) or super().invoke(input, config, **kwargs)
+
+    async def ainvoke(self, input: Any, config: RunnableConfig | None = None, **kwargs: Any) -> Any:
+        turn = self._exhausted_turn(input, config)
+        if turn is not None:
+            return turn
+        try:
+            return await asyncio.wait_for(super().ainvoke(input, config, **kwargs), time_left(config))
+        except asyncio.TimeoutError:
+            return self._stopped_turn(f"{_TIME_UP}, answering with what was found so far.")
@@ -0,0 +1,557 @@
+import json
+import os
+import random
+import sqlite3
+import threading
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, AsyncIterator, Iterator, List, NamedTuple, Sequence
+
+from langchain_core.messages import BaseMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP, BaseCheckpointSaver, ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple,
+    get_checkpoint_id, get_checkpoint_metadata,
+)
+
+from src.config import AgentSettings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS checkpoints (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    parent_checkpoint_id TEXT,
+    type TEXT NOT NULL,
+    checkpoint BLOB NOT NULL,
+    metadata_type TEXT NOT NULL,
+    metadata BLOB NOT NULL,
+    channel_versions TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+);
+CREATE TABLE IF NOT EXISTS blobs (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS writes (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    checkpoint_id TEXT NOT NULL,
+    task_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    channel TEXT NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    task_path TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id, task_id, idx)
+);
+CREATE TABLE IF NOT EXISTS messages (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    seq INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    value BLOB NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, seq)
+);
+CREATE TABLE IF NOT EXISTS message_versions (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL,
+    channel TEXT NOT NULL,
+    version TEXT NOT NULL,
+    ranges TEXT NOT NULL,
+    PRIMARY KEY (thread_id, checkpoint_ns, channel, version)
+);
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id TEXT PRIMARY KEY,
+    title TEXT,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL
+);
+"""
+
+Ranges = list[tuple[int, int]]
+
+
+class ThreadSummary(NamedTuple):
+    thread_id: str
+    title: str | None
+    message_count: int
+    created_at: str
+    updated_at: str
+
+
+def _truncate_ranges(ranges: Ranges, length: int) -> Ranges:
+    """Keeps the first `length` messages covered by the given [start, end) sequence ranges."""
+    kept = []
+    for start, end in ranges:
+        if length <= 0:
+            break
+        kept.append((start, min(end, start + length)))
+        length -= end - start
+    return kept
+
+
+def _append_range(ranges: Ranges, start: int, end: int) -> Ranges:
+    if start == end:
+        return ranges
+    if ranges and ranges[-1][1] == start:
+        return [*ranges[:-1], (ranges[-1][0], end)]
+    return [*ranges, (start, end)]
+
+
+class SQLiteDeltaSaver(BaseCheckpointSaver[str]):
+    """
+    SQLite checkpointer storing message lists as deltas.
+
+    Every step of a ReAct run creates a checkpoint holding the whole message list. Instead of serializing
+    that list again each time, messages are appended once to a per-thread log and each version of the
+    channel only records which ranges of the log it is made of. Old checkpoints beyond the retention are
+    removed, together with the blobs and messages no kept checkpoint references, by a background compaction.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        max_checkpoints_per_thread: int | None = 20,
+        delta_channels: Sequence[str] = ("messages",),
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.path = path
+        self.max_checkpoints_per_thread = max_checkpoints_per_thread
+        self.delta_channels = set(delta_channels)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.RLock()
+        # (thread_id, checkpoint_ns, channel, version) -> (ranges, messages) of recently written versions
+        self._recent: OrderedDict[tuple[str, str, str, str], tuple[Ranges, list]] = OrderedDict()
+        self._dirty_threads: set[str] = set()
+        self._compaction_stop: threading.Event | None = None
+
+    # Message deltas
+
+    def _next_seq(self, thread_id: str, checkpoint_ns: str) -> int:
+        row = self._conn.execute(
+            "SELECT MAX(seq) FROM messages WHERE thread_id = ? AND checkpoint_ns = ?", (thread_id, checkpoint_ns)
+        ).fetchone()
+        return 0 if row[0] is None else row[0] + 1
+
+    def _load_ranges(self, thread_id: str, checkpoint_ns: str, ranges: Ranges, offset: int = 0,
+                     limit: int | None = None) -> list:
+        """Deserializes the messages covered by the ranges, optionally only a page of them."""
+        messages = []
+        for start, end in ranges:
+            if offset >= end - start:
+                offset -= end - start
+                continue
+            if limit is not None:
+                end = min(end, start + offset + limit - len(messages))
+            rows = self._conn.execute(
+                "SELECT type, value FROM messages WHERE thread_id = ? AND checkpoint_ns = ? AND seq >= ? AND seq < ? "
+                "ORDER BY seq", (thread_id, checkpoint_ns, start + offset, end)
+            )
+            messages.extend(self.serde.loads_typed(row) for row in rows)
+            offset = 0
+            if limit is not None and len(messages) >= limit:
+                break
+        return messages
+
+    def _message_version(self, thread_id: str, checkpoint_ns: str, channel: str, version: str) -> Ranges | None:
+        row = self._conn.execute(
+            "SELECT ranges FROM message_versions WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? "
+            "AND version = ?", (thread_id, checkpoint_ns, channel, version)
+        ).fetchone()
+        return None if row is None else [tuple(r) for r in json.loads(row[0])]
+
+    def _load_message_version(self, key: tuple[str, str, str, str]) -> tuple[Ranges, list] | None:
+        if key in self._recent:
+            return self._recent[key]
+        ranges = self._message_version(*key)
+        if ranges is None:
+            return None
+        return ranges, self._load_ranges(key[0], key[1], ranges)
+
+    def _remember(self, key: tuple[str, str, str, str], ranges: Ranges, messages: list):
+        self._recent[key] = (ranges, messages)
+        self._recent.move_to_end(key)
+        while len(self._recent) > 64:
+            self._recent.popitem(last=False)
+
+    def _put_messages(self, thread_id: str, checkpoint_ns: str, channel: str, version: str, messages: list,
+                      previous_version: str | None):
+        base = None
+        if previous_version is not None:
+            base = self._load_message_version((thread_id, checkpoint_ns, channel, previous_version))
+        base_ranges, base_messages = base or ([], [])
+
+        # Messages are normally only appended, so the new value shares a prefix with the previous one
+        common = 0
+        for old, new in zip(base_messages, messages):
+            if old is not new and old != new:
+                break
+            common += 1
+        ranges = _truncate_ranges(base_ranges, common)
+        start = self._next_seq(thread_id, checkpoint_ns)
+        self._conn.executemany(
+            "INSERT INTO messages (thread_id, checkpoint_ns, seq, type, value) VALUES (?, ?, ?, ?, ?)",
+            [(thread_id, checkpoint_ns, start + i, *self.serde.dumps_typed(message))
+             for i, message in enumerate(messages[common:])]
+        )
+        ranges = _append_range(ranges, start, start + len(messages) - common)
+        self._conn.execute(
+            "INSERT OR REPLACE INTO message_versions (thread_id, checkpoint_ns, channel, version, ranges) "
+            "VALUES (?, ?, ?, ?, ?)", (thread_id, checkpoint_ns, channel, version, json.dumps(ranges))
+        )
+        self._remember((thread_id, checkpoint_ns, channel, version), ranges, list(messages))
+
+        if checkpoint_ns == "":
+            title = next((str(m.content)[:120] for m in messages if isinstance(m, HumanMessage)), None)
+            self._conn.execute(
+                "UPDATE threads SET message_count = ?, title = COALESCE(title, ?) WHERE thread_id = ?",
+                (len(messages), title, thread_id)
+            )
+
+    # Checkpoints
+
+    def _load_channel_values(self, thread_id: str, checkpoint_ns: str, versions: ChannelVersions) -> dict[str, Any]:
+        values = {}
+        for channel, version in versions.items():
+            if channel in self.delta_channels:
+                loaded = self._load_message_version((thread_id, checkpoint_ns, channel, str(version)))
+                if loaded is not None:
+                    values[channel] = list(loaded[1])
+                    continue
+            row = self._conn.execute(
+                "SELECT type, value FROM blobs WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? "
+                "AND version = ?", (thread_id, checkpoint_ns, channel, str(version))
+            ).fetchone()
+            if row is not None and row[0] != "empty":
+                values[channel] = self.serde.loads_typed(row)
+        return values
+
+    def _tuple_from_row(self, thread_id: str, checkpoint_ns: str, row: tuple) -> CheckpointTuple:
+        checkpoint_id, parent_checkpoint_id, type_, checkpoint_b, metadata_type, metadata_b = row
+        checkpoint = self.serde.loads_typed((type_, checkpoint_b))
+        writes = self._conn.execute(
+            "SELECT task_id, channel, type, value FROM writes WHERE thread_id = ? AND checkpoint_ns = ? "
+            "AND checkpoint_id = ? ORDER BY task_id, idx", (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchall()
+        return CheckpointTuple(
+            config={"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint_id
+            }},
+            checkpoint={
+                **checkpoint,
+                "channel_values": self._load_channel_values(thread_id, checkpoint_ns, checkpoint["channel_versions"])
+            },
+            metadata=self.serde.loads_typed((metadata_type, metadata_b)),
+            parent_config=({"configurable": {
+                "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": parent_checkpoint_id
+            }} if parent_checkpoint_id else None),
+            pending_writes=[(task_id, channel, self.serde.loads_typed((t, v))) for task_id, channel, t, v in writes],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        query = ("SELECT checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata_type, metadata "
+                 "FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ?")
+        params = [thread_id, checkpoint_ns]
+        if checkpoint_id := get_checkpoint_id(config):
+            query += " AND checkpoint_id = ?"
+            params.append(checkpoint_id)
+        with self._lock:
+            row = self._conn.execute(query + " ORDER BY checkpoint_id DESC LIMIT 1", params).fetchone()
+            return None if row is None else self._tuple_from_row(thread_id, checkpoint_ns, row)
+
+    def list(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> Iterator[CheckpointTuple]:
+        query = ("SELECT thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, "
+                 "metadata_type, metadata FROM checkpoints WHERE 1")
+        params = []
+        if config:
+            query += " AND thread_id = ?"
+            params.append(config["configurable"]["thread_id"])
+            if (checkpoint_ns := config["configurable"].get("checkpoint_ns")) is not None:
+                query += " AND checkpoint_ns = ?"
+                params.append(checkpoint_ns)
+            if checkpoint_id := get_checkpoint_id(config):
+                query += " AND checkpoint_id = ?"
+                params.append(checkpoint_id)
+        if before and (before_id := get_checkpoint_id(before)):
+            query += " AND checkpoint_id < ?"
+            params.append(before_id)
+        with self._lock:
+            rows = self._conn.execute(query + " ORDER BY checkpoint_id DESC", params).fetchall()
+        for thread_id, checkpoint_ns, *row in rows:
+            if limit is not None and limit <= 0:
+                break
+            metadata = self.serde.loads_typed((row[4], row[5]))
+            if filter and not all(metadata.get(key) == value for key, value in filter.items()):
+                continue
+            if limit is not None:
+                limit -= 1
+            with self._lock:
+                yield self._tuple_from_row(thread_id, checkpoint_ns, tuple(row))
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        parent_checkpoint_id = config["configurable"].get("checkpoint_id")
+        c = checkpoint.copy()
+        values: dict[str, Any] = c.pop("channel_values")  # type: ignore[misc]
+        now = datetime.now(timezone.utc).isoformat()
+
+        with self._lock:
+            if checkpoint_ns == "":
+                self._conn.execute(
+                    "INSERT INTO threads (thread_id, created_at, updated_at) VALUES (?, ?, ?) "
+                    "ON CONFLICT (thread_id) DO UPDATE SET updated_at = excluded.updated_at", (thread_id, now, now)
+                )
+            previous_versions = {}
+            if parent_checkpoint_id and self.delta_channels & new_versions.keys():
+                row = self._conn.execute(
+                    "SELECT channel_versions FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                    "AND checkpoint_id = ?", (thread_id, checkpoint_ns, parent_checkpoint_id)
+                ).fetchone()
+                previous_versions = json.loads(row[0]) if row else {}
+
+            for channel, version in new_versions.items():
+                value = values.get(channel)
+                if channel in self.delta_channels and isinstance(value, list) \
+                        and all(isinstance(m, BaseMessage) for m in value):
+                    previous = previous_versions.get(channel)
+                    self._put_messages(thread_id, checkpoint_ns, channel, str(version), value,
+                                       None if previous is None else str(previous))
+                    continue
+                type_, blob = self.serde.dumps_typed(value) if channel in values else ("empty", b"")
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO blobs (thread_id, checkpoint_ns, channel, version, type, value) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", (thread_id, checkpoint_ns, channel, str(version), type_, blob)
+                )
+
+            type_, checkpoint_b = self.serde.dumps_typed(c)
+            metadata_type, metadata_b = self.serde.dumps_typed(get_checkpoint_metadata(config, metadata))
+            self._conn.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, "
+                "type, checkpoint, metadata_type, metadata, channel_versions) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], parent_checkpoint_id, type_, checkpoint_b,
+                 metadata_type, metadata_b, json.dumps(checkpoint["channel_versions"]))
+            )
+            self._conn.commit()
+            self._dirty_threads.add(thread_id)
+        return {"configurable": {
+            "thread_id": thread_id, "checkpoint_ns": checkpoint_ns, "checkpoint_id": checkpoint["id"]
+        }}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        checkpoint_id = config["configurable"]["checkpoint_id"]
+        with self._lock:
+            for idx, (channel, value) in enumerate(writes):
+                idx = WRITES_IDX_MAP.get(channel, idx)
+                # Special writes (errors, interrupts) replace earlier ones, regular writes are kept once
+                verb = "INSERT OR REPLACE" if idx < 0 else "INSERT OR IGNORE"
+                self._conn.execute(
+                    f"{verb} INTO writes (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel, type, "
+                    "value, task_path) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (thread_id, checkpoint_ns, checkpoint_id, task_id, idx, channel,
+                     *self.serde.dumps_typed(value), task_path)
+                )
+            self._conn.commit()
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            for table in ("checkpoints", "blobs", "writes", "messages", "message_versions", "threads"):
+                self._conn.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+            self._conn.commit()
+            self._recent = OrderedDict((k, v) for k, v in self._recent.items() if k[0] != thread_id)
+
+    def get_next_version(self, current: str | None, channel: None) -> str:
+        if current is None:
+            current_v = 0
+        elif isinstance(current, int):
+            current_v = current
+        else:
+            current_v = int(current.split(".")[0])
+        return f"{current_v + 1:032}.{random.random():016}"
+
+    async def aget_tuple(self, config: RunnableConfig) -> CheckpointTuple | None:
+        return self.get_tuple(config)
+
+    async def alist(
+        self,
+        config: RunnableConfig | None,
+        *,
+        filter: dict[str, Any] | None = None,
+        before: RunnableConfig | None = None,
+        limit: int | None = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        for item in self.list(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        return self.put(config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        return self.put_writes(config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        return self.delete_thread(thread_id)
+
+    # History browsing
+
+    def list_threads(self, limit: int = 10, offset: int = 0) -> List[ThreadSummary]:
+        """Threads ordered by their last activity, most recent first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT thread_id, title, message_count, created_at, updated_at FROM threads "
+                "ORDER BY updated_at DESC LIMIT ? OFFSET ?", (limit, offset)
+            ).fetchall()
+        return [ThreadSummary(*row) for row in rows]
+
+    def count_threads(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM threads").fetchone()[0]
+
+    def get_thread_messages(self, thread_id: str, offset: int = 0, limit: int = 20) -> List[BaseMessage]:
+        """A page of the thread's latest messages, only that page is read and deserialized."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT channel_versions FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = '' "
+                "ORDER BY checkpoint_id DESC LIMIT 1", (thread_id,)
+            ).fetchone()
+            if row is None or "messages" not in (versions := json.loads(row[0])):
+                return []
+            ranges = self._message_version(thread_id, "", "messages", str(versions["messages"]))
+            if ranges is None:
+                return []
+            return self._load_ranges(thread_id, "", ranges, offset, limit)
+
+    # Compaction
+
+    def compact(self, thread_id: str):
+        """Drops checkpoints beyond the retention and everything only they referenced."""
+        if self.max_checkpoints_per_thread is None:
+            return
+        with self._lock:
+            for (checkpoint_ns,) in self._conn.execute(
+                "SELECT DISTINCT checkpoint_ns FROM checkpoints WHERE thread_id = ?", (thread_id,)
+            ).fetchall():
+                self._compact_namespace(thread_id, checkpoint_ns)
+            self._conn.commit()
+
+    def _compact_namespace(self, thread_id: str, checkpoint_ns: str):
+        key = (thread_id, checkpoint_ns)
+        kept = self._conn.execute(
+            "SELECT checkpoint_id, channel_versions FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT ?", (*key, self.max_checkpoints_per_thread)
+        ).fetchall()
+        if not kept:
+            return
+        oldest = kept[-1][0]
+        self._conn.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?", (*key, oldest)
+        )
+        self._conn.execute(
+            "DELETE FROM writes WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?", (*key, oldest)
+        )
+
+        referenced = {
+            (channel, str(version)) for _, versions in kept for channel, version in json.loads(versions).items()
+        }
+        for table in ("blobs", "message_versions"):
+            stale = [
+                (channel, version) for channel, version in self._conn.execute(
+                    f"SELECT channel, version FROM {table} WHERE thread_id = ? AND checkpoint_ns = ?", key
+                ) if (channel, version) not in referenced
+            ]
+            self._conn.executemany(
+                f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND channel = ? AND version = ?",
+                [(*key, channel, version) for channel, version in stale]
+            )
+
+        # Messages no remaining version covers are unreachable
+        covered = sorted(
+            tuple(r) for (ranges,) in self._conn.execute(
+                "SELECT ranges FROM message_versions WHERE thread_id = ? AND checkpoint_ns = ?", key
+            ) for r in json.loads(ranges)
+        )
+        position = 0
+        for start, end in [*covered, (self._next_seq(*key), None)]:
+            if start > position:
+                self._conn.execute(
+                    "DELETE FROM messages WHERE thread_id = ? AND checkpoint_ns = ? AND seq >= ? AND seq < ?",
+                    (*key, position, start)
+                )
+            if end is not None:
+                position = max(position, end)
+
+    def compact_dirty(self):
+        with self._lock:
+            dirty, self._dirty_threads = self._dirty_threads, set()
+        for thread_id in dirty:
+            self.compact(thread_id)
+
+    def start_compaction(self, interval: float = 60.0):
+        """Compacts the threads written to since the last run every `interval` seconds in a daemon thread."""
+        if self._compaction_stop is not None:
+            return
+        self._compaction_stop = stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                self.compact_dirty()
+        threading.Thread(target=run, name="checkpoint-compaction", daemon=True).start()
+
+    def close(self):
+        if self._compaction_stop is not None:
+            self._compaction_stop.set()
+        with self._lock:
+            self._conn.close()
+
+
+def init_checkpointer(settings: AgentSettings) -> SQLiteDeltaSaver:
+    """Opens the persistent chat history and starts its background compaction."""
+    checkpointer = SQLiteDeltaSaver(settings.checkpoint_path, max_checkpoints_per_thread=settings.checkpoint_retention)
+    checkpointer.start_compaction(settings.checkpoint_compaction_interval)
+    return checkpointer
@@ -0,0 +1,238 @@
+import asyncio
+import hashlib
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS embeddings (
+    key TEXT PRIMARY KEY,
+    vector BLOB NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS embeddings_by_use ON embeddings (used);
+"""
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Embeddings wrapper with a persistent, size-capped LRU cache keyed on a hash of the model name and text.
+
+    Misses arriving within `batch_window` seconds of each other, from any thread or task, are merged
+    into a single call to the wrapped model. Documents and queries are cached separately since
+    providers embed them differently.
+    """
+
+    def __init__(
+        self,
+        embeddings: Embeddings,
+        model_name: str,
+        path: str,
+        max_entries: int = 50_000,
+        batch_window: float = 0.005,
+        query_batch_kwargs: dict | None = None,
+    ):
+        """
+        :param embeddings: the model to wrap
+        :param model_name: part of every cache key, so switching models never returns stale vectors
+        :param path: SQLite file holding the cache
+        :param max_entries: least recently used vectors are evicted above this size
+        :param batch_window: how long the first miss waits for others to join its batch
+        :param query_batch_kwargs: extra `embed_documents` arguments turning it into a batched query
+            embedding (e.g. a task type), without them query misses are embedded one by one
+        """
+        self.embeddings = embeddings
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.batch_window = batch_window
+        self.query_batch_kwargs = query_batch_kwargs
+        self.hits = 0
+        self.misses = 0
+        self.batches = 0
+
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self._clock, self._size = self._conn.execute(
+            "SELECT COALESCE(MAX(used), 0), COUNT(*) FROM embeddings"
+        ).fetchone()
+        # key -> future of every miss that is queued or being embedded
+        self._pending: dict[str, Future] = {}
+        # kind -> key -> text of misses waiting for the next batch
+        self._queues: dict[str, dict[str, str]] = {"document": {}, "query": {}}
+        # Flushes run as tasks of their own, so cancelling the caller that started one doesn't strand its batch
+        self._flushes: set[asyncio.Task] = set()
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"hits": self.hits, "misses": self.misses, "batches": self.batches, "size": self._size}
+
+    def _key(self, kind: str, text: str) -> str:
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode()).hexdigest()
+
+    # Persistent LRU cache
+
+    def _cache_get(self, keys: list[str]) -> dict[str, list[float]]:
+        with self._lock:
+            found = {}
+            for key in set(keys):
+                row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is None:
+                    continue
+                self._clock += 1
+                self._conn.execute("UPDATE embeddings SET used = ? WHERE key = ?", (self._clock, key))
+                found[key] = np.frombuffer(row[0], dtype=np.float32).tolist()
+            self._conn.commit()
+            self.hits += len(found)
+            return found
+
+    def _cache_put(self, vectors: dict[str, list[float]]):
+        with self._lock:
+            for key, vector in vectors.items():
+                self._clock += 1
+                self._size += self._conn.execute(
+                    "INSERT OR IGNORE INTO embeddings (key, vector, used) VALUES (?, ?, ?)",
+                    (key, np.asarray(vector, dtype=np.float32).tobytes(), self._clock)
+                ).rowcount
+            if self._size > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY used LIMIT ?)",
+                    (self._size - self.max_entries,)
+                )
+                self._size = self.max_entries
+            self._conn.commit()
+
+    # Miss batching
+
+    def _enqueue(self, kind: str, missing: dict[str, str]) -> tuple[dict[str, Future], bool]:
+        """Registers misses for the next batch, returns their futures and whether the caller must flush it."""
+        with self._lock:
+            queue = self._queues[kind]
+            leader = not queue
+            futures = {}
+            for key, text in missing.items():
+                if key not in self._pending:
+                    # A running future can't be cancelled, a cancelled waiter leaves it to the others sharing it
+                    self._pending[key] = Future()
+                    self._pending[key].set_running_or_notify_cancel()
+                    queue[key] = text
+                futures[key] = self._pending[key]
+            self.misses += len(missing)
+            return futures, leader and bool(queue)
+
+    def _take_batch(self, kind: str) -> dict[str, str]:
+        with self._lock:
+            batch, self._queues[kind] = self._queues[kind], {}
+            self.batches += 1
+            return batch
+
+    def _resolve(self, batch: dict[str, str], vectors: list[list[float]] | None = None,
+                 error: BaseException | None = None):
+        if vectors is not None:
+            self._cache_put(dict(zip(batch, vectors)))
+        with self._lock:
+            futures = [self._pending.pop(key) for key in batch]
+        for i, future in enumerate(futures):
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(vectors[i])
+
+    def _embed_batch(self, kind: str, texts: list[str]) -> list[list[float]]:
+        if kind == "document":
+            return self.embeddings.embed_documents(texts)
+        if self.query_batch_kwargs is not None:
+            return self.embeddings.embed_documents(texts, **self.query_batch_kwargs)
+        return [self.embeddings.embed_query(text) for text in texts]
+
+    async def _aembed_batch(self, kind: str, texts: list[str]) -> list[list[float]]:
+        if kind == "document":
+            return await self.embeddings.aembed_documents(texts)
+        if self.query_batch_kwargs is not None:
+            return await asyncio.to_thread(self.embeddings.embed_documents, texts, **self.query_batch_kwargs)
+        return list(await asyncio.gather(*(self.embeddings.aembed_query(text) for text in texts)))
+
+    def _fail(self, kind: str, batch: dict[str, str] | None, error: BaseException):
+        """
+        Fails the batch, taking it from the queue if the flush was interrupted before it did. Interruptions,
+        e.g. a KeyboardInterrupt or a cancelled task, fail it with an error of its own, the waiters weren't
+        interrupted themselves.
+        """
+        if batch is None:
+            batch = self._take_batch(kind)
+        if not isinstance(error, Exception):
+            error = RuntimeError(f"The {kind} embedding batch was interrupted ({type(error).__name__})")
+        self._resolve(batch, error=error)
+
+    def _flush(self, kind: str):
+        batch = None
+        try:
+            time.sleep(self.batch_window)
+            batch = self._take_batch(kind)
+            vectors = self._embed_batch(kind, list(batch.values()))
+        except BaseException as e:
+            self._fail(kind, batch, e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            self._resolve(batch, vectors)
+
+    async def _aflush(self, kind: str):
+        batch = None
+        try:
+            await asyncio.sleep(self.batch_window)
+            batch = self._take_batch(kind)
+            vectors = await self._aembed_batch(kind, list(batch.values()))
+        except BaseException as e:
+            self._fail(kind, batch, e)
+            if not isinstance(e, Exception):
+                raise
+        else:
+            self._resolve(batch, vectors)
+
+    def _embed(self, kind: str, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        vectors = self._cache_get(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            futures, leader = self._enqueue(kind, missing)
+            if leader:
+                self._flush(kind)
+            vectors.update({key: future.result() for key, future in futures.items()})
+        return [vectors[key] for key in keys]
+
+    async def _aembed(self, kind: str, texts: list[str]) -> list[list[float]]:
+        keys = [self._key(kind, text) for text in texts]
+        vectors = self._cache_get(keys)
+        missing = {key: text for key, text in zip(keys, texts) if key not in vectors}
+        if missing:
+            futures, leader = self._enqueue(kind, missing)
+            if leader:
+                flush = asyncio.create_task(self._aflush(kind))
+                self._flushes.add(flush)
+                flush.add_done_callback(self._flushes.discard)
+            for key, future in futures.items():
+                vectors[key] = await asyncio.wrap_future(future)
+        return [vectors[key] for key in keys]
+
+    # Embeddings interface
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed("document", texts)
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed("query", [text])[0]
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        return await self._aembed("document", texts)
+
+    async def aembed_query(self, text: str) -> list[float]:
+        return (await self._aembed("query", [text]))[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
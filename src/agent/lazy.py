@@ -0,0 +1,78 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Any, AsyncIterator, Callable
+
+from src.config import AgentSettings
+
+if TYPE_CHECKING:
+    from src.agent.checkpointer import SQLiteDeltaSaver
+
+
+class LazyAgent:
+    """
+    Stands in for the agent until it is needed. Building it imports LangGraph, LangChain and the model
+    clients and compiles the graph, which takes seconds, so it happens in a background thread started
+    with `start` (or on first use) while the CLI is already usable.
+    """
+
+    def __init__(self, settings: AgentSettings, setup: Callable[[Any], None] | None = None):
+        """
+        :param settings: the settings passed to `init_agent`
+        :param setup: called with the agent once it is built, still in the background thread
+        """
+        self.settings = settings
+        self.setup = setup
+        self._future: Future | None = None
+        self._checkpointer: "SQLiteDeltaSaver | None" = None
+        self._lock = threading.Lock()
+
+    def _build(self, future: Future):
+        try:
+            from src.agent.agent import init_agent
+
+            agent = init_agent(self.settings, checkpointer=self.checkpointer)
+            if self.setup is not None:
+                self.setup(agent)
+            future.set_result(agent)
+        except BaseException as e:
+            future.set_exception(e)
+
+    def start(self) -> Future:
+        """Starts building the agent unless it is already being built."""
+        with self._lock:
+            if self._future is None:
+                self._future = Future()
+                # A daemon thread, so quitting while the agent is still being built doesn't wait for it
+                threading.Thread(target=self._build, args=(self._future,), name="agent-init", daemon=True).start()
+            return self._future
+
+    @property
+    def ready(self) -> bool:
+        return self._future is not None and self._future.done()
+
+    def get(self):
+        """Returns the agent, waiting for it to be built."""
+        return self.start().result()
+
+    async def aget(self):
+        """Returns the agent, waiting for it to be built without blocking the event loop."""
+        return await asyncio.wrap_future(self.start())
+
+    @property
+    def checkpointer(self) -> "SQLiteDeltaSaver":
+        """The chat history, which is opened without building the whole agent."""
+        with self._lock:
+            if self._checkpointer is None:
+                from src.agent.checkpointer import init_checkpointer
+                self._checkpointer = init_checkpointer(self.settings)
+            return self._checkpointer
+
+    @property
+    def store(self):
+        return self.get().store
+
+    async def astream(self, *args, **kwargs) -> AsyncIterator[Any]:
+        agent = await self.aget()
+        async for chunk in agent.astream(*args, **kwargs):
+            yield chunk
@@ -0,0 +1,174 @@
+import time
+from typing import Any, AsyncIterator, Iterator, Literal
+
+from langchain_core.callbacks import AsyncCallbackManagerForLLMRun, CallbackManagerForLLMRun
+from langchain_core.language_models import BaseChatModel, LanguageModelLike
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+Tier = Literal["fast", "strong"]
+# The tiers' own runs are kept out of the callbacks, the router's run already reports every token
+_QUIET = {"callbacks": []}
+
+
+class TierUsage(BaseModel):
+    calls: int = 0
+    errors: int = 0
+    time: float = 0.0
+    input_tokens: int = 0
+    output_tokens: int = 0
+
+
+class RouterStats(BaseModel):
+    """Calls of each tier, shared by the router and its copies with tools bound."""
+    fast: TierUsage = Field(default_factory=TierUsage)
+    strong: TierUsage = Field(default_factory=TierUsage)
+    # Turns given to the strong model by an escalation rule, by rule
+    escalations: dict[str, int] = {}
+
+    def record(self, tier: Tier, started: float, message: BaseMessage | None):
+        usage = getattr(self, tier)
+        usage.calls += 1
+        usage.time += time.perf_counter() - started
+        if message is None:
+            usage.errors += 1
+        elif getattr(message, "usage_metadata", None):
+            usage.input_tokens += message.usage_metadata.get("input_tokens", 0)
+            usage.output_tokens += message.usage_metadata.get("output_tokens", 0)
+
+
+class TieredChatModel(BaseChatModel):
+    """
+    Chat model routing each ReAct turn to a fast or a strong model.
+
+    The first turn of a question plans the approach and goes to the strong model, the tool-selection turns
+    after it to the fast one. A turn is escalated to the strong model after a tool error, once the question
+    has taken `escalate_after_steps` turns, or when the fast model fails. The structured final answer is
+    always written by the strong model. Each turn's tier is in its message's `response_metadata`.
+    """
+
+    fast: BaseChatModel
+    strong: BaseChatModel
+    escalate_after_steps: int = 6
+    escalate_on_tool_error: bool = True
+    stats: RouterStats = Field(default_factory=RouterStats)
+    # The tiers with the agent's tools bound, set by bind_tools
+    _runnables: dict[str, LanguageModelLike] = PrivateAttr(default_factory=dict)
+
+    @property
+    def _llm_type(self) -> str:
+        return "tiered"
+
+    def bind_tools(self, tools, **kwargs) -> "TieredChatModel":
+        bound = TieredChatModel(fast=self.fast, strong=self.strong, escalate_after_steps=self.escalate_after_steps,
+                                escalate_on_tool_error=self.escalate_on_tool_error, stats=self.stats)
+        bound._runnables = {
+            "fast": self.fast.bind_tools(tools, **kwargs),
+            "strong": self.strong.bind_tools(tools, **kwargs),
+        }
+        return bound
+
+    def with_structured_output(self, schema, **kwargs):
+        return self.strong.with_structured_output(schema, **kwargs)
+
+    def route(self, messages: list[BaseMessage]) -> tuple[Tier, str | None]:
+        """The tier of the next turn, and the escalation rule that picked the strong model if one did."""
+        turn = len(messages)
+        while turn and not isinstance(messages[turn - 1], HumanMessage):
+            turn -= 1
+        steps = sum(isinstance(message, AIMessage) for message in messages[turn:])
+        if not steps:
+            return "strong", None
+        if self.escalate_on_tool_error:
+            position = len(messages)
+            while position > turn and isinstance(messages[position - 1], ToolMessage):
+                position -= 1
+                if messages[position].status == "error":
+                    return "strong", "tool_error"
+        if steps >= self.escalate_after_steps:
+            return "strong", "steps"
+        return "fast", None
+
+    def _runnable(self, tier: Tier) -> LanguageModelLike:
+        return self._runnables.get(tier) or getattr(self, tier)
+
+    def _tiers(self, messages: list[BaseMessage]) -> list[Tier]:
+        """The tiers to try in order, a failed fast turn is retried on the strong model."""
+        tier, rule = self.route(messages)
+        if rule is not None:
+            self.stats.escalations[rule] = self.stats.escalations.get(rule, 0) + 1
+        return ["fast", "strong"] if tier == "fast" else ["strong"]
+
+    def _escalated(self, tier: Tier) -> bool:
+        """Whether a failed turn of the tier is retried on the strong model."""
+        if tier == "strong":
+            return False
+        self.stats.escalations["fast_error"] = self.stats.escalations.get("fast_error", 0) + 1
+        return True
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                  run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        for tier in self._tiers(messages):
+            started = time.perf_counter()
+            try:
+                message = self._runnable(tier).invoke(messages, _QUIET, stop=stop, **kwargs)
+            except Exception:
+                self.stats.record(tier, started, None)
+                if not self._escalated(tier):
+                    raise
+                continue
+            self.stats.record(tier, started, message)
+            return ChatResult(generations=[ChatGeneration(message=message, generation_info={"model_tier": tier})])
+
+    async def _agenerate(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                         run_manager: AsyncCallbackManagerForLLMRun | None = None, **kwargs: Any) -> ChatResult:
+        for tier in self._tiers(messages):
+            started = time.perf_counter()
+            try:
+                message = await self._runnable(tier).ainvoke(messages, _QUIET, stop=stop, **kwargs)
+            except Exception:
+                self.stats.record(tier, started, None)
+                if not self._escalated(tier):
+                    raise
+                continue
+            self.stats.record(tier, started, message)
+            return ChatResult(generations=[ChatGeneration(message=message, generation_info={"model_tier": tier})])
+
+    def _stream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                run_manager: CallbackManagerForLLMRun | None = None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        for tier in self._tiers(messages):
+            started, streamed = time.perf_counter(), None
+            try:
+                for chunk in self._runnable(tier).stream(messages, _QUIET, stop=stop, **kwargs):
+                    # The tier goes on the first chunk only, merging the chunks would repeat it
+                    info = {"model_tier": tier} if streamed is None else None
+                    streamed = chunk if streamed is None else streamed + chunk
+                    yield ChatGenerationChunk(message=chunk, generation_info=info)
+            except Exception:
+                self.stats.record(tier, started, None)
+                # Once a chunk went out the turn can't be taken back, only a fast model failing before can
+                if streamed is not None or not self._escalated(tier):
+                    raise
+                continue
+            self.stats.record(tier, started, streamed or AIMessageChunk(content=""))
+            return
+
+    async def _astream(self, messages: list[BaseMessage], stop: list[str] | None = None,
+                       run_manager: AsyncCallbackManagerForLLMRun | None = None,
+                       **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        for tier in self._tiers(messages):
+            started, streamed = time.perf_counter(), None
+            try:
+                async for chunk in self._runnable(tier).astream(messages, _QUIET, stop=stop, **kwargs):
+                    info = {"model_tier": tier} if streamed is None else None
+                    streamed = chunk if streamed is None else streamed + chunk
+                    yield ChatGenerationChunk(message=chunk, generation_info=info)
+            except Exception:
+                self.stats.record(tier, started, None)
+                if streamed is not None or not self._escalated(tier):
+                    raise
+                continue
+            self.stats.record(tier, started, streamed or AIMessageChunk(content=""))
+            return
@@ -0,0 +1,219 @@
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Any, Sequence
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, ToolMessage
+from langchain_core.tools import tool
+from pydantic import BaseModel, Field
+
+from src.agent.tools.results import ToolError
+
+_WORD = re.compile(r"\w+")
+_STOPWORDS = frozenset(
+    "the a an and or of to in on for with by from at as is are was were be been what which who whom whose when "
+    "where why how that this these those it its into than then there their about".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count, Gemini averages about four characters per token on English text."""
+    return math.ceil(len(text) / 4)
+
+
+def split_chunks(text: str, chunk_tokens: int) -> list[str]:
+    """Splits text on line boundaries into chunks of about `chunk_tokens` tokens."""
+    max_chars = chunk_tokens * 4
+    chunks, current, size = [], [], 0
+    for line in text.splitlines():
+        # Lines longer than a chunk (e.g. serialized JSON) are cut into chunk sized pieces
+        for start in range(0, max(len(line), 1), max_chars):
+            piece = line[start:start + max_chars]
+            if current and size + len(piece) > max_chars:
+                chunks.append("\n".join(current))
+                current, size = [], 0
+            current.append(piece)
+            size += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def _terms(text: str) -> list[str]:
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 2 and word not in _STOPWORDS]
+
+
+def lexical_scores(query: str, chunks: Sequence[str]) -> list[float]:
+    """BM25 scores of the chunks against the query, using the chunks themselves as the corpus."""
+    query_terms = set(_terms(query))
+    chunk_terms = [Counter(_terms(chunk)) for chunk in chunks]
+    if not query_terms or not chunks:
+        return [0.0] * len(chunks)
+    average_length = sum(sum(terms.values()) for terms in chunk_terms) / len(chunks) or 1
+    document_frequency = Counter(term for terms in chunk_terms for term in query_terms & terms.keys())
+    scores = []
+    for terms in chunk_terms:
+        length = sum(terms.values())
+        score = 0.0
+        for term in query_terms & terms.keys():
+            idf = math.log(1 + (len(chunks) - document_frequency[term] + 0.5) / (document_frequency[term] + 0.5))
+            tf = terms[term]
+            score += idf * tf * 2.2 / (tf + 1.2 * (0.25 + 0.75 * length / average_length))
+        scores.append(score)
+    return scores
+
+
+class ReadObservationInput(BaseModel):
+    observation_id: str = Field(..., description="The observation id given in the shortened observation.")
+    cursor: int = Field(0, description="The chunk to continue reading from, as given in the shortened observation.")
+
+
+class ObservationBudget:
+    """
+    Shrinks tool observations before they enter the conversation, since every later ReAct step resends them.
+
+    Observations over the per-observation budget (or the question's remaining budget) are split into chunks,
+    and only the chunks most relevant to the question are kept. The full text stays available to the
+    model through the `read_observation` tool and the cursor given in the shortened observation, for the
+    latest `max_stored` shortened observations of this process.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = 2000,
+        thread_max_tokens: int = 12000,
+        min_tokens: int = 300,
+        chunk_tokens: int = 250,
+        embeddings: Embeddings | None = None,
+        max_stored: int = 256,
+    ):
+        """
+        :param max_tokens: budget of a single observation
+        :param thread_max_tokens: budget of all observations of one question of a thread
+        :param min_tokens: what an observation still gets once the question's budget is spent
+        :param chunk_tokens: size of the chunks observations are split into
+        :param embeddings: ranks chunks by embedding similarity instead of BM25 when given
+        :param max_stored: number of full observations kept for `read_observation`
+        """
+        self.max_tokens = max_tokens
+        self.thread_max_tokens = thread_max_tokens
+        self.min_tokens = min_tokens
+        self.chunk_tokens = chunk_tokens
+        self.embeddings = embeddings
+        self.max_stored = max_stored
+        self.original_tokens = 0
+        self.kept_tokens = 0
+        self.shortened = 0
+        self._stored: OrderedDict[str, list[str]] = OrderedDict()
+
+    @property
+    def saved_tokens(self) -> int:
+        """Observation tokens kept out of the prompt, each of them is saved again on every later step."""
+        return self.original_tokens - self.kept_tokens
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"observations_shortened": self.shortened, "original_tokens": self.original_tokens,
+                "kept_tokens": self.kept_tokens, "saved_tokens": self.saved_tokens}
+
+    def observation_budget(self, messages: Sequence[BaseMessage]) -> int:
+        """
+        Budget of each observation of the latest AI turn, given the observations the question already got.
+        Those of earlier questions of the thread don't count, a new question starts with the whole budget.
+        """
+        start = next((ix + 1 for ix in range(len(messages) - 1, -1, -1) if isinstance(messages[ix], HumanMessage)), 0)
+        used = sum(estimate_tokens(str(m.content)) for m in messages[start:] if isinstance(m, ToolMessage))
+        last_ai = next((m for m in reversed(messages) if isinstance(m, AIMessage)), None)
+        calls = max(len(last_ai.tool_calls), 1) if last_ai is not None else 1
+        remaining = (self.thread_max_tokens - used) // calls
+        return max(min(self.max_tokens, remaining), self.min_tokens)
+
+    @staticmethod
+    def ranking_query(messages: Sequence[BaseMessage], tool_args: dict[str, Any]) -> str:
+        question = next((str(m.content) for m in reversed(messages) if isinstance(m, HumanMessage)), "")
+        return " ".join([question, *(str(value) for value in tool_args.values())])
+
+    async def _scores(self, query: str, chunks: list[str]) -> list[float]:
+        if self.embeddings is None:
+            return lexical_scores(query, chunks)
+        query_vector = np.asarray(await self.embeddings.aembed_query(query))
+        chunk_vectors = np.asarray(await self.embeddings.aembed_documents(chunks))
+        norms = np.linalg.norm(chunk_vectors, axis=1) * np.linalg.norm(query_vector)
+        return (chunk_vectors @ query_vector / np.where(norms == 0, 1, norms)).tolist()
+
+    def _store(self, observation_id: str, chunks: list[str]):
+        self._stored[observation_id] = chunks
+        self._stored.move_to_end(observation_id)
+        while len(self._stored) > self.max_stored:
+            self._stored.popitem(last=False)
+
+    async def apply(self, message: ToolMessage, query: str, budget: int) -> ToolMessage:
+        """Returns the message unchanged if it fits the budget, otherwise a copy holding its best chunks."""
+        if not isinstance(message.content, str) or message.name == "read_observation":
+            return message
+        tokens = estimate_tokens(message.content)
+        self.original_tokens += tokens
+        if tokens <= budget:
+            self.kept_tokens += tokens
+            return message
+
+        chunks = split_chunks(message.content, self.chunk_tokens)
+        scores = await self._scores(query, chunks)
+        kept, size = set(), 0
+        # On equal scores earlier chunks win, they usually hold the title or the search answer
+        for ix in sorted(range(len(chunks)), key=lambda i: (-scores[i], i)):
+            chunk_size = estimate_tokens(chunks[ix])
+            if size + chunk_size > budget and kept:
+                continue
+            kept.add(ix)
+            size += chunk_size
+
+        parts, previous = [], -1
+        for ix in sorted(kept):
+            if ix != previous + 1:
+                parts.append("[...]")
+            parts.append(chunks[ix])
+            previous = ix
+        if previous != len(chunks) - 1:
+            parts.append("[...]")
+        self._store(message.tool_call_id, chunks)
+        parts.append(
+            f"[Observation shortened to {len(kept)} of {len(chunks)} chunks (~{size} of {tokens} tokens), "
+            f"ranked by relevance. Use read_observation with observation_id='{message.tool_call_id}' "
+            f"and cursor=0 to read it in order.]"
+        )
+        content = "\n".join(parts)
+
+        self.shortened += 1
+        self.kept_tokens += estimate_tokens(content)
+        metadata = {**message.response_metadata,
+                    "observation_budget": {"original_tokens": tokens, "kept_tokens": estimate_tokens(content)}}
+        return message.model_copy(update={"content": content, "response_metadata": metadata})
+
+    def read_observation(self, observation_id: str, cursor: int = 0) -> str:
+        """
+        Reads a shortened observation in its original order, starting at the given chunk. Use this when a
+        shortened observation may hold more information you need. The result ends with the cursor to
+        continue from.
+        """
+        chunks = self._stored.get(observation_id)
+        if chunks is None:
+            # Kept in memory only, ids of a thread resumed after a restart or of long ago have expired
+            return ToolError(f"Error: The observation with id '{observation_id}' has expired or never existed, "
+                             f"full observations are only kept for a while and not across restarts. Call the tool "
+                             f"that produced it again to get its text.")
+        if not 0 <= cursor < len(chunks):
+            return ToolError(f"Error: Cursor must be between 0 and {len(chunks) - 1}.")
+        parts, size, end = [], 0, cursor
+        while end < len(chunks) and (not parts or size + estimate_tokens(chunks[end]) <= self.max_tokens):
+            parts.append(chunks[end])
+            size += estimate_tokens(chunks[end])
+            end += 1
+        footer = f"[Next cursor: {end}]" if end < len(chunks) else "[End of observation]"
+        return "\n".join([*parts, f"[Chunks {cursor}-{end - 1} of {len(chunks)}] {footer}"])
+
+    def get_tools(self):
+        """Returns the tool the agent uses to page through shortened observations."""
+        return [tool(self.read_observation, args_schema=ReadObservationInput)]
@@ -1,14 +1,728 @@
-from langgraph.store.memory import InMemoryStore, IndexConfig
+import bisect
+import json
+import operator
+import os
+import re
+import sqlite3
+import threading
+from contextlib import nullcontext
+from datetime import datetime, timezone
+from typing import Any, Iterable, Iterator, Literal, NamedTuple
+
+import numpy as np
+from langgraph.store.base import (
+    BaseStore, GetOp, IndexConfig, Item, ListNamespacesOp, MatchCondition, Op, PutOp, Result, SearchItem, SearchOp,
+    ensure_embeddings, get_text_at_path, tokenize_path,
+)
+from langchain_core.embeddings import Embeddings
 from langchain_google_genai import GoogleGenerativeAIEmbeddings
 
+from src.agent.embeddings import CachedEmbeddings
+from src.agent.tracing import span
+from src.agent.vector_index import VectorIndex
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    value TEXT NOT NULL,
+    created_at TEXT NOT NULL,
+    updated_at TEXT NOT NULL,
+    accessed_at TEXT,
+    hits INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (namespace, key)
+);
+CREATE TABLE IF NOT EXISTS vectors (
+    row INTEGER PRIMARY KEY,
+    namespace TEXT NOT NULL,
+    key TEXT NOT NULL,
+    path TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS vectors_by_item ON vectors (namespace, key);
+CREATE TABLE IF NOT EXISTS meta (
+    name TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+"""
+
+
+# Full text index of the items' values, its rowids are those of the items table
+_LEXICAL_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS items_fts USING fts5(text, tokenize = 'porter unicode61')"
+_TOKEN = re.compile(r"\w+")
+# Columns added to the items table since its first version, added to older stores when opened
+_ITEM_COLUMNS = {"accessed_at": "TEXT", "hits": "INTEGER NOT NULL DEFAULT 0"}
+
+
+class ItemUsage(NamedTuple):
+    namespace: tuple[str, ...]
+    key: str
+    updated_at: str
+    # When the item was last returned by a get or search, None if never
+    accessed_at: str | None
+    hits: int
+
+    @property
+    def last_used(self) -> str:
+        return max(self.updated_at, self.accessed_at or self.updated_at)
+
+
+def _encode_namespace(namespace: tuple[str, ...]) -> str:
+    # Namespace labels are validated by BaseStore to never contain periods.
+    return ".".join(namespace)
+
+
+def _decode_namespace(namespace: str) -> tuple[str, ...]:
+    return tuple(namespace.split("."))
+
+
+def _prefix_clause(namespace_prefix: tuple[str, ...]) -> tuple[str, list[str]]:
+    """Builds an SQL condition matching every namespace under the given prefix."""
+    if not namespace_prefix:
+        return "1", []
+    encoded = _encode_namespace(namespace_prefix)
+    escaped = encoded.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return "(namespace = ? OR namespace LIKE ? ESCAPE '\\')", [encoded, f"{escaped}.%"]
+
+
+_OPERATORS = {"$eq": operator.eq, "$ne": operator.ne}
+_NUMERIC_OPERATORS = {"$gt": operator.gt, "$gte": operator.ge, "$lt": operator.lt, "$lte": operator.le}
+
+
+def _matches_filter(value: Any, condition: Any) -> bool:
+    """
+    Whether a value matches a search filter, with the semantics of LangGraph's own stores: dicts match
+    nested, lists element by element, and a dict of "$" operators compares the value (numerically for
+    the ordering ones).
+    """
+    if isinstance(condition, dict):
+        if any(key.startswith("$") for key in condition):
+            for name, operand in condition.items():
+                if name in _OPERATORS:
+                    matched = _OPERATORS[name](value, operand)
+                elif name in _NUMERIC_OPERATORS:
+                    matched = _NUMERIC_OPERATORS[name](float(value), float(operand))
+                else:
+                    raise ValueError(f"Unsupported operator: {name}")
+                if not matched:
+                    return False
+            return True
+        return isinstance(value, dict) and all(_matches_filter(value.get(k), v) for k, v in condition.items())
+    if isinstance(condition, (list, tuple)):
+        return (isinstance(value, (list, tuple)) and len(value) == len(condition)
+                and all(_matches_filter(v, c) for v, c in zip(value, condition)))
+    return value == condition
+
+
+def _matches_namespace(condition: MatchCondition, namespace: tuple[str, ...]) -> bool:
+    """Whether a namespace matches a prefix or suffix condition of list_namespaces, "*" matching any label."""
+    if condition.match_type not in ("prefix", "suffix"):
+        raise ValueError(f"Unsupported match type: {condition.match_type}")
+    if len(namespace) < len(condition.path):
+        return False
+    labels = namespace if condition.match_type == "prefix" else namespace[len(namespace) - len(condition.path):]
+    return all(pattern in ("*", label) for label, pattern in zip(labels, condition.path))
+
+
+def _lexical_text(value: Any) -> str:
+    """The text of every string and number in a value, keys and JSON syntax left out."""
+    if isinstance(value, dict):
+        return " ".join(_lexical_text(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        return " ".join(_lexical_text(v) for v in value)
+    return "" if value is None or isinstance(value, bool) else str(value)
+
+
+def _match_expression(query: str, match_all: bool) -> str | None:
+    """An FTS5 query for the words of a free text query, every word quoted so none is read as syntax."""
+    tokens = list(dict.fromkeys(token.lower() for token in _TOKEN.findall(query)))
+    if not tokens:
+        return None
+    return (" " if match_all else " OR ").join(f'"{token}"' for token in tokens)
+
+
+def _best_first(scores: np.ndarray, top: int) -> Iterator[int]:
+    """
+    Indices of the scores from best to worst. Only the `top` best are sorted up front, the rest only once
+    a search gets past them, e.g. because its filter or duplicate vectors of an item skipped many.
+    """
+    if len(scores) <= 2 * top:
+        yield from np.argsort(-scores, kind="stable").tolist()
+        return
+    best = np.argpartition(-scores, top)[:top]
+    best = best[np.argsort(-scores[best], kind="stable")]
+    yield from best.tolist()
+    rest = np.ones(len(scores), dtype=bool)
+    rest[best] = False
+    remaining = np.flatnonzero(rest)
+    yield from remaining[np.argsort(-scores[remaining], kind="stable")].tolist()
+
+
+class VectorMatrix:
+    """A growable float32 matrix of unit-normalized embeddings backed by a memory-mapped file."""
+
+    initial_rows = 256
+
+    def __init__(self, path: str, dims: int):
+        self.path = path
+        self.dims = dims
+        if not os.path.exists(path) or os.path.getsize(path) == 0:
+            self._resize_file(self.initial_rows)
+        self.data = self._map()
+
+    @property
+    def capacity(self) -> int:
+        return self.data.shape[0]
+
+    def _resize_file(self, rows: int):
+        with open(self.path, "ab") as f:
+            f.truncate(rows * self.dims * 4)
+
+    def _map(self) -> np.memmap:
+        rows = os.path.getsize(self.path) // (self.dims * 4)
+        return np.memmap(self.path, dtype=np.float32, mode="r+", shape=(rows, self.dims))
+
+    def write(self, row: int, vector: list[float]):
+        if row >= self.capacity:
+            self.data.flush()
+            self._resize_file(max(row + 1, self.capacity * 2))
+            self.data = self._map()
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        self.data[row] = array / norm if norm else array
+
+    def scores(self, rows: np.ndarray, query: np.ndarray) -> np.ndarray:
+        """Cosine similarity of the query against the given rows, as one matrix-vector product."""
+        return self.data[rows] @ query
+
+    def flush(self):
+        self.data.flush()
+
+
+class SQLiteVectorStore(BaseStore):
+    """
+    Durable store keeping items in SQLite and their embeddings in a memory-mapped float32 matrix.
+
+    Only the row bookkeeping is loaded on startup, vectors are never re-embedded. Semantic search
+    scores the rows of the matching namespaces its vector index picks with a single vectorized product,
+    by default all of them. Values are also kept in a full text index for keyword lookups with BM25
+    ranking (`lexical_search`), which need no embedding at all.
+    """
+
+    __slots__ = ("path", "index_config", "embeddings", "_fields", "_conn", "_lock", "_matrix", "_rows",
+                 "_row_cache", "_free_rows", "_next_row", "vector_index", "lexical", "_accesses")
+
+    def __init__(self, path: str, *, index: IndexConfig | None = None, vector_index: VectorIndex | None = None):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._conn = sqlite3.connect(os.path.join(path, "store.sqlite"), check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+        self._add_item_columns()
+        self._lock = threading.RLock()
+        # (encoded namespace, key) -> reads since the last flush, and when the last one was
+        self._accesses: dict[tuple[str, str], tuple[int, str]] = {}
+        self.lexical = self._init_lexical_index()
+        self.index_config = index
+        self.embeddings = None
+        self._matrix = None
+        if index:
+            self.embeddings = ensure_embeddings(index.get("embed"))
+            self._fields = [(p, tokenize_path(p)) if p != "$" else (p, p) for p in (index.get("fields") or ["$"])]
+            self._matrix = VectorMatrix(os.path.join(path, "vectors.f32"), self._check_dims(index["dims"]))
+        # namespace -> key -> matrix rows holding that item's vectors
+        self._rows: dict[tuple[str, ...], dict[str, list[int]]] = {}
+        self._row_cache: dict[tuple[str, ...], tuple[np.ndarray, list[str]]] = {}
+        self._load_rows()
+        self.vector_index = vector_index or VectorIndex()
+        self.vector_index.attach(self._matrix, self._namespace_rows, self._lock)
+
+    def _check_dims(self, dims: int) -> int:
+        stored = self._conn.execute("SELECT value FROM meta WHERE name = 'dims'").fetchone()
+        if stored is None:
+            self._conn.execute("INSERT INTO meta (name, value) VALUES ('dims', ?)", (str(dims),))
+            self._conn.commit()
+        elif int(stored[0]) != dims:
+            raise ValueError(f"Store at '{self.path}' holds {stored[0]}-dimensional vectors, got dims={dims}")
+        return dims
+
+    def _add_item_columns(self):
+        columns = {name for _, name, *_ in self._conn.execute("PRAGMA table_info(items)")}
+        for name, definition in _ITEM_COLUMNS.items():
+            if name not in columns:
+                self._conn.execute(f"ALTER TABLE items ADD COLUMN {name} {definition}")
+        self._conn.commit()
+
+    def _init_lexical_index(self) -> bool:
+        """Creates the full text index, filling it from the items of a store created before it existed."""
+        try:
+            self._conn.execute(_LEXICAL_SCHEMA)
+        except sqlite3.OperationalError:
+            return False  # SQLite built without FTS5, lexical_search finds nothing
+        if self._conn.execute("SELECT 1 FROM meta WHERE name = 'lexical_index'").fetchone() is None:
+            cursor = self._conn.execute("SELECT rowid, value FROM items")
+            while batch := cursor.fetchmany(10_000):
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO items_fts (rowid, text) VALUES (?, ?)",
+                    [(rowid, _lexical_text(json.loads(value))) for rowid, value in batch]
+                )
+            self._conn.execute("INSERT INTO meta (name, value) VALUES ('lexical_index', '1')")
+            self._conn.commit()
+        return True
+
+    def _load_rows(self):
+        used = set()
+        for row, namespace, key in self._conn.execute("SELECT row, namespace, key FROM vectors"):
+            self._rows.setdefault(_decode_namespace(namespace), {}).setdefault(key, []).append(row)
+            used.add(row)
+        self._next_row = max(used) + 1 if used else 0
+        self._free_rows = sorted(set(range(self._next_row)) - used, reverse=True)
+
+    # Row bookkeeping
 
-def get_store_with_embeddings(google_embeddings_model: str, fields: list[str] | None = None) -> InMemoryStore:
-    embeddings_model = GoogleGenerativeAIEmbeddings(model=google_embeddings_model)
-    memory_store = InMemoryStore(
+    def _allocate_row(self) -> int:
+        if self._free_rows:
+            return self._free_rows.pop()
+        self._next_row += 1
+        return self._next_row - 1
+
+    def _release_rows(self, namespace: tuple[str, ...], key: str):
+        rows = self._rows.get(namespace, {}).pop(key, None)
+        if not rows:
+            return
+        self._free_rows.extend(rows)
+        self._row_cache.pop(namespace, None)
+        self.vector_index.remove(namespace, rows)
+        self._conn.execute(
+            "DELETE FROM vectors WHERE namespace = ? AND key = ?", (_encode_namespace(namespace), key)
+        )
+
+    def _namespace_rows(self, namespace: tuple[str, ...]) -> tuple[np.ndarray, list[str]]:
+        """Returns the matrix rows of a namespace and the item key of each row."""
+        if namespace not in self._row_cache:
+            keys, rows = [], []
+            for key, key_rows in self._rows.get(namespace, {}).items():
+                keys.extend([key] * len(key_rows))
+                rows.extend(key_rows)
+            self._row_cache[namespace] = (np.asarray(rows, dtype=np.int64), keys)
+        return self._row_cache[namespace]
+
+    # Batch execution
+
+    def batch(self, ops: Iterable[Op]) -> list[Result]:
+        ops = list(ops)
+        queries, texts = self._texts_to_embed(ops)
+        with self._embed_span(queries, texts):
+            query_vectors = {query: self.embeddings.embed_query(query) for query in queries}
+            text_vectors = dict(zip(texts, self.embeddings.embed_documents(texts))) if texts else {}
+        with span("store", self._span_name(ops), ops=len(ops)):
+            return self._execute(ops, query_vectors, text_vectors)
+
+    async def abatch(self, ops: Iterable[Op]) -> list[Result]:
+        ops = list(ops)
+        queries, texts = self._texts_to_embed(ops)
+        with self._embed_span(queries, texts):
+            query_vectors = {query: await self.embeddings.aembed_query(query) for query in queries}
+            text_vectors = dict(zip(texts, await self.embeddings.aembed_documents(texts))) if texts else {}
+        with span("store", self._span_name(ops), ops=len(ops)):
+            return self._execute(ops, query_vectors, text_vectors)
+
+    @staticmethod
+    def _embed_span(queries: list[str], texts: list[str]):
+        # Gets and puts without an index embed nothing, a span for them would only be noise
+        return span("embed", "store", queries=len(queries), texts=len(texts)) if queries or texts else nullcontext()
+
+    @staticmethod
+    def _span_name(ops: list[Op]) -> str:
+        return "+".join(sorted({type(op).__name__.removesuffix("Op").lower() for op in ops}))
+
+    def _index_texts(self, op: PutOp) -> list[tuple[str, str]]:
+        """Returns the (path, text) pairs of a put operation that need embedding."""
+        if not self.embeddings or op.value is None or op.index is False:
+            return []
+        paths = self._fields if op.index is None else [(ix, tokenize_path(ix)) for ix in op.index]
+        pairs = []
+        for path, field in paths:
+            texts = get_text_at_path(op.value, field)
+            if len(texts) > 1:
+                pairs.extend((f"{path}.{i}", text) for i, text in enumerate(texts))
+            elif texts:
+                pairs.append((path, texts[0]))
+        return pairs
+
+    def _texts_to_embed(self, ops: list[Op]) -> tuple[list[str], list[str]]:
+        if not self.embeddings:
+            return [], []
+        queries = {op.query: None for op in ops if isinstance(op, SearchOp) and op.query}
+        texts = {text: None for op in ops if isinstance(op, PutOp) for _, text in self._index_texts(op)}
+        return list(queries), list(texts)
+
+    def _execute(
+        self, ops: list[Op], query_vectors: dict[str, list[float]], text_vectors: dict[str, list[float]]
+    ) -> list[Result]:
+        results: list[Result] = []
+        with self._lock:
+            wrote = False
+            for op in ops:
+                if isinstance(op, GetOp):
+                    item = self._get(op.namespace, op.key)
+                    # A read with refresh_ttl=False, e.g. by the store maintenance, doesn't count as a use
+                    self._record_access([item] if item and op.refresh_ttl else [])
+                    results.append(item)
+                elif isinstance(op, SearchOp):
+                    items = self._search(op, query_vectors.get(op.query))
+                    self._record_access(items if op.refresh_ttl else [])
+                    results.append(items)
+                elif isinstance(op, ListNamespacesOp):
+                    results.append(self._list_namespaces(op))
+                elif isinstance(op, PutOp):
+                    self._put(op, text_vectors)
+                    results.append(None)
+                    wrote = True
+                else:
+                    raise ValueError(f"Unknown operation type: {type(op)}")
+            if wrote:
+                self._flush_accesses()
+                # Vectors hit the disk before the rows that reference them are committed.
+                if self._matrix is not None:
+                    self._matrix.flush()
+                self._conn.commit()
+        return results
+
+    # Access tracking, reads are counted in memory and written along with the next write
+
+    def _record_access(self, items: list[Item]):
+        if not items:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+        for item in items:
+            ident = (_encode_namespace(item.namespace), item.key)
+            self._accesses[ident] = (self._accesses.get(ident, (0, now))[0] + 1, now)
+
+    def _flush_accesses(self):
+        if not self._accesses:
+            return
+        accesses, self._accesses = self._accesses, {}
+        self._conn.executemany(
+            "UPDATE items SET accessed_at = ?, hits = hits + ? WHERE namespace = ? AND key = ?",
+            [(accessed_at, hits, namespace, key) for (namespace, key), (hits, accessed_at) in accesses.items()]
+        )
+
+    def flush_accesses(self):
+        """Writes the reads counted since the last write to the items' access times and hit counts."""
+        with self._lock:
+            self._flush_accesses()
+            self._conn.commit()
+
+    # Operations
+
+    def _get(self, namespace: tuple[str, ...], key: str) -> Item | None:
+        row = self._conn.execute(
+            "SELECT value, created_at, updated_at FROM items WHERE namespace = ? AND key = ?",
+            (_encode_namespace(namespace), key)
+        ).fetchone()
+        if row is None:
+            return None
+        return Item(value=json.loads(row[0]), key=key, namespace=namespace, created_at=row[1], updated_at=row[2])
+
+    def _put(self, op: PutOp, text_vectors: dict[str, list[float]]):
+        encoded = _encode_namespace(op.namespace)
+        self._release_rows(op.namespace, op.key)
+        if op.value is None:
+            if self.lexical:
+                self._conn.execute(
+                    "DELETE FROM items_fts WHERE rowid = (SELECT rowid FROM items WHERE namespace = ? AND key = ?)",
+                    (encoded, op.key)
+                )
+            self._conn.execute("DELETE FROM items WHERE namespace = ? AND key = ?", (encoded, op.key))
+            return
+
+        now = datetime.now(timezone.utc).isoformat()
+        self._conn.execute(
+            "INSERT INTO items (namespace, key, value, created_at, updated_at) VALUES (?, ?, ?, ?, ?) "
+            "ON CONFLICT (namespace, key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at",
+            (encoded, op.key, json.dumps(op.value), now, now)
+        )
+        if self.lexical:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO items_fts (rowid, text) "
+                "SELECT rowid, ? FROM items WHERE namespace = ? AND key = ?",
+                (_lexical_text(op.value), encoded, op.key)
+            )
+        rows = []
+        for path, text in self._index_texts(op):
+            vector = text_vectors[text]
+            if len(vector) != self._matrix.dims:
+                raise ValueError(f"Expected {self._matrix.dims}-dimensional embeddings, got {len(vector)}")
+            row = self._allocate_row()
+            self._matrix.write(row, vector)
+            self._conn.execute(
+                "INSERT INTO vectors (row, namespace, key, path) VALUES (?, ?, ?, ?)", (row, encoded, op.key, path)
+            )
+            rows.append(row)
+        if rows:
+            self._rows.setdefault(op.namespace, {})[op.key] = rows
+            self._row_cache.pop(op.namespace, None)
+            self.vector_index.add(op.namespace, op.key, rows)
+
+    def _vector_namespaces_under(self, namespace_prefix: tuple[str, ...]) -> list[tuple[str, ...]]:
+        # From the row bookkeeping, scanning the items table for its namespaces took most of a search
+        return [namespace for namespace in self._rows if namespace[:len(namespace_prefix)] == namespace_prefix]
+
+    def _matches_filter(self, item: Item, op: SearchOp) -> bool:
+        return not op.filter or all(
+            _matches_filter(item.value.get(key), value) for key, value in op.filter.items()
+        )
+
+    def _search(self, op: SearchOp, query_vector: list[float] | None) -> list[SearchItem]:
+        scored: list[tuple[float | None, Item]] = []
+        if query_vector is not None:
+            scored = self._vector_search(op, query_vector)
+            if len(scored) >= op.limit:
+                return [self._search_item(item, score) for score, item in scored]
+
+        # Items without vectors (or a search without a query) are listed in insertion order.
+        seen = {(item.namespace, item.key) for _, item in scored}
+        clause, params = _prefix_clause(op.namespace_prefix)
+        cursor = self._conn.execute(
+            f"SELECT namespace, key, value, created_at, updated_at FROM items WHERE {clause} ORDER BY rowid", params
+        )
+        skip = op.offset if query_vector is None else 0
+        for namespace, key, value, created_at, updated_at in cursor:
+            namespace = _decode_namespace(namespace)
+            if (namespace, key) in seen or (query_vector is not None and key in self._rows.get(namespace, {})):
+                continue
+            item = Item(value=json.loads(value), key=key, namespace=namespace,
+                        created_at=created_at, updated_at=updated_at)
+            if not self._matches_filter(item, op):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            scored.append((None, item))
+            if len(scored) >= op.limit:
+                break
+        return [self._search_item(item, score) for score, item in scored]
+
+    def _vector_search(self, op: SearchOp, query_vector: list[float]) -> list[tuple[float, Item]]:
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        query = query / norm if norm else query
+
+        # The candidates of each namespace, keys are only looked up for the rows that make it to the top
+        row_arrays, segments, starts, total = [], [], [], 0
+        for namespace in self._vector_namespaces_under(op.namespace_prefix):
+            rows, keys = self.vector_index.candidates(namespace, query, op.limit + op.offset)
+            if len(rows):
+                row_arrays.append(rows)
+                segments.append((namespace, keys))
+                starts.append(total)
+                total += len(rows)
+        if not total:
+            return []
+        rows = np.concatenate(row_arrays)
+        scores = self._matrix.scores(rows, query)
+
+        # Max pooling over the vectors of each item, best first.
+        kept: list[tuple[float, Item]] = []
+        seen = set()
+        skip = op.offset
+        for ix in _best_first(scores, 4 * (op.limit + op.offset)):
+            segment = bisect.bisect_right(starts, ix) - 1
+            namespace, keys = segments[segment]
+            key = keys[ix - starts[segment]]
+            if (namespace, key) in seen:
+                continue
+            seen.add((namespace, key))
+            item = self._get(namespace, key)
+            if item is None or not self._matches_filter(item, op):
+                continue
+            if skip:
+                skip -= 1
+                continue
+            kept.append((float(scores[ix]), item))
+            if len(kept) >= op.limit:
+                break
+        return kept
+
+    def lexical_search(
+        self, namespace_prefix: tuple[str, ...], query: str, limit: int = 10, match_all: bool = False
+    ) -> list[SearchItem]:
+        """
+        Items under the prefix holding words of the query, best BM25 score first. Words are matched after
+        stemming, so 'movies' finds 'movie'. With `match_all` only items holding every word are returned.
+        """
+        expression = _match_expression(query, match_all)
+        if not self.lexical or expression is None:
+            return []
+        clause, params = _prefix_clause(namespace_prefix)
+        with span("store", "lexical_search", match_all=match_all), self._lock:
+            cursor = self._conn.execute(
+                "SELECT items.namespace, items.key, items.value, items.created_at, items.updated_at, "
+                "bm25(items_fts) FROM items_fts JOIN items ON items.rowid = items_fts.rowid "
+                f"WHERE items_fts MATCH ? AND {clause} ORDER BY bm25(items_fts) LIMIT ?",
+                [expression, *params, limit]
+            )
+            items = [
+                SearchItem(namespace=_decode_namespace(namespace), key=key, value=json.loads(value),
+                           created_at=created_at, updated_at=updated_at, score=-rank)
+                for namespace, key, value, created_at, updated_at, rank in cursor
+            ]
+            self._record_access(items)
+            return items
+
+    # Maintenance
+
+    def usage(self, namespace_prefix: tuple[str, ...] = ()) -> list[ItemUsage]:
+        """When each item under the prefix was last written and read, and how often it was read."""
+        clause, params = _prefix_clause(namespace_prefix)
+        with self._lock:
+            self._flush_accesses()
+            self._conn.commit()
+            rows = self._conn.execute(
+                f"SELECT namespace, key, updated_at, accessed_at, hits FROM items WHERE {clause}", params
+            ).fetchall()
+        return [ItemUsage(_decode_namespace(namespace), *rest) for namespace, *rest in rows]
+
+    def nearest(
+        self, namespace: tuple[str, ...], value: dict[str, Any], limit: int = 1,
+        index: Literal[False] | list[str] | None = None
+    ) -> list[SearchItem]:
+        """
+        Items of the namespace closest to a value by the vectors it would get when put, i.e. its
+        near-duplicates. Its texts are embedded like a put's, so putting it afterwards embeds nothing again.
+        """
+        texts = list(dict.fromkeys(text for _, text in self._index_texts(PutOp(namespace, "", value, index))))
+        if not texts:
+            return []
+        with self._embed_span([], texts):
+            vectors = np.asarray(self.embeddings.embed_documents(texts), dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.where(norms == 0, 1, norms)
+
+        with span("store", "nearest"), self._lock:
+            best: dict[str, float] = {}
+            for vector in vectors:
+                rows, keys = self.vector_index.candidates(namespace, vector, limit)
+                if not len(rows):
+                    continue
+                scores = self._matrix.scores(rows, vector)
+                found = 0
+                for ix in _best_first(scores, 4 * limit):
+                    key, score = keys[ix], float(scores[ix])
+                    found += key not in best
+                    best[key] = max(best.get(key, score), score)
+                    if found >= limit:
+                        break
+            items = []
+            for key in sorted(best, key=best.get, reverse=True)[:limit]:
+                item = self._get(namespace, key)
+                if item is not None:
+                    items.append(self._search_item(item, best[key]))
+            return items
+
+    def similar_pairs(
+        self, namespace: tuple[str, ...], threshold: float, max_group_size: int = 20_000
+    ) -> list[tuple[str, str, float]]:
+        """
+        Pairs of items of the namespace with vectors at least `threshold` similar, and their best similarity.
+        Only rows of the same vector index group are compared, i.e. the IVF cluster of a large namespace,
+        and groups over `max_group_size` rows are skipped so a run stays far from comparing every pair.
+        Each group is compared blockwise, outside the lock so searches aren't held up.
+        """
+        if self._matrix is None:
+            return []
+        with self._lock:
+            groups = self.vector_index.groups(namespace)
+        pairs: dict[tuple[str, str], float] = {}
+        with span("store", "similar_pairs", rows=sum(len(rows) for rows, _ in groups), groups=len(groups)):
+            for rows, keys in groups:
+                if len(rows) < 2 or len(rows) > max_group_size:
+                    continue
+                with self._lock:
+                    vectors = np.asarray(self._matrix.data[rows])
+                for start in range(0, len(rows), 1024):
+                    scores = vectors[start:start + 1024] @ vectors.T
+                    for i, j in zip(*np.nonzero(scores >= threshold)):
+                        first, second = keys[start + i], keys[j]
+                        if first < second:
+                            pairs[first, second] = max(pairs.get((first, second), -1.0), float(scores[i, j]))
+        return [(first, second, score) for (first, second), score in pairs.items()]
+
+    @property
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            items, namespaces = self._conn.execute("SELECT COUNT(*), COUNT(DISTINCT namespace) FROM items").fetchone()
+            vectors = sum(len(rows) for keys in self._rows.values() for rows in keys.values())
+            database = os.path.join(self.path, "store.sqlite")
+            return {
+                "items": items,
+                "namespaces": namespaces,
+                "vectors": vectors,
+                "free_vector_rows": len(self._free_rows) + self._matrix.capacity - self._next_row
+                if self._matrix is not None else 0,
+                "database_bytes": sum(os.path.getsize(p) for p in (database, f"{database}-wal") if os.path.exists(p)),
+                "vector_bytes": self._matrix.capacity * self._matrix.dims * 4 if self._matrix is not None else 0,
+                **self.vector_index.stats,
+            }
+
+    @staticmethod
+    def _search_item(item: Item, score: float | None) -> SearchItem:
+        return SearchItem(namespace=item.namespace, key=item.key, value=item.value,
+                          created_at=item.created_at, updated_at=item.updated_at, score=score)
+
+    def _list_namespaces(self, op: ListNamespacesOp) -> list[tuple[str, ...]]:
+        namespaces = [_decode_namespace(ns) for ns, in self._conn.execute("SELECT DISTINCT namespace FROM items")]
+        if op.match_conditions:
+            namespaces = [
+                ns for ns in namespaces if all(_matches_namespace(condition, ns) for condition in op.match_conditions)
+            ]
+        if op.max_depth is not None:
+            namespaces = sorted({ns[:op.max_depth] for ns in namespaces})
+        else:
+            namespaces = sorted(namespaces)
+        return namespaces[op.offset:op.offset + op.limit]
+
+    def close(self):
+        self.vector_index.wait_for_builds()
+        with self._lock:
+            self._flush_accesses()
+            self._conn.commit()
+            if self._matrix is not None:
+                self._matrix.flush()
+            self._conn.close()
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(path={self.path!r})"
+
+
+def get_store_with_embeddings(
+    google_embeddings_model: str, path: str, dims: int = 768, fields: list[str] | None = None,
+    cache_size: int = 50_000, embeddings: Embeddings | None = None, vector_index: VectorIndex | None = None
+) -> SQLiteVectorStore:
+    """Builds the store with cached Google embeddings, or with the given `embeddings` model instead."""
+    os.makedirs(path, exist_ok=True)
+    # Google embeds a batch of queries through embed_documents with a task type, other models take no such argument
+    query_batch_kwargs = None
+    if embeddings is None:
+        embeddings, model_name = GoogleGenerativeAIEmbeddings(model=google_embeddings_model), google_embeddings_model
+        query_batch_kwargs = {"task_type": "RETRIEVAL_QUERY"}
+    else:
+        # The override's own identity keys the cache, so its vectors and the Google model's are never mixed up
+        model = getattr(embeddings, "model", None) or getattr(embeddings, "model_name", None)
+        model_name = f"{type(embeddings).__module__}.{type(embeddings).__qualname__}:{model or ''}:{dims}"
+    embeddings_model = CachedEmbeddings(
+        embeddings,
+        model_name=model_name,
+        path=os.path.join(path, "embeddings.sqlite"),
+        max_entries=cache_size,
+        query_batch_kwargs=query_batch_kwargs
+    )
+    memory_store = SQLiteVectorStore(
+        path,
         index=IndexConfig(
             embed=embeddings_model,
-            dims=1024,
+            dims=dims,
             fields=fields or ["$"]
-        )
+        ),
+        vector_index=vector_index
     )
     return memory_store
@@ -0,0 +1,182 @@
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from langgraph.store.base import PutOp
+
+from src.agent.store import ItemUsage, SQLiteVectorStore
+from src.config import StorePolicy
+
+# Deletes and merges written per store batch, so searches get the lock in between
+_BATCH = 1000
+
+
+def merge_values(values: list[dict[str, Any]]) -> dict[str, Any]:
+    """
+    One value out of related ones, oldest first. Text fields that differ are joined so no fact is lost,
+    any other field takes its newest value.
+    """
+    merged = {}
+    for field in dict.fromkeys(field for value in values for field in value):
+        present = [value[field] for value in values if field in value]
+        texts = list(dict.fromkeys(present)) if all(isinstance(p, str) for p in present) else []
+        merged[field] = "\n".join(texts) if len(texts) > 1 else present[-1]
+    return merged
+
+
+class StoreMaintenance:
+    """
+    Keeps the agent's memory from piling up, by the policy of each namespace's longest matching prefix.
+
+    Puts through the store tools update a near-duplicate memory instead of adding another one. A background
+    run removes items not written or read for longer than their TTL, evicts the least recently or least
+    often read ones beyond the namespace's size cap, then merges clusters of related memories into one.
+    """
+
+    def __init__(self, store: SQLiteVectorStore, policies: dict[str, StorePolicy]):
+        """
+        :param store: the store to maintain
+        :param policies: the policy of each namespace prefix, e.g. "user_id.memories", "" for all others
+        """
+        self.store = store
+        self.policies = {tuple(prefix.split(".")) if prefix else (): policy for prefix, policy in policies.items()}
+        self.deduplicated = 0
+        self.expired = 0
+        self.evicted = 0
+        self.merged = 0
+        self.runs = 0
+        self.errors = 0
+        self.last_run_time = 0.0
+        self._run_lock = threading.Lock()
+        self._stop: threading.Event | None = None
+
+    def policy(self, namespace: tuple[str, ...]) -> StorePolicy:
+        prefixes = [prefix for prefix in self.policies if namespace[:len(prefix)] == prefix]
+        return self.policies[max(prefixes, key=len)] if prefixes else StorePolicy()
+
+    @property
+    def stats(self) -> dict[str, float]:
+        return {
+            "deduplicated": self.deduplicated,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            "merged": self.merged,
+            "runs": self.runs,
+            "errors": self.errors,
+            "last_run_time": self.last_run_time,
+            **self.store.stats,
+        }
+
+    def deduplicate(self, namespace: tuple[str, ...], key: str, value: dict[str, Any]) -> tuple[str, dict[str, Any]]:
+        """
+        The key and value a put should write: those of the closest other memory updated with the new value
+        if it is a near-duplicate, else the ones given.
+        """
+        threshold = self.policy(namespace).dedup_threshold
+        if threshold is None:
+            return key, value
+        for item in self.store.nearest(namespace, value):
+            if item.key != key and item.score >= threshold:
+                self.deduplicated += 1
+                return item.key, {**item.value, **value}
+        return key, value
+
+    def _delete(self, items: list[ItemUsage]):
+        for start in range(0, len(items), _BATCH):
+            self.store.batch([PutOp(item.namespace, item.key, None) for item in items[start:start + _BATCH]])
+
+    def evict(self) -> int:
+        """Removes the expired items and those beyond the size cap of each namespace, returns how many."""
+        by_namespace: dict[tuple[str, ...], list[ItemUsage]] = defaultdict(list)
+        for item in self.store.usage():
+            by_namespace[item.namespace].append(item)
+
+        now = datetime.now(timezone.utc)
+        expired, evicted = [], []
+        for namespace, items in by_namespace.items():
+            policy = self.policy(namespace)
+            if policy.ttl is not None:
+                cutoff = (now - timedelta(seconds=policy.ttl)).isoformat()
+                expired.extend(item for item in items if item.last_used < cutoff)
+                items = [item for item in items if item.last_used >= cutoff]
+            if policy.max_items is not None and len(items) > policy.max_items:
+                if policy.eviction == "lfu":
+                    items.sort(key=lambda item: (item.hits, item.last_used))
+                else:
+                    items.sort(key=lambda item: item.last_used)
+                evicted.extend(items[:len(items) - policy.max_items])
+        self._delete(expired + evicted)
+        self.expired += len(expired)
+        self.evicted += len(evicted)
+        return len(expired) + len(evicted)
+
+    def _clusters(self, namespace: tuple[str, ...], threshold: float) -> list[list[str]]:
+        """Keys of the namespace connected by similar pairs, union-find over the pairs."""
+        parent: dict[str, str] = {}
+
+        def find(key: str) -> str:
+            while parent.setdefault(key, key) != key:
+                parent[key] = parent[parent[key]]
+                key = parent[key]
+            return key
+
+        for first, second, _ in self.store.similar_pairs(namespace, threshold):
+            parent[find(first)] = find(second)
+        clusters: dict[str, list[str]] = defaultdict(list)
+        for key in parent:
+            clusters[find(key)].append(key)
+        return [keys for keys in clusters.values() if len(keys) > 1]
+
+    def compact(self) -> int:
+        """
+        Merges each cluster of related memories into its most recently updated one, returns how many
+        memories were merged away.
+        """
+        merged = 0
+        for namespace in dict.fromkeys(item.namespace for item in self.store.usage()):
+            threshold = self.policy(namespace).merge_threshold
+            if threshold is None:
+                continue
+            for keys in self._clusters(namespace, threshold):
+                items = [self.store.get(namespace, key, refresh_ttl=False) for key in keys]
+                items = sorted((item for item in items if item is not None), key=lambda item: item.updated_at)
+                if len(items) < 2:
+                    continue
+                self.store.batch(
+                    [PutOp(namespace, items[-1].key, merge_values([item.value for item in items]))]
+                    + [PutOp(namespace, item.key, None) for item in items[:-1]]
+                )
+                merged += len(items) - 1
+        self.merged += merged
+        return merged
+
+    def run(self) -> dict[str, int]:
+        """One maintenance pass, eviction first so nothing about to be removed is merged."""
+        with self._run_lock:
+            start = time.perf_counter()
+            removed = self.evict()
+            merged = self.compact()
+            self.runs += 1
+            self.last_run_time = time.perf_counter() - start
+        return {"removed": removed, "merged": merged}
+
+    def start(self, interval: float = 300.0):
+        """Runs the maintenance every `interval` seconds in a daemon thread."""
+        if self._stop is not None:
+            return
+        self._stop = stop = threading.Event()
+
+        def run():
+            while not stop.wait(interval):
+                try:
+                    self.run()
+                except Exception:
+                    # E.g. the embedding provider being down while merging, the next run tries again
+                    self.errors += 1
+        threading.Thread(target=run, name="store-maintenance", daemon=True).start()
+
+    def close(self):
+        if self._stop is not None:
+            self._stop.set()
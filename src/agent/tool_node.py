@@ -0,0 +1,163 @@
+import asyncio
+import functools
+import inspect
+import json
+import time
+from typing import Any, Literal, Optional, Sequence
+
+from langchain_core.messages import AIMessage, ToolCall, ToolMessage
+from langchain_core.runnables import RunnableConfig
+from langchain_core.tools import BaseTool, StructuredTool, ToolException
+from langgraph.prebuilt import ToolNode
+from langgraph.store.base import BaseStore
+
+from src.agent.budget import time_left, tool_calls_left
+from src.agent.observations import ObservationBudget
+from src.agent.tools.concurrency import tool_semaphore
+from src.agent.tools.results import ToolError
+from src.agent.tracing import current_trace
+
+
+def _raise_errors(func):
+    """Wraps a tool function so a failed result raises, with the text the agent would have read."""
+    def check(result):
+        if isinstance(result, ToolError):
+            raise ToolException(str(result))
+        if isinstance(result, dict) and "error" in result:
+            raise ToolException(json.dumps(result, ensure_ascii=False))
+        return result
+
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            return check(await func(*args, **kwargs))
+    else:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            return check(func(*args, **kwargs))
+    return wrapper
+
+
+def _reporting_errors(tool: BaseTool) -> BaseTool:
+    """A copy of the tool whose ToolError or {"error": ...} results become ToolMessages with an error status."""
+    if not isinstance(tool, StructuredTool):
+        return tool
+    return tool.model_copy(update={
+        "func": tool.func and _raise_errors(tool.func),
+        "coroutine": tool.coroutine and _raise_errors(tool.coroutine),
+        "handle_tool_error": True,
+    })
+
+
+class ConcurrentToolNode(ToolNode):
+    """
+    Runs all tool calls of one AI turn concurrently, each tool limited to a number of simultaneous calls,
+    see `configure_tool_concurrency`, and a timeout. A call that times out, waiting for its turn or running,
+    becomes an error Observation instead of stalling the whole step. Calls are also cut short, and their
+    requests cancelled, when the question's time budget runs out. With an observation budget, oversized
+    observations are shortened before they reach the agent node.
+    """
+
+    def __init__(
+        self,
+        tools: Sequence[BaseTool],
+        *,
+        timeouts: dict[str, float] | None = None,
+        default_timeout: float | None = None,
+        observation_budget: ObservationBudget | None = None,
+        **kwargs,
+    ):
+        """
+        :param timeouts: seconds a call of each tool may take by tool name, `default_timeout` for the others
+        """
+        super().__init__(tools, **kwargs)
+        self.tools_by_name = {name: _reporting_errors(tool) for name, tool in self.tools_by_name.items()}
+        self.observation_budget = observation_budget
+        self.timeouts = timeouts or {}
+        self.default_timeout = default_timeout
+
+    async def _arun_one(
+        self,
+        call: ToolCall,
+        input_type: Literal["list", "dict", "tool_calls"],
+        config: RunnableConfig,
+    ) -> ToolMessage:
+        if call["name"] not in self.tools_by_name:
+            return await super()._arun_one(call, input_type, config)
+
+        timeout = self.timeouts.get(call["name"], self.default_timeout)
+        left = time_left(config)
+        # Cancelling the call cancels the HTTP requests it awaits
+        cut_short = left is not None and (timeout is None or left < timeout)
+        run_one, queued, started = super()._arun_one, time.perf_counter(), None
+
+        async def run() -> ToolMessage:
+            nonlocal started
+            # Waiting for a slot counts against the timeout, the semaphores are shared by every session
+            async with tool_semaphore(call["name"]):
+                started = time.perf_counter()
+                return await run_one(call, input_type, config)
+        try:
+            result = await asyncio.wait_for(run(), max(left, 0) if cut_short else timeout)
+        except asyncio.TimeoutError:
+            if cut_short:
+                content = f"Error: {call['name']} was stopped, the question's time budget ran out."
+            elif started is None:
+                content = f"Error: {call['name']} was not run, no slot came free within {timeout:g} seconds."
+            else:
+                content = f"Error: {call['name']} did not finish within {timeout:g} seconds."
+            result = ToolMessage(content=content, name=call["name"], tool_call_id=call["id"], status="error")
+        if started is None:
+            started = time.perf_counter()
+
+        trace = current_trace.get()
+        if trace is not None:
+            content = getattr(result, "content", "")
+            failed = getattr(result, "status", None) == "error"
+            trace.add(
+                "tool", call["name"], started,
+                {"queued": started - queued, "input_bytes": len(json.dumps(call["args"], default=str)),
+                 "output_bytes": len(str(content).encode())},
+                str(content)[:200] if failed else None
+            )
+        return result
+
+    def _over_budget(self, input: Any, config: RunnableConfig) -> tuple[Any, list[ToolMessage]]:
+        """
+        The input with the last turn cut to the tool calls the question may still make, and error
+        Observations for the calls cut.
+        """
+        messages = input.get(self.messages_key) if isinstance(input, dict) else None
+        left = tool_calls_left(messages, config) if messages and isinstance(messages[-1], AIMessage) else None
+        if left is None or len(messages[-1].tool_calls) <= left:
+            return input, []
+        turn = messages[-1]
+        cut = [
+            ToolMessage(content=f"Error: {call['name']} was not run, the question used up its tool calls.",
+                        name=call["name"], tool_call_id=call["id"], status="error")
+            for call in turn.tool_calls[max(left, 0):]
+        ]
+        turn = turn.model_copy(update={"tool_calls": turn.tool_calls[:max(left, 0)]})
+        return {**input, self.messages_key: [*messages[:-1], turn]}, cut
+
+    async def _afunc(self, input: Any, config: RunnableConfig, *, store: Optional[BaseStore]) -> Any:
+        input, cut = self._over_budget(input, config)
+        output = await super()._afunc(input, config, store=store)
+        if cut and isinstance(output, dict):
+            output[self.messages_key] = [*output[self.messages_key], *cut]
+        messages = input.get(self.messages_key) if isinstance(input, dict) else getattr(input, self.messages_key, None)
+        if self.observation_budget is None or not isinstance(output, dict) or not messages:
+            return output
+
+        budget = self.observation_budget.observation_budget(messages)
+        last_ai = next(m for m in reversed(messages) if isinstance(m, AIMessage))
+        args = {call["id"]: call["args"] for call in last_ai.tool_calls}
+
+        async def shorten(message):
+            if not isinstance(message, ToolMessage):
+                return message
+            query = self.observation_budget.ranking_query(messages, args.get(message.tool_call_id, {}))
+            return await self.observation_budget.apply(message, query, budget)
+
+        output[self.messages_key] = list(await asyncio.gather(*map(shorten, output[self.messages_key])))
+        return output
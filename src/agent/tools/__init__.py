@@ -2,5 +2,6 @@ from .calculator import calculate
 from .web_search import search_web
 from .wikipedia import search_wikipedia
 from .web_reader import read_web_page
+from .multi import read_web_pages, search_web_many, search_wikipedia_many
 
-tools = [calculate, search_web, search_wikipedia, read_web_page]
+tools = [calculate, search_web, search_wikipedia, read_web_page, search_web_many, search_wikipedia_many, read_web_pages]
@@ -0,0 +1,223 @@
+import asyncio
+import functools
+import hashlib
+import inspect
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, NamedTuple
+from urllib.parse import urlsplit, urlunsplit
+
+from .results import is_error_result
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tool_cache (
+    key TEXT PRIMARY KEY,
+    tool TEXT NOT NULL,
+    value TEXT NOT NULL,
+    stored_at REAL NOT NULL,
+    etag TEXT,
+    last_modified TEXT
+);
+CREATE INDEX IF NOT EXISTS tool_cache_by_age ON tool_cache (stored_at);
+"""
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    stored_at: float
+    etag: str | None = None
+    last_modified: str | None = None
+
+    @property
+    def validators(self) -> dict[str, str]:
+        """Conditional request headers revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+
+def _normalize_url(url: str) -> str:
+    parts = urlsplit(url.strip())
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), parts.path or "/", parts.query, ""))
+
+
+def _normalize_arg(name: str, value: Any) -> Any:
+    if not isinstance(value, str):
+        return value
+    if name == "url":
+        return _normalize_url(value)
+    return re.sub(r"\s+", " ", value).strip().casefold()
+
+
+class ToolCache:
+    """
+    Two tier tool result cache: an in-memory LRU in front of a SQLite file that survives restarts.
+    Entries expire after a per-tool TTL, expired entries with HTTP validators are kept for revalidation.
+    The file is trimmed to `max_disk_entries` every tenth of that many writes, in between it may hold up to
+    a tenth more.
+    """
+
+    def __init__(self, path: str | None = None, ttls: dict[str, float] | None = None, default_ttl: float = 3600.0,
+                 max_memory_entries: int = 512, max_disk_entries: int = 20_000):
+        self.ttls = ttls or {}
+        self.default_ttl = default_ttl
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.hits: Counter[str] = Counter()
+        self.misses: Counter[str] = Counter()
+        self.revalidations: Counter[str] = Counter()
+        self._memory: OrderedDict[str, CacheEntry] = OrderedDict()
+        # The memory tier has its own lock, so memory hits never wait on a disk write
+        self._lock = threading.Lock()
+        self._disk_lock = threading.Lock()
+        self._conn = None
+        self._writes = 0
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._conn = sqlite3.connect(path, check_same_thread=False)
+            self._conn.executescript(_SCHEMA)
+
+    @property
+    def stats(self) -> dict[str, dict[str, int]]:
+        tools = set(self.hits) | set(self.misses) | set(self.revalidations)
+        return {
+            tool: {"hits": self.hits[tool], "misses": self.misses[tool], "revalidations": self.revalidations[tool]}
+            for tool in sorted(tools)
+        }
+
+    @staticmethod
+    def key(tool: str, args: dict[str, Any]) -> str:
+        normalized = {name: _normalize_arg(name, value) for name, value in args.items()}
+        payload = json.dumps([tool, normalized], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def is_fresh(self, tool: str, entry: CacheEntry) -> bool:
+        return time.time() - entry.stored_at < self.ttls.get(tool, self.default_ttl)
+
+    def _remember(self, key: str, entry: CacheEntry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    def peek(self, key: str) -> CacheEntry | None:
+        """Returns the entry for a key if it is in memory, fresh or not, never reading the disk."""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+            return entry
+
+    def lookup(self, key: str) -> CacheEntry | None:
+        """Returns the entry for a key, fresh or not, promoting disk entries to memory."""
+        entry = self.peek(key)
+        if entry is not None:
+            return entry
+        with self._disk_lock:
+            if self._conn is None:
+                return None
+            row = self._conn.execute(
+                "SELECT value, stored_at, etag, last_modified FROM tool_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None:
+            return None
+        entry = CacheEntry(json.loads(row[0]), row[1], row[2], row[3])
+        with self._lock:
+            self._remember(key, entry)
+        return entry
+
+    async def alookup(self, key: str) -> CacheEntry | None:
+        """Like `lookup`, the disk is read in a worker thread after a memory miss instead of on the event loop."""
+        entry = self.peek(key)
+        if entry is not None or self._conn is None:
+            return entry
+        return await asyncio.to_thread(self.lookup, key)
+
+    def store(self, tool: str, key: str, value: Any, etag: str | None = None, last_modified: str | None = None):
+        entry = CacheEntry(value, time.time(), etag, last_modified)
+        with self._lock:
+            self._remember(key, entry)
+        self._write(tool, key, entry)
+
+    async def astore(self, tool: str, key: str, value: Any, etag: str | None = None,
+                     last_modified: str | None = None):
+        """Like `store`, the entry is served from memory at once and written to disk in a worker thread."""
+        entry = CacheEntry(value, time.time(), etag, last_modified)
+        with self._lock:
+            self._remember(key, entry)
+        if self._conn is not None:
+            await asyncio.to_thread(self._write, tool, key, entry)
+
+    def _write(self, tool: str, key: str, entry: CacheEntry):
+        with self._disk_lock:
+            if self._conn is None:
+                return
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, tool, value, stored_at, etag, last_modified) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, tool, json.dumps(entry.value, default=str), entry.stored_at, entry.etag, entry.last_modified)
+            )
+            self._writes += 1
+            if self._writes >= max(1, self.max_disk_entries // 10):
+                self._writes = 0
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self):
+        """Deletes the oldest entries over `max_disk_entries`, walking the age index instead of the whole table."""
+        (count,) = self._conn.execute("SELECT COUNT(*) FROM tool_cache").fetchone()
+        if count > self.max_disk_entries:
+            self._conn.execute(
+                "DELETE FROM tool_cache WHERE key IN (SELECT key FROM tool_cache ORDER BY stored_at LIMIT ?)",
+                (count - self.max_disk_entries,)
+            )
+
+    def close(self):
+        with self._disk_lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+_cache = ToolCache()
+
+
+def configure_tool_cache(**kwargs):
+    """Replaces the process-wide cache, see `ToolCache` for the arguments."""
+    global _cache
+    _cache.close()
+    _cache = ToolCache(**kwargs)
+
+
+def get_tool_cache() -> ToolCache:
+    return _cache
+
+
+def cached_tool(tool_name: str):
+    """Serves an async tool from the cache while its entry is fresh, failures are never cached."""
+    def decorator(func):
+        signature = inspect.signature(func)
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            cache = get_tool_cache()
+            key = cache.key(tool_name, dict(signature.bind(*args, **kwargs).arguments))
+            entry = await cache.alookup(key)
+            if entry is not None and cache.is_fresh(tool_name, entry):
+                cache.hits[tool_name] += 1
+                return entry.value
+            cache.misses[tool_name] += 1
+            result = await func(*args, **kwargs)
+            if not is_error_result(result):
+                await cache.astore(tool_name, key, result)
+            return result
+        return wrapper
+    return decorator
@@ -1,13 +1,186 @@
-import numexpr
+import ast
+import math
+import re
+from collections import Counter, OrderedDict
+from typing import Any
 
+import numpy as np
 
-def calculate(expression: str) -> str:
+from .results import ToolError
+
+_config = {"cache_size": 512, "max_rows": 100, "max_values": 100_000}
+# Compiled expressions by expression and operand types, shared by all threads the tool runs in
+_compiled: OrderedDict = OrderedDict()
+_names: OrderedDict = OrderedDict()
+cache_counts: Counter = Counter()
+
+_ASSIGNMENT = re.compile(r"\s*([A-Za-z_]\w*)\s*=(?!=)(.*)", re.S)
+_RANGE = re.compile(r"range\((.*)\)", re.S)
+_CONSTANTS = {"pi": np.float64(np.pi), "e": np.float64(np.e)}
+
+
+def configure_calculator(**config):
+    """
+    Overrides the number of compiled expressions kept (cache_size), the table rows shown (max_rows) and
+    the length of the longest list or range (max_values).
+    """
+    unknown = set(config) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown calculator settings: {', '.join(sorted(unknown))}")
+    _config.update(config)
+
+
+def get_calculator_stats() -> dict[str, float]:
+    lookups = cache_counts["hits"] + cache_counts["misses"]
+    return {**cache_counts, "hit_rate": cache_counts["hits"] / lookups if lookups else 0.0, "cached": len(_compiled)}
+
+
+def _remember(cache: OrderedDict, key, value):
+    cache[key] = value
+    if len(cache) > _config["cache_size"]:
+        cache.popitem(last=False)
+
+
+def _evaluate(expression: str, variables: dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Evaluates with the compiled expression of the same text and operand types, compiling it on first use.
+    Unlike `numexpr.evaluate`, whose cache is per thread, the cache is shared by the threads tools run in.
+    """
+    from numexpr.necompiler import NumExpr, evaluate_lock, getContext, getExprNames, getType
+
+    expression = expression.strip()
+    with evaluate_lock:
+        if expression not in _names:
+            # Parsing sanitizes the expression, as numexpr.evaluate does
+            _remember(_names, expression, getExprNames(expression, getContext({})))
+        names, uses_vml = _names[expression]
+        missing = [name for name in names if name not in variables]
+        if missing:
+            raise NameError(f"'{missing[0]}' is not defined")
+        operands = [variables[name] for name in names]
+        key = (expression, tuple(getType(operand) for operand in operands))
+        compiled = _compiled.get(key)
+        if compiled is None:
+            cache_counts["misses"] += 1
+            compiled = NumExpr(expression, list(zip(names, key[1])), **getContext({}))
+            _remember(_compiled, key, compiled)
+        else:
+            cache_counts["hits"] += 1
+            _compiled.move_to_end(key)
+        return compiled(*operands, ex_uses_vml=uses_vml)
+
+
+def _check_length(length: int):
+    # Lists and ranges are the only values with more than one element, capping them caps every array
+    if length > _config["max_values"]:
+        raise ValueError(f"lists and ranges can have at most {_config['max_values']} values, this one has {length}")
+
+
+def _value(source: str, variables: dict[str, np.ndarray]) -> np.ndarray:
+    """The value of a statement's right hand side: a list of numbers, a range or an expression."""
+    source = source.strip()
+    if source.startswith("["):
+        values = ast.literal_eval(source)
+        if isinstance(values, list):
+            _check_length(len(values))
+        values = np.asarray(values, dtype=float)
+        if values.ndim != 1:
+            raise ValueError("lists must be flat lists of numbers")
+        return values
+    for number in (np.int64, np.float64):
+        try:
+            # A plain number needs no compiling, and would only take a cache entry of its own
+            return np.asarray(number(source))
+        except (ValueError, OverflowError):
+            pass
+    match = _RANGE.fullmatch(source)
+    if match:
+        bounds = [float(_evaluate(arg, variables)) for arg in match.group(1).split(",")]
+        start, stop, step = ([0.0] if len(bounds) == 1 else []) + bounds + ([1.0] if len(bounds) < 3 else [])
+        if len(bounds) > 3 or step == 0 or not all(map(math.isfinite, (start, stop, step))):
+            raise ValueError("range takes a finite start, stop and non-zero step")
+        _check_length(max(math.ceil((stop - start) / step), 0))
+        if all(bound.is_integer() for bound in (start, stop, step)):
+            # Whole numbers stay integers, as in Python's range
+            start, stop, step = int(start), int(stop), int(step)
+        return np.arange(start, stop, step)
+    return np.asarray(_evaluate(source, variables))
+
+
+def _format(value: Any) -> str:
+    # Full precision, the same as a single result
+    return value if isinstance(value, str) else str(np.asarray(value).item())
+
+
+def _table(rows: list[tuple[str, Any]]) -> str:
+    """
+    The results as compact tables: one of the scalar results and errors, and one per length of the list
+    results, with a column per list and a row per element.
     """
-    Evaluates a mathematical expression safely.
+    scalars = [(label, value) for label, value in rows if isinstance(value, str) or np.ndim(value) == 0]
+    columns: dict[int, list[tuple[str, np.ndarray]]] = {}
+    for label, value in rows:
+        if not isinstance(value, str) and np.ndim(value) > 0:
+            columns.setdefault(len(value), []).append((label, value))
+
+    tables = []
+    if scalars:
+        tables.append("\n".join(["expression | result"] + [f"{label} | {_format(value)}" for label, value in scalars]))
+    for length, arrays in columns.items():
+        lines = [" | ".join(label for label, _ in arrays)]
+        lines += [" | ".join(_format(values[row]) for _, values in arrays)
+                  for row in range(min(length, _config["max_rows"]))]
+        if length > _config["max_rows"]:
+            lines.append(f"... {length - _config['max_rows']} more rows")
+        tables.append("\n".join(lines))
+    return "\n\n".join(tables)
+
+
+def calculate(expression: str = "", expressions: list[str] | None = None) -> str:
+    """
+    Evaluates mathematical expressions safely, one or many in a call.
     Useful for not relying on models math capabilities.
+
+    Several statements can be given at once, separated by ";" or new lines in `expression` or as the items
+    of `expressions`, and are evaluated in order. A statement `name = value` defines a variable for the
+    statements after it, the value being a number, an expression, a list of numbers like [1, 2.5, 4] or
+    range(start, stop, step). Expressions over lists are computed element-wise, e.g. a unit conversion of
+    a whole table or growth over many years in one call. `pi` and `e` are predefined.
+
+    Args:
+        expression: An expression, or statements separated by ";" or new lines.
+        expressions: Statements evaluated after those of `expression`.
+
+    Returns:
+        The result of a single expression, else a table of the results with the error of each failed one.
     """
-    try:
-        result = numexpr.evaluate(expression)
-        return str(result)
-    except Exception as e:
-        return f"Error: Invalid expression - {e}"
+    statements = [
+        statement for text in [expression, *(expressions or [])] for statement in re.split(r"[;\n]", text)
+        if statement.strip()
+    ]
+    if not statements:
+        return ToolError("Error: Invalid expression - no expression given.")
+    if len(statements) == 1 and not _ASSIGNMENT.match(statements[0]):
+        try:
+            result = _value(statements[0], dict(_CONSTANTS))
+        except Exception as e:
+            return ToolError(f"Error: Invalid expression - {e}")
+        if result.ndim == 0:
+            return str(result)
+        return _table([(statements[0].strip(), result)])
+
+    variables, rows = dict(_CONSTANTS), []
+    for statement in statements:
+        assignment = _ASSIGNMENT.match(statement)
+        name, source = assignment.groups() if assignment else (None, statement)
+        try:
+            value = _value(source, variables)
+        except Exception as e:
+            rows.append((statement.strip(), f"Error: Invalid expression - {e}"))
+            continue
+        if name is not None:
+            variables[name] = value
+        rows.append((name or source.strip(), value))
+    if all(isinstance(value, str) for _, value in rows):
+        return ToolError("Error: every expression failed\n\n" + _table(rows))
+    return _table(rows)
@@ -0,0 +1,27 @@
+import asyncio
+import weakref
+
+_config = {"concurrency": {}, "default_concurrency": 8}
+_semaphores: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, dict[str, asyncio.Semaphore]]" = \
+    weakref.WeakKeyDictionary()
+
+
+def configure_tool_concurrency(**config):
+    """Overrides the simultaneous calls of each tool by name (concurrency) and of the others (default_concurrency)."""
+    unknown = set(config) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown tool concurrency settings: {', '.join(sorted(unknown))}")
+    _config.update(config)
+
+
+def tool_semaphore(tool_name: str) -> asyncio.Semaphore:
+    """
+    The semaphore limiting the simultaneous calls of a tool on the running loop. It is shared by the tool
+    node and the multi tools calling the tool themselves, so neither gets around the other's limit.
+    """
+    semaphores = _semaphores.setdefault(asyncio.get_running_loop(), {})
+    if tool_name not in semaphores:
+        semaphores[tool_name] = asyncio.Semaphore(
+            _config["concurrency"].get(tool_name, _config["default_concurrency"])
+        )
+    return semaphores[tool_name]
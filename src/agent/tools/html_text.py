@@ -0,0 +1,28 @@
+# Elements never holding readable page content, removed together with their subtree
+BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "svg", "iframe", "nav", "footer")
+# The toolbar archive.org injects into every archived page
+BOILERPLATE_IDS = ("wm-ipp-base", "wm-ipp")
+
+HTML_CONTENT_TYPES = ("text/html", "application/xhtml+xml")
+
+
+def extract_text(content: bytes, encoding: str | None = None) -> str:
+    """
+    Extracts the readable text of an HTML document, skipping boilerplate elements.
+    Runs in a worker process for large pages, so it must stay a plain module level function.
+    """
+    import lxml.html
+    from lxml import etree
+
+    if not content.strip():
+        return ""
+    parser = lxml.html.HTMLParser(encoding=encoding, remove_comments=True)
+    document = lxml.html.document_fromstring(content, parser=parser)
+    etree.strip_elements(document, *BOILERPLATE_TAGS, with_tail=False)
+    for element_id in BOILERPLATE_IDS:
+        for element in document.xpath("//*[@id=$id]", id=element_id):
+            element.drop_tree()
+
+    lines = (line.strip() for line in "".join(document.itertext()).splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    return '\n'.join(chunk for chunk in chunks if chunk)
@@ -0,0 +1,78 @@
+import asyncio
+import weakref
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import httpx
+
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'  # noqa: E501
+
+_limits = {"max_connections": 100, "max_keepalive_connections": 20, "max_connections_per_host": 8, "timeout": 10.0}
+_pools: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, HttpPool]" = weakref.WeakKeyDictionary()
+
+
+class HttpPool:
+    """Keep-alive connection pool shared by all web tools, with a cap on concurrent requests per host."""
+
+    def __init__(self, max_connections: int, max_keepalive_connections: int, max_connections_per_host: int,
+                 timeout: float):
+        import httpx
+
+        self.client = httpx.AsyncClient(
+            limits=httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_keepalive_connections),
+            timeout=timeout,
+            headers={"User-Agent": USER_AGENT},
+            follow_redirects=True,
+        )
+        self.max_connections_per_host = max_connections_per_host
+        self._hosts: dict[str, asyncio.Semaphore] = {}
+
+    @asynccontextmanager
+    async def _host_slot(self, url: str) -> AsyncIterator[None]:
+        host = urlsplit(url).netloc
+        if host not in self._hosts:
+            self._hosts[host] = asyncio.Semaphore(self.max_connections_per_host)
+        async with self._hosts[host]:
+            yield
+
+    async def request(self, method: str, url: str, **kwargs) -> "httpx.Response":
+        async with self._host_slot(url):
+            return await self.client.request(method, url, **kwargs)
+
+    @asynccontextmanager
+    async def stream(self, method: str, url: str, **kwargs) -> AsyncIterator["httpx.Response"]:
+        """Like `request`, but the body is read by the caller and the host slot is held until it is done."""
+        async with self._host_slot(url):
+            async with self.client.stream(method, url, **kwargs) as response:
+                yield response
+
+    async def aclose(self):
+        await self.client.aclose()
+
+
+def configure_http_pool(**limits):
+    """
+    Overrides the limits used for pools created from now on (max_connections, max_keepalive_connections,
+    max_connections_per_host, timeout).
+    """
+    unknown = set(limits) - set(_limits)
+    if unknown:
+        raise ValueError(f"Unknown HTTP pool limits: {', '.join(sorted(unknown))}")
+    _limits.update(limits)
+
+
+def get_http_pool() -> HttpPool:
+    """Returns the pool of the running event loop, connections cannot be shared across loops."""
+    loop = asyncio.get_running_loop()
+    pool = _pools.get(loop)
+    if pool is None:
+        pool = _pools[loop] = HttpPool(**_limits)
+    return pool
+
+
+async def close_http_pool():
+    pool = _pools.pop(asyncio.get_running_loop(), None)
+    if pool is not None:
+        await pool.aclose()
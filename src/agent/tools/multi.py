@@ -0,0 +1,152 @@
+import asyncio
+import math
+from typing import Any, Awaitable, Callable
+from urllib.parse import urldefrag
+
+from .concurrency import tool_semaphore
+from .results import ToolError, is_error_result
+from .web_reader import read_web_page
+from .web_search import search_results
+from .wikipedia import search_wikipedia
+
+_config = {"max_items": 8, "concurrency": 4, "item_timeout": 20.0}
+MULTI_TOOLS = ("search_web_many", "search_wikipedia_many", "read_web_pages")
+
+
+def configure_multi_tools(**config):
+    """
+    Overrides the number of queries or URLs one call runs (max_items), how many of them run at a time
+    (concurrency) and the seconds each may take (item_timeout).
+    """
+    unknown = set(config) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown multi tool settings: {', '.join(sorted(unknown))}")
+    _config.update(config)
+
+
+def multi_call_timeout() -> float:
+    """The longest a call of a multi tool takes, every batch of `concurrency` items taking up to `item_timeout`."""
+    return _config["item_timeout"] * math.ceil(_config["max_items"] / _config["concurrency"])
+
+
+def _unique(items: list[str], normalize: Callable[[str], str]) -> list[str]:
+    """The items without blanks and repeats, in their first spelling."""
+    unique = {}
+    for item in items:
+        if item.strip():
+            unique.setdefault(normalize(item), item.strip())
+    return list(unique.values())
+
+
+def _query_key(query: str) -> str:
+    return " ".join(query.split()).casefold()
+
+
+def _url_key(url: str) -> str:
+    # The fragment only points into the page, it is the same download
+    return urldefrag(url.strip()).url
+
+
+async def _fan_out(func: Callable[[str], Awaitable[Any]], items: list[str],
+                   tool_name: str | None = None) -> list[Any]:
+    """
+    Runs the tool for every item, a few at a time, each failure becoming that item's error. The calls also
+    count against the concurrency limit of the tool, `tool_name` if `func` isn't the tool itself, the one
+    its direct calls from the tool node have.
+    """
+    semaphore = asyncio.Semaphore(_config["concurrency"])
+
+    async def limited(item: str) -> Any:
+        async with tool_semaphore(tool_name or func.__name__):
+            return await func(item)
+
+    async def run(item: str) -> Any:
+        async with semaphore:
+            try:
+                return await asyncio.wait_for(limited(item), _config["item_timeout"])
+            except asyncio.TimeoutError:
+                return ToolError(f"Error: did not finish within {_config['item_timeout']:g} seconds.")
+            except Exception as e:
+                return ToolError(f"An unexpected error occurred: {e}")
+    return await asyncio.gather(*map(run, items))
+
+
+def _combine(kind: str, plural: str, items: list[str], requested: int, results: list[Any],
+             render: Callable[[Any], str]) -> str:
+    """One Observation of all results, a section per item. It is an error only when every item failed."""
+    if not items:
+        return ToolError(f"Error: no {plural} given.")
+    sections = [f"## {kind}: {item}\n{render(result)}" for item, result in zip(items, results)]
+    failed = sum(is_error_result(result) for result in results)
+    if requested > _config["max_items"]:
+        sections.append(f"Only the first {_config['max_items']} of the {requested} {plural} were run, "
+                        f"ask for the others in another call.")
+    summary = f"{len(items)} {plural}, {len(items) - failed} answered" + (f", {failed} failed" if failed else "")
+    if failed == len(items):
+        return ToolError("\n\n".join([f"Error: all {plural} failed", *sections]))
+    return "\n\n".join([summary, *sections])
+
+
+def _render_search(result: dict | str) -> str:
+    if isinstance(result, str):
+        # The search raised or timed out
+        return result
+    if "error" in result:
+        return f"Error: {result['error']}"
+    return "\n".join(
+        f"- {item.get('title', '')} ({item.get('url', '')}): {' '.join(str(item.get('content', '')).split())}"
+        for item in result.get("results", [])
+    )
+
+
+def _render_text(result: Any) -> str:
+    return str(result).strip()
+
+
+async def search_web_many(queries: list[str]) -> str:
+    """
+    Performs several web searches at once using the Tavily search engine, e.g. one per entity being compared.
+
+    Args:
+        queries: The search queries, each searched on its own.
+
+    Returns:
+        The results of every query in one text, a section per query with its error if it failed.
+    """
+    unique = _unique(queries, _query_key)
+    items = unique[:_config["max_items"]]
+    # Without the prefetch, the result pages of up to max_items searches would all start downloading
+    results = await _fan_out(search_results, items, "search_web")
+    return _combine("query", "queries", items, len(unique), results, _render_search)
+
+
+async def search_wikipedia_many(queries: list[str]) -> str:
+    """
+    Searches Wikipedia for several queries at once and returns a summary of the top result of each.
+
+    Args:
+        queries: The search queries, e.g. one per person, place or event.
+
+    Returns:
+        The summaries in one text, a section per query with its error if no article was found.
+    """
+    unique = _unique(queries, _query_key)
+    items = unique[:_config["max_items"]]
+    results = await _fan_out(search_wikipedia, items)
+    return _combine("query", "queries", items, len(unique), results, _render_text)
+
+
+async def read_web_pages(urls: list[str]) -> str:
+    """
+    Reads the textual content of several web pages at once.
+
+    Args:
+        urls: The URLs of the web pages to read.
+
+    Returns:
+        The text of every page in one text, a section per URL with its error if it could not be read.
+    """
+    unique = [_url_key(url) for url in _unique(urls, _url_key)]
+    items = unique[:_config["max_items"]]
+    results = await _fan_out(read_web_page, items)
+    return _combine("page", "pages", items, len(unique), results, _render_text)
@@ -0,0 +1,16 @@
+from typing import Any
+
+
+class ToolError(str):
+    """
+    The text of a failed tool call. The agent reads it like any other Observation, the type is what marks the
+    failure: it is never cached, the tool node reports it with an error status and the multi tools count it
+    as a failed item. Results that merely start with "Error" are ordinary results.
+    """
+
+
+def is_error_result(value: Any) -> bool:
+    """Tools report failures as values, a `ToolError`, an {"error": ...} answer or nothing at all."""
+    if isinstance(value, dict):
+        return "error" in value
+    return isinstance(value, ToolError) or not value
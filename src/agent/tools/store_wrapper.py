@@ -1,7 +1,12 @@
-from typing import Any, List, Optional
+from typing import TYPE_CHECKING, Any, List, Literal, Optional
 from pydantic import BaseModel, Field
 from langchain_core.tools import tool
-from langgraph.store.base import BaseStore
+from langgraph.store.base import BaseStore, SearchItem
+
+if TYPE_CHECKING:
+    from src.agent.store_maintenance import StoreMaintenance
+
+SearchMode = Literal["auto", "lexical", "vector", "hybrid"]
 
 
 class PutInput(BaseModel):
@@ -25,6 +30,11 @@ class SearchInput(BaseModel):
     """)
     query: str = Field(..., description="The query to search for.")
     limit: Optional[int] = Field(4, description="The number of results to return.")
+    mode: SearchMode = Field("auto", description="""
+    'lexical' matches the words of the query (fast, best for names and exact terms), 'vector' matches its
+    meaning, 'hybrid' combines both. 'auto' answers from the words alone when every word of the query is
+    found, and combines both otherwise.
+    """)
 
 
 class ListNamespacesInput(BaseModel):
@@ -33,28 +43,80 @@ class ListNamespacesInput(BaseModel):
     """)
 
 
+def fuse_rankings(rankings: list[list[SearchItem]], limit: int, k: int = 60) -> list[SearchItem]:
+    """
+    Reciprocal rank fusion: items are ordered by the sum of 1 / (k + rank) over the rankings they appear in,
+    so lexical and vector results combine without comparing their differently scaled scores.
+    """
+    scores: dict[tuple[tuple[str, ...], str], float] = {}
+    items: dict[tuple[tuple[str, ...], str], SearchItem] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking):
+            ident = (item.namespace, item.key)
+            scores[ident] = scores.get(ident, 0.0) + 1 / (k + rank + 1)
+            items.setdefault(ident, item)
+    best = sorted(scores, key=scores.get, reverse=True)[:limit]
+    return [SearchItem(namespace=items[i].namespace, key=items[i].key, value=items[i].value,
+                       created_at=items[i].created_at, updated_at=items[i].updated_at, score=scores[i])
+            for i in best]
+
+
 class StoreInteractionToolWrapper:
     """ Allows an agent to interact with the store."""
-    def __init__(self, store: BaseStore):
+    def __init__(self, store: BaseStore, maintenance: Optional["StoreMaintenance"] = None):
         self.store = store
+        self.maintenance = maintenance
 
-    def put(self, namespace: List[str], key: str, value: dict) -> None:
+    def put(self, namespace: List[str], key: str, value: dict) -> Optional[str]:
         """
         Stores a key-value pair in a specific namespace. Use this to remember information, facts, or user preferences
         for later retrieval. For example, you can store a user's favorite movie in the 'memories' namespace.
         The namespace should be a list of two strings, like ['user_id', 'memories'].
         """
-        return self.store.put(namespace=tuple(namespace), key=key, value=value)
-
-    def search(self, namespace_prefix: List[str], query: str, limit: int = 4) -> List[Any]:
+        namespace = tuple(namespace)
+        if self.maintenance is None:
+            return self.store.put(namespace=namespace, key=key, value=value)
+        stored_key, value = self.maintenance.deduplicate(namespace, key, value)
+        self.store.put(namespace=namespace, key=stored_key, value=value)
+        if stored_key != key:
+            return f"A near-duplicate memory was found, it was updated under its key '{stored_key}' instead."
+        return None
+
+    def search(self, namespace_prefix: List[str], query: str, limit: int = 4, mode: SearchMode = "auto") -> List[Any]:
         """
         Searches for relevant information within a given namespace based on a natural language query.
         This is useful for finding stored facts or memories. For example, searching for 'Pulp Fiction' in the
         'memories' namespace would return related stored information. The namespace_prefix must be a list of
-        strings, like ['user_id', 'memories'].
+        strings, like ['user_id', 'memories']. Keyword lookups like names and titles are answered fastest
+        by the default 'auto' mode, use 'vector' to search by meaning only.
         """
-        # Call with namespace_prefix as a positional argument, not a keyword one.
-        return self.store.search(tuple(namespace_prefix), query=query, limit=limit)
+        prefix = tuple(namespace_prefix)
+        lexical_search = getattr(self.store, "lexical_search", None)
+        if lexical_search is None or mode == "vector":
+            # Call with namespace_prefix as a positional argument, not a keyword one.
+            return self.store.search(prefix, query=query, limit=limit)
+        if mode == "lexical":
+            return lexical_search(prefix, query, limit)
+
+        if mode == "auto":
+            exact = lexical_search(prefix, query, limit, match_all=True)
+            if exact:
+                # Every word of the query was found, an exact-term lookup needs no embedding
+                if len(exact) == limit:
+                    return exact
+                found = {(item.namespace, item.key) for item in exact}
+                more = lexical_search(prefix, query, 2 * limit)
+                more = [item for item in more if (item.namespace, item.key) not in found]
+                return exact + more[:limit - len(exact)]
+        keyword = lexical_search(prefix, query, 2 * limit)
+        try:
+            semantic = self.store.search(prefix, query=query, limit=2 * limit)
+        except Exception:
+            if not keyword:
+                raise
+            # The embedding provider is unavailable, the keyword matches are still worth returning
+            return keyword[:limit]
+        return fuse_rankings([keyword, semantic], limit)
 
     def get(self, namespace: List[str], key: str) -> Any:
         """
@@ -1,8 +1,230 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+import multiprocessing
+import time
+import weakref
+from collections import Counter, OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import NamedTuple
 
+from .cache import CacheEntry, get_tool_cache
+from .html_text import HTML_CONTENT_TYPES, extract_text
+from .http_pool import get_http_pool
+from .results import ToolError, is_error_result
 
-def read_web_page(url: str) -> str:
+_config = {
+    "max_bytes": 2_000_000, "thread_parse_bytes": 200_000, "parse_workers": 2,
+    "prefetch_top_k": 0, "prefetch_concurrency": 4, "prefetch_ttl": 120.0, "prefetch_max_bytes": 20_000_000,
+}
+_parse_pool: ProcessPoolExecutor | None = None
+
+
+def configure_web_reader(**config):
+    """
+    Overrides the download byte cap (max_bytes), the size up to which pages are parsed in a thread rather
+    than a process (thread_parse_bytes) and the number of parser processes (parse_workers). The prefetch of
+    search results reads the first `prefetch_top_k` URLs of each search (0 turns it off), at most
+    `prefetch_concurrency` at a time, and keeps prefetched pages for `prefetch_ttl` seconds up to
+    `prefetch_max_bytes` downloaded bytes.
+    """
+    unknown = set(config) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown web reader settings: {', '.join(sorted(unknown))}")
+    _config.update(config)
+
+
+async def _parse(content: bytes, encoding: str | None) -> str:
+    """
+    Pages are parsed off the event loop so they don't hold up other sessions and tool calls: small ones in
+    a thread, large ones in a process pool where they don't hold the GIL either.
+    """
+    global _parse_pool
+    if len(content) <= _config["thread_parse_bytes"]:
+        return await asyncio.to_thread(extract_text, content, encoding)
+    if _parse_pool is None:
+        # Spawned, not forked: by now this process runs other threads, a forked child could inherit a held lock
+        _parse_pool = ProcessPoolExecutor(max_workers=_config["parse_workers"],
+                                          mp_context=multiprocessing.get_context("spawn"))
+    return await asyncio.get_running_loop().run_in_executor(_parse_pool, extract_text, content, encoding)
+
+
+def close_parse_pool():
+    """Stops the parser processes, e.g. when the app exits. The next large page starts new ones."""
+    global _parse_pool
+    pool, _parse_pool = _parse_pool, None
+    if pool is not None:
+        pool.shutdown(cancel_futures=True)
+
+
+class _Page(NamedTuple):
+    # The text of the page, or a ToolError
+    text: str
+    downloaded_bytes: int = 0
+    etag: str | None = None
+    last_modified: str | None = None
+    revalidated: bool = False
+
+
+async def _fetch_page(url: str, entry: CacheEntry | None) -> _Page:
+    """Downloads and extracts a page, revalidating the stale cache entry of it if there is one."""
+    import httpx
+
+    try:
+        # A stale entry is revalidated with its ETag/Last-Modified instead of being downloaded again
+        headers = entry.validators if entry is not None else {}
+        async with get_http_pool().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and entry is not None:
+                return _Page(entry.value, 0, entry.etag, entry.last_modified, revalidated=True)
+            response.raise_for_status()  # Raise an exception for bad status codes
+
+            content_type = response.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if content_type and content_type not in HTML_CONTENT_TYPES and content_type != "text/plain":
+                return _Page(ToolError(f"Error: The page is not an HTML document (Content-Type: {content_type})."))
+
+            # Stop downloading once the byte cap is reached, the model can't use more text anyway
+            body = bytearray()
+            async for chunk in response.aiter_bytes():
+                body += chunk
+                if len(body) >= _config["max_bytes"]:
+                    break
+            truncated = len(body) >= _config["max_bytes"]
+            content, encoding = bytes(body[:_config["max_bytes"]]), response.charset_encoding
+
+        if content_type == "text/plain":
+            text = content.decode(encoding or "utf-8", errors="replace").strip()
+        else:
+            text = await _parse(content, encoding)
+        if not text:
+            return _Page(ToolError("Error: Could not extract any text from the page."), len(body))
+        if truncated:
+            text += f"\n[Page truncated after {_config['max_bytes']} bytes]"
+        return _Page(text, len(body), response.headers.get("ETag"), response.headers.get("Last-Modified"))
+    except httpx.HTTPError as e:
+        return _Page(ToolError(f"Error: Could not fetch the web page. {e}"))
+    except Exception as e:
+        return _Page(ToolError(f"An unexpected error occurred while reading the web page: {e}"))
+
+
+class _Prefetch:
+    """A page being read in the background, ahead of the read_web_page call it expects."""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.started = time.monotonic()
+        self.finished: float | None = None
+
+
+# Prefetches of each event loop by the cache key of their URL, oldest first
+_prefetches: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, OrderedDict[str, _Prefetch]]" = (
+    weakref.WeakKeyDictionary()
+)
+_prefetch_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
+prefetch_counts: Counter[str] = Counter()
+
+
+def get_prefetch_stats() -> dict[str, float]:
+    """
+    How the prefetch of search results pays off: the share of page reads it had already started (hit rate),
+    the fetch time it took off their critical path, and the pages and bytes downloaded that no read used.
+    """
+    reads = prefetch_counts["hits"] + prefetch_counts["misses"]
+    return {
+        "scheduled": prefetch_counts["scheduled"],
+        "hits": prefetch_counts["hits"],
+        "misses": prefetch_counts["misses"],
+        "hit_rate": prefetch_counts["hits"] / reads if reads else 0.0,
+        "saved_time": prefetch_counts["saved_ms"] / 1000,
+        "downloaded_bytes": prefetch_counts["downloaded_bytes"],
+        "wasted_pages": prefetch_counts["wasted_pages"],
+        "wasted_bytes": prefetch_counts["wasted_bytes"],
+    }
+
+
+def _discard(prefetch: _Prefetch):
+    """Drops a prefetch no read picked up, its download was wasted."""
+    prefetch_counts["wasted_pages"] += 1
+    if prefetch.task.done():
+        if not prefetch.task.cancelled():
+            prefetch_counts["wasted_bytes"] += prefetch.task.result().downloaded_bytes
+    else:
+        prefetch.task.cancel()
+
+
+def _expire(prefetches: "OrderedDict[str, _Prefetch]"):
+    """Discards the prefetches older than the TTL, then the oldest ones beyond the byte cap."""
+    deadline = time.monotonic() - _config["prefetch_ttl"]
+    while prefetches and next(iter(prefetches.values())).started < deadline:
+        _discard(prefetches.popitem(last=False)[1])
+    kept = sum(p.task.result().downloaded_bytes for p in prefetches.values() if p.finished is not None)
+    while prefetches and kept > _config["prefetch_max_bytes"]:
+        prefetch = prefetches.popitem(last=False)[1]
+        if prefetch.finished is not None:
+            kept -= prefetch.task.result().downloaded_bytes
+        _discard(prefetch)
+
+
+async def _run_prefetch(prefetch: _Prefetch, url: str, key: str) -> _Page:
+    loop = asyncio.get_running_loop()
+    cache = get_tool_cache()
+    entry = await cache.alookup(key)
+    if entry is not None and cache.is_fresh("read_web_page", entry):
+        # Cached on disk after all, the read will find it there, the prefetch is neither a hit nor wasted
+        if _prefetches.get(loop, {}).get(key) is prefetch:
+            del _prefetches[loop][key]
+        prefetch.finished = time.monotonic()
+        return _Page(entry.value, 0, entry.etag, entry.last_modified)
+    if loop not in _prefetch_slots:
+        _prefetch_slots[loop] = asyncio.Semaphore(_config["prefetch_concurrency"])
+    async with _prefetch_slots[loop]:
+        page = await _fetch_page(url, entry)
+    prefetch.finished = time.monotonic()
+    prefetch_counts["downloaded_bytes"] += page.downloaded_bytes
+    return page
+
+
+def prefetch_pages(urls: list[str]):
+    """
+    Starts reading the first `prefetch_top_k` URLs in the background, e.g. those of a search's results,
+    so the read_web_page call likely to follow finds its page already downloaded. Pages cached fresh are
+    skipped, those only on disk once the prefetch has read them in the background. Must be called from the
+    event loop the reads will run on.
+    """
+    if not _config["prefetch_top_k"]:
+        return
+    loop = asyncio.get_running_loop()
+    prefetches = _prefetches.setdefault(loop, OrderedDict())
+    _expire(prefetches)
+    cache = get_tool_cache()
+    for url in urls[:_config["prefetch_top_k"]]:
+        key = cache.key("read_web_page", {"url": url})
+        if key in prefetches:
+            continue
+        entry = cache.peek(key)
+        if entry is not None and cache.is_fresh("read_web_page", entry):
+            continue
+        prefetch = _Prefetch(None)
+        prefetch.task = loop.create_task(_run_prefetch(prefetch, url, key))
+        prefetches[key] = prefetch
+        prefetch_counts["scheduled"] += 1
+
+
+async def _take_prefetched(key: str) -> _Page | None:
+    """The page a prefetch read for the cache key, waiting for it if it is still downloading."""
+    if not _config["prefetch_top_k"]:
+        return None
+    prefetches = _prefetches.get(asyncio.get_running_loop())
+    prefetch = prefetches.pop(key, None) if prefetches else None
+    if prefetch is None or prefetch.task.cancelled():
+        prefetch_counts["misses"] += 1
+        return None
+    requested = time.monotonic()
+    page = await prefetch.task
+    prefetch_counts["hits"] += 1
+    # The part of the fetch that ran before the read asked for it
+    prefetch_counts["saved_ms"] += round((min(requested, prefetch.finished) - prefetch.started) * 1000)
+    return page
+
+
+async def read_web_page(url: str) -> str:
     """
     Reads the textual content of a web page from a given URL.
     Useful for parsing the content from archive.org
@@ -13,27 +235,18 @@ def read_web_page(url: str) -> str:
     Returns:
         The extracted text from the web page, or an error message if the page cannot be fetched or parsed.
     """
-    try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36' # noqa: E501
-        }
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()  # Raise an exception for bad status codes
-
-        soup = BeautifulSoup(response.content, 'html.parser')
-
-        # Remove script and style elements
-        for script_or_style in soup(['script', 'style']):
-            script_or_style.decompose()
-
-        # Get text and clean up whitespace
-        text = soup.get_text()
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-
-        return text or "Error: Could not extract any text from the page."
-    except requests.exceptions.RequestException as e:
-        return f"Error: Could not fetch the web page. {e}"
-    except Exception as e:
-        return f"An unexpected error occurred while reading the web page: {e}" 
\ No newline at end of file
+    cache = get_tool_cache()
+    key = cache.key("read_web_page", {"url": url})
+    entry = await cache.alookup(key)
+    if entry is not None and cache.is_fresh("read_web_page", entry):
+        cache.hits["read_web_page"] += 1
+        return entry.value
+
+    page = await _take_prefetched(key) or await _fetch_page(url, entry)
+    if page.revalidated:
+        cache.revalidations["read_web_page"] += 1
+    else:
+        cache.misses["read_web_page"] += 1
+    if not is_error_result(page.text):
+        await cache.astore("read_web_page", key, page.text, page.etag, page.last_modified)
+    return page.text
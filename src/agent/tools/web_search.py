@@ -1,8 +1,29 @@
-from langchain_tavily import TavilySearch
+import os
 from typing import Dict, List
 
+from .cache import cached_tool
+from .http_pool import get_http_pool
+from .web_reader import prefetch_pages
 
-def search_web(query: str) -> Dict[str, List[str]]:
+_config = {"api_url": "https://api.tavily.com"}
+
+
+def configure_web_search(**config):
+    """Overrides the base URL of the Tavily API (api_url)."""
+    unknown = set(config) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown web search settings: {', '.join(sorted(unknown))}")
+    _config.update(config)
+
+
+def _api_key() -> str:
+    key = os.environ.get("TAVILY_API_KEY")
+    if not key:
+        raise ValueError("TAVILY_API_KEY is not set, add it to the .env file")
+    return key
+
+
+async def search_web(query: str) -> Dict[str, List[str]]:
     """
     Performs a web search using the Tavily search engine.
 
@@ -12,5 +33,29 @@ def search_web(query: str) -> Dict[str, List[str]]:
     Returns:
         A dictionary containing the search results.
     """
-    result = TavilySearch().run(query)
+    result = await search_results(query)
+    # The next step usually reads one of the top results, their download starts while the model thinks
+    prefetch_pages([item["url"] for item in result.get("results", []) if item.get("url")])
+    return result
+
+
+@cached_tool("search_web")
+async def search_results(query: str) -> Dict[str, List[str]]:
+    """The search of `search_web` without the prefetch of its result pages."""
+    try:
+        response = await get_http_pool().request(
+            "POST",
+            f"{_config['api_url'].rstrip('/')}/search",
+            json={"query": query, "search_depth": "basic", "topic": "general"},
+            headers={"Authorization": f"Bearer {_api_key()}"},
+        )
+        if response.status_code != 200:
+            detail = response.json().get("detail", {})
+            error_message = detail.get("error") if isinstance(detail, dict) else "Unknown error"
+            raise ValueError(f"Error {response.status_code}: {error_message}")
+        result = response.json()
+    except Exception as e:
+        return {"error": str(e)}
+    if not result.get("results"):
+        return {"error": f"No search results found for '{query}'. Try a broader or differently worded query."}
     return result
@@ -1,7 +1,23 @@
-import wikipedia
+from .cache import cached_tool
+from .http_pool import get_http_pool
+from .results import ToolError
 
+WIKIPEDIA_API_URL = "https://en.wikipedia.org/w/api.php"
 
-def search_wikipedia(query: str) -> str:
+
+async def _wiki_request(**params) -> dict:
+    response = await get_http_pool().request(
+        "GET", WIKIPEDIA_API_URL, params={"format": "json", "action": "query", **params}
+    )
+    response.raise_for_status()
+    data = response.json()
+    if "error" in data:
+        raise RuntimeError(data["error"]["info"])
+    return data
+
+
+@cached_tool("search_wikipedia")
+async def search_wikipedia(query: str) -> str:
     """
     Searches Wikipedia for a given query and returns a summary of the top result.
     Useful for looking up well established concepts, terms, geographical places and historical events
@@ -13,14 +29,27 @@ def search_wikipedia(query: str) -> str:
         A summary of the top Wikipedia article, or an error message if no article was found.
     """
     try:
-        # Get the summary of the first result
-        summary = wikipedia.summary(query, sentences=5)
-        return summary
-    except wikipedia.exceptions.PageError:
-        return f"Error: Could not find a Wikipedia page for '{query}'."
-    except wikipedia.exceptions.DisambiguationError as e:
-        # In case of a disambiguation page, return the options
-        options = ", ".join(e.options[:5])
-        return f"Error: '{query}' is ambiguous. Did you mean one of these: {options}?"
+        # Find the title of the first result, preferring Wikipedia's spelling suggestion
+        search = await _wiki_request(list="search", srsearch=query, srlimit=1, srprop="", srinfo="suggestion")
+        suggestion = search["query"].get("searchinfo", {}).get("suggestion")
+        results = [result["title"] for result in search["query"]["search"]]
+        title = suggestion or (results[0] if results else None)
+        if title is None:
+            return ToolError(f"Error: Could not find a Wikipedia page for '{query}'.")
+
+        pages = await _wiki_request(
+            prop="extracts|pageprops", ppprop="disambiguation", explaintext="", exsentences=5, redirects="",
+            titles=title
+        )
+        page = next(iter(pages["query"]["pages"].values()))
+        if "missing" in page:
+            return ToolError(f"Error: Could not find a Wikipedia page for '{query}'.")
+        if "disambiguation" in page.get("pageprops", {}):
+            # In case of a disambiguation page, return the options
+            links = await _wiki_request(prop="links", plnamespace=0, pllimit=5, titles=page["title"])
+            link_page = next(iter(links["query"]["pages"].values()))
+            options = ", ".join(link["title"] for link in link_page.get("links", []))
+            return ToolError(f"Error: '{query}' is ambiguous. Did you mean one of these: {options}?")
+        return page.get("extract", "")
     except Exception as e:
-        return f"An unexpected error occurred: {e}"
+        return ToolError(f"An unexpected error occurred: {e}")
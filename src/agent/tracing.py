@@ -0,0 +1,146 @@
+import json
+import threading
+import time
+import uuid
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+class Span(BaseModel):
+    """One timed operation of a question, `start` is relative to the start of its trace."""
+    kind: str  # "llm", "tool", "embed" or "store"
+    name: str
+    start: float
+    duration: float
+    attributes: dict[str, Any] = {}
+    error: str | None = None
+
+
+class Trace(BaseModel):
+    """The spans recorded while answering one question."""
+    trace_id: str = Field(default_factory=lambda: uuid.uuid4().hex)
+    question: str
+    thread_id: str | None = None
+    started_at: float = Field(default_factory=time.time)
+    spans: list[Span] = []
+    _origin: float = PrivateAttr(default_factory=time.perf_counter)
+    _lock: threading.Lock = PrivateAttr(default_factory=threading.Lock)
+    _taken: int = PrivateAttr(default=0)
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._origin
+
+    def add(self, kind: str, name: str, started: float, attributes: dict[str, Any] | None = None,
+            error: str | None = None) -> Span:
+        """Records a span that started at `started`, a `time.perf_counter` value, and ended now."""
+        span = Span(kind=kind, name=name, start=started - self._origin, duration=time.perf_counter() - started,
+                    attributes=attributes or {}, error=error)
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def take_new(self) -> list[Span]:
+        """Spans recorded since the last call, for attaching them to the messages streamed meanwhile."""
+        with self._lock:
+            new, self._taken = self.spans[self._taken:], len(self.spans)
+        return new
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """Count, total duration and token usage per span kind and name, e.g. `tool:read_web_page`."""
+        summary: dict[str, dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for span in self.spans:
+            entry = summary[f"{span.kind}:{span.name}"]
+            entry["count"] += 1
+            entry["duration"] += span.duration
+            entry["errors"] += span.error is not None
+            for key in ("input_tokens", "output_tokens"):
+                entry[key] += span.attributes.get(key, 0)
+        return {name: dict(entry) for name, entry in summary.items()}
+
+    def write_jsonl(self, path: str):
+        """Appends one JSON line per span, carrying the trace's id and question for offline aggregation."""
+        header = {"trace_id": self.trace_id, "question": self.question, "thread_id": self.thread_id,
+                  "started_at": self.started_at}
+        with open(path, "a", encoding="utf-8") as file:
+            for span in self.spans:
+                file.write(json.dumps({**header, **span.model_dump()}) + "\n")
+
+
+# The trace of the question being answered, inherited by the tasks and tool calls of its run
+current_trace: ContextVar[Trace | None] = ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def span(kind: str, name: str, **attributes) -> Iterator[dict[str, Any]]:
+    """
+    Records the enclosed block as a span of the current trace, a no-op outside of one.
+    Yields the span's attributes, so the block can add to them.
+    """
+    trace = current_trace.get()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield attributes
+    except BaseException as e:
+        error = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        if trace is not None:
+            trace.add(kind, name, started, attributes, error)
+
+
+class TracingCallbackHandler(BaseCallbackHandler):
+    """
+    Records a span for every chat model call of an agent run into the given trace. Tool calls are
+    recorded by the tool node, which also sees the time they wait for a slot and their timeouts.
+    """
+
+    # Called in the thread of the run, recording a span is far cheaper than a hop to an executor
+    run_inline = True
+
+    def __init__(self, trace: Trace):
+        self.trace = trace
+        self._started: dict[UUID, tuple[float, str, dict[str, Any]]] = {}
+
+    def _start(self, run_id: UUID, name: str, **attributes):
+        self._started[run_id] = (time.perf_counter(), name, attributes)
+
+    def _end(self, kind: str, run_id: UUID, error: BaseException | None = None, name: str | None = None,
+             **attributes):
+        if run_id not in self._started:
+            return
+        started, start_name, start_attributes = self._started.pop(run_id)
+        error_text = f"{type(error).__name__}: {error}" if error is not None else None
+        self.trace.add(kind, name or start_name, started, {**start_attributes, **attributes}, error_text)
+
+    def on_chat_model_start(self, serialized: dict[str, Any], messages: list, *, run_id: UUID,
+                            metadata: dict[str, Any] | None = None, **kwargs):
+        name = (metadata or {}).get("ls_model_name") or (serialized or {}).get("name") or "chat_model"
+        node = (metadata or {}).get("langgraph_node")
+        self._start(run_id, name, node=node, messages=sum(len(batch) for batch in messages))
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs):
+        if run_id in self._started and "time_to_first_token" not in self._started[run_id][2]:
+            started, _, attributes = self._started[run_id]
+            attributes["time_to_first_token"] = time.perf_counter() - started
+
+    def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs):
+        usage = {}
+        generation = response.generations[0][0] if response.generations and response.generations[0] else None
+        message = getattr(generation, "message", None)
+        if getattr(message, "usage_metadata", None):
+            usage = {"input_tokens": message.usage_metadata.get("input_tokens", 0),
+                     "output_tokens": message.usage_metadata.get("output_tokens", 0)}
+        # A turn of the tiered model is named by the tier that took it, so the breakdown compares them
+        tier = (getattr(message, "response_metadata", None) or {}).get("model_tier")
+        self._end("llm", run_id, name=tier and f"{tier} model", **usage)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs):
+        self._end("llm", run_id, error)
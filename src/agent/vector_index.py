@@ -0,0 +1,262 @@
+import threading
+from typing import Callable, Sequence
+
+import numpy as np
+
+# Returns the matrix rows of a namespace and the item key of each row
+RowSource = Callable[[tuple[str, ...]], tuple[np.ndarray, Sequence[str]]]
+
+
+class VectorIndex:
+    """
+    Picks the matrix rows of a namespace worth scoring for a query, the store then scores them exactly.
+
+    The store tells its index about every row it writes or frees, and reads candidates through it.
+    This base index returns every row of the namespace, i.e. exact search.
+    """
+
+    def __init__(self):
+        self.matrix = None
+        self.rows_of: RowSource | None = None
+        self.lock = threading.RLock()
+
+    def attach(self, matrix, rows_of: RowSource, lock=None):
+        """
+        Called by the store with its vector matrix, a lookup of the rows of a namespace, and the lock it
+        holds while calling the index, which work of the index in other threads must hold too.
+        """
+        self.matrix = matrix
+        self.rows_of = rows_of
+        if lock is not None:
+            self.lock = lock
+
+    def add(self, namespace: tuple[str, ...], key: str, rows: list[int]):
+        pass
+
+    def remove(self, namespace: tuple[str, ...], rows: list[int]):
+        pass
+
+    def candidates(
+        self, namespace: tuple[str, ...], query: np.ndarray, limit: int
+    ) -> tuple[np.ndarray, Sequence[str]]:
+        """The rows to score for a query wanting `limit` results, and the item key of each."""
+        return self.rows_of(namespace)
+
+    def groups(self, namespace: tuple[str, ...]) -> list[tuple[np.ndarray, Sequence[str]]]:
+        """
+        The rows of a namespace in groups holding each row's closest neighbours, and the item key of each
+        row, so finding similar rows compares each group with itself only. Here, one group of all rows.
+        """
+        return [self.rows_of(namespace)]
+
+    def wait_for_builds(self, timeout: float | None = None):
+        """Waits for the index structures being built in the background, e.g. before closing the store."""
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {}
+
+
+class _Partition:
+    """
+    The inverted lists of one namespace, each row filed under its nearest centroid. The rows of the
+    clustering are kept in one array ordered by list, rows put since then in small per-list dicts.
+    """
+
+    def __init__(self, centroids: np.ndarray, rows: np.ndarray, keys: Sequence[str], assignment: np.ndarray):
+        """:param assignment: the closest centroid of each row, see `assign`"""
+        self.centroids = centroids
+        order = np.argsort(assignment, kind="stable")
+        self.rows = rows[order]
+        self.keys = np.asarray(keys, dtype=object)[order]
+        self.offsets = np.searchsorted(assignment[order], np.arange(len(centroids) + 1))
+        self.added: list[dict[int, str]] = [{} for _ in range(len(centroids))]
+        self.added_assignment: dict[int, int] = {}
+        # Rows of the clustering freed since, the store may reuse a freed row for another item
+        self.stale: set[int] = set()
+        self._stale_array: np.ndarray | None = None
+        self.trained_size = len(rows)
+
+    @property
+    def size(self) -> int:
+        return len(self.rows) - len(self.stale) + len(self.added_assignment)
+
+    def assign(self, vectors: np.ndarray) -> np.ndarray:
+        """The closest centroid of each vector, in blocks so the score matrix stays small."""
+        if not len(vectors):
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([
+            np.argmax(vectors[start:start + 65536] @ self.centroids.T, axis=1)
+            for start in range(0, len(vectors), 65536)
+        ])
+
+    def add(self, rows: list[int], key: str, vectors: np.ndarray):
+        for row, centroid in zip(rows, self.assign(vectors).tolist()):
+            self.added[centroid][row] = key
+            self.added_assignment[row] = centroid
+
+    def remove(self, row: int):
+        centroid = self.added_assignment.pop(row, None)
+        if centroid is not None:
+            self.added[centroid].pop(row, None)
+        else:
+            self.stale.add(row)
+            self._stale_array = None
+
+    def lists(self, centroids: list[int]) -> tuple[np.ndarray, np.ndarray]:
+        """The live rows filed under the given centroids and their keys."""
+        rows = np.concatenate([self.rows[self.offsets[c]:self.offsets[c + 1]] for c in centroids])
+        keys = np.concatenate([self.keys[self.offsets[c]:self.offsets[c + 1]] for c in centroids])
+        if self.stale:
+            if self._stale_array is None:
+                self._stale_array = np.fromiter(self.stale, dtype=np.int64, count=len(self.stale))
+            live = ~np.isin(rows, self._stale_array)
+            rows, keys = rows[live], keys[live]
+        added = [self.added[c] for c in centroids if self.added[c]]
+        if added:
+            rows = np.concatenate([rows, np.fromiter((row for a in added for row in a), dtype=np.int64)])
+            keys = np.concatenate([keys, np.asarray([key for a in added for key in a.values()], dtype=object)])
+        return rows, keys
+
+
+class IVFIndex(VectorIndex):
+    """
+    Inverted file index: each large namespace is clustered with spherical k-means, and a query only scores
+    the rows of its `nprobe` closest clusters. Raising `nprobe` trades latency for recall.
+
+    Rows are filed under their closest centroid as they are put and dropped as they are freed. A namespace
+    is clustered on its first search and again once it has grown by `rebuild_factor`, namespaces under
+    `min_size` rows are searched exactly. Clustering runs in a background thread, holding the store's lock
+    only to read blocks of vectors, and the namespace is searched exactly, or with its previous clustering,
+    until it is done. Rows put and freed meanwhile are filed in the new clustering once it is.
+    """
+
+    def __init__(self, nprobe: int = 32, min_size: int = 5000, rebuild_factor: float = 2.0,
+                 iterations: int = 10, sample_per_list: int = 64, seed: int = 0):
+        """
+        :param nprobe: clusters scored per query, more is slower but finds more of the true neighbours
+        :param min_size: namespaces with fewer rows are searched exactly
+        :param rebuild_factor: growth of a namespace since its clustering that triggers a new one
+        :param iterations: k-means iterations of a clustering
+        :param sample_per_list: rows sampled per cluster to train the centroids on
+        """
+        super().__init__()
+        self.nprobe = nprobe
+        self.min_size = min_size
+        self.rebuild_factor = rebuild_factor
+        self.iterations = iterations
+        self.sample_per_list = sample_per_list
+        self._rng = np.random.default_rng(seed)
+        self._partitions: dict[tuple[str, ...], _Partition] = {}
+        # Namespace -> the (key, rows) put, or (None, rows) freed, since its clustering started
+        self._building: dict[tuple[str, ...], list[tuple[str | None, list[int]]]] = {}
+        self._threads: list[threading.Thread] = []
+        self.builds = 0
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _kmeans(self, vectors: np.ndarray, clusters: int) -> np.ndarray:
+        centroids = vectors[self._rng.choice(len(vectors), clusters, replace=False)]
+        for _ in range(self.iterations):
+            assignment = np.argmax(vectors @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, vectors)
+            empty = np.bincount(assignment, minlength=clusters) == 0
+            # Empty clusters are restarted on random rows instead of being lost
+            sums[empty] = vectors[self._rng.choice(len(vectors), int(empty.sum()))]
+            centroids = self._normalize(sums)
+        return centroids
+
+    def _build(self, namespace: tuple[str, ...], rows: np.ndarray, keys: Sequence[str]):
+        """Clusters the rows of a namespace, run in a background thread, see `_partition`."""
+        try:
+            # A namespace smaller than the usual cluster count, possible with a low min_size, gets a cluster per row
+            clusters = min(int(np.clip(np.sqrt(len(rows)), 8, 4096)), len(rows))
+            sample = rows[self._rng.choice(len(rows), min(len(rows), clusters * self.sample_per_list), replace=False)]
+            with self.lock:
+                vectors = np.asarray(self.matrix.data[np.sort(sample)])
+            centroids = self._kmeans(vectors, clusters)
+            assignment = []
+            for start in range(0, len(rows), 65536):
+                with self.lock:
+                    block = np.asarray(self.matrix.data[rows[start:start + 65536]])
+                assignment.append(np.argmax(block @ centroids.T, axis=1))
+            partition = _Partition(centroids, rows, keys, np.concatenate(assignment))
+            with self.lock:
+                for key, changed in self._building.pop(namespace):
+                    if key is None:
+                        for row in changed:
+                            partition.remove(row)
+                    else:
+                        partition.add(changed, key, np.asarray(self.matrix.data[changed]))
+                self._partitions[namespace] = partition
+                self.builds += 1
+        finally:
+            with self.lock:
+                self._building.pop(namespace, None)
+
+    def add(self, namespace: tuple[str, ...], key: str, rows: list[int]):
+        if namespace in self._building:
+            self._building[namespace].append((key, rows))
+        partition = self._partitions.get(namespace)
+        if partition is not None:
+            partition.add(rows, key, np.asarray(self.matrix.data[rows]))
+
+    def remove(self, namespace: tuple[str, ...], rows: list[int]):
+        if namespace in self._building:
+            self._building[namespace].append((None, rows))
+        partition = self._partitions.get(namespace)
+        if partition is not None:
+            for row in rows:
+                partition.remove(row)
+
+    def _partition(self, namespace: tuple[str, ...]) -> _Partition | None:
+        """
+        The namespace's clustering, None for a namespace searched exactly. Starts a clustering in the
+        background when there is none or the namespace outgrew it, the current one serves until it is done.
+        """
+        partition = self._partitions.get(namespace)
+        if namespace in self._building or (
+                partition is not None and partition.size <= partition.trained_size * self.rebuild_factor):
+            return partition
+        rows, keys = self.rows_of(namespace)
+        if len(rows) < max(self.min_size, 1):
+            self._partitions.pop(namespace, None)
+            return None
+        self._building[namespace] = []
+        thread = threading.Thread(target=self._build, args=(namespace, rows, keys), name="ivf-build", daemon=True)
+        self._threads = [*(t for t in self._threads if t.is_alive()), thread]
+        thread.start()
+        return partition
+
+    def wait_for_builds(self, timeout: float | None = None):
+        for thread in list(self._threads):
+            thread.join(timeout)
+
+    def candidates(
+        self, namespace: tuple[str, ...], query: np.ndarray, limit: int
+    ) -> tuple[np.ndarray, Sequence[str]]:
+        partition = self._partition(namespace)
+        if partition is None:
+            return self.rows_of(namespace)
+
+        # The closest clusters, and more of them if those don't hold enough rows to fill the results
+        ranked = np.argsort(-(partition.centroids @ query))
+        sizes = np.cumsum(np.diff(partition.offsets)[ranked])
+        enough = int(np.searchsorted(sizes, max(4 * limit, 64))) + 1
+        return partition.lists(ranked[:max(self.nprobe, enough)].tolist())
+
+    def groups(self, namespace: tuple[str, ...]) -> list[tuple[np.ndarray, Sequence[str]]]:
+        """One group per cluster, neighbours filed under different clusters are not compared."""
+        partition = self._partition(namespace)
+        if partition is None:
+            return super().groups(namespace)
+        return [partition.lists([centroid]) for centroid in range(len(partition.centroids))]
+
+    @property
+    def stats(self) -> dict[str, int]:
+        return {"partitions": len(self._partitions), "builds": self.builds, "building": len(self._building),
+                "indexed_rows": sum(partition.size for partition in self._partitions.values())}
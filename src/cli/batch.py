@@ -0,0 +1,198 @@
+import asyncio
+import json
+import os
+import random
+import time
+import uuid
+from collections import Counter
+from typing import Iterator
+
+from langchain_core.messages import AIMessage, ToolMessage
+from pydantic import BaseModel
+from rich.console import Console
+
+
+class BatchQuestion(BaseModel):
+    id: str
+    question: str
+
+
+class BatchResult(BaseModel):
+    id: str
+    question: str
+    status: str  # "ok" or "error"
+    answer: str | None = None
+    error: str | None = None
+    attempts: int
+    latency: float
+    steps: int = 0
+    tool_calls: dict[str, int] = {}
+
+
+def read_questions(path: str, id_field: str = "id", question_field: str = "question") -> Iterator[BatchQuestion]:
+    """Reads questions from a JSONL file, rows without an id are identified by their line number."""
+    with open(path, encoding="utf-8") as file:
+        for line_number, line in enumerate(file, start=1):
+            if not line.strip():
+                continue
+            row = json.loads(line)
+            if question_field not in row:
+                raise ValueError(f"Line {line_number} of {path} has no '{question_field}' field.")
+            yield BatchQuestion(id=str(row.get(id_field, line_number)), question=str(row[question_field]))
+
+
+def completed_ids(path: str) -> set[str]:
+    """Ids already answered in an output file. Failed rows are not included, so they are retried on resume."""
+    if not os.path.exists(path):
+        return set()
+    done = set()
+    with open(path, encoding="utf-8") as file:
+        for line in file:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # the last row of an interrupted run may be cut off
+            if row.get("status") == "ok":
+                done.add(row["id"])
+            else:
+                done.discard(row.get("id"))
+    return done
+
+
+class BatchRunner:
+    """
+    Runs questions through the agent without the interactive console, a fixed number of them at a time.
+    Every attempt gets its own thread, failed attempts are retried with exponential backoff, and each
+    result is appended to the output as soon as it is done, which is what makes interrupted runs resumable.
+    """
+
+    def __init__(
+        self,
+        agent,
+        concurrency: int = 8,
+        max_retries: int = 3,
+        retry_backoff: float = 2.0,
+        keep_threads: bool = False,
+        console: Console | None = None,
+    ):
+        """
+        :param agent: the agent returned by `init_agent`
+        :param concurrency: number of questions answered at the same time
+        :param max_retries: retries of a question after its first failed attempt
+        :param retry_backoff: delay before the first retry in seconds, doubled with every further retry
+        :param keep_threads: keeps the checkpoints of answered questions instead of deleting them
+        """
+        self.agent = agent
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.keep_threads = keep_threads
+        self.console = console or Console(stderr=True)
+        # Part of every thread id, so a resumed run never continues the checkpointed thread of a killed one
+        self.run_id = uuid.uuid4().hex[:12]
+
+    async def _answer(self, item: BatchQuestion, thread_id: str) -> tuple[str, int, Counter]:
+        steps, tool_calls, answer = 0, Counter(), None
+        message = {"messages": [{"role": "user", "content": item.question}]}
+        config = {"thread_id": thread_id}
+        if getattr(self.agent, "run_budget", None) is not None:
+            # Every attempt gets the whole timeout of a question
+            config["configurable"] = self.agent.run_budget.configurable()
+        async for step in self.agent.astream(message, config=config, stream_mode="updates"):
+            for response in step.get("agent", {}).get("messages", []):
+                if isinstance(response, AIMessage):
+                    steps += 1
+            # Counted as they run, the run's budget may drop calls a turn asked for
+            for response in (step.get("tools") or {}).get("messages", []):
+                if isinstance(response, ToolMessage):
+                    tool_calls[response.name] += 1
+            if "structured_response" in step.get("generate_structured_response", {}):
+                answer = step["generate_structured_response"]["structured_response"].final_answer
+        if answer is None:
+            raise RuntimeError("The agent finished without a final answer.")
+        return answer, steps, tool_calls
+
+    def _delete_thread(self, thread_id: str):
+        checkpointer = getattr(self.agent, "checkpointer", None)
+        if checkpointer is not None and not self.keep_threads:
+            checkpointer.delete_thread(thread_id)
+
+    async def _run_one(self, item: BatchQuestion) -> BatchResult:
+        start = time.perf_counter()
+        for attempt in range(1, self.max_retries + 2):
+            thread_id = f"batch-{self.run_id}-{item.id}-{attempt}"
+            try:
+                answer, steps, tool_calls = await self._answer(item, thread_id)
+                return BatchResult(
+                    id=item.id, question=item.question, status="ok", answer=answer, attempts=attempt,
+                    latency=time.perf_counter() - start, steps=steps, tool_calls=dict(tool_calls)
+                )
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if attempt > self.max_retries:
+                    return BatchResult(
+                        id=item.id, question=item.question, status="error", error=error, attempts=attempt,
+                        latency=time.perf_counter() - start
+                    )
+                # Jitter keeps retries of questions that failed together (e.g. on a rate limit) apart
+                delay = self.retry_backoff * 2 ** (attempt - 1) * random.uniform(0.5, 1.5)
+                self.console.log(f"[yellow]{item.id}: attempt {attempt} failed ({error}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+            finally:
+                self._delete_thread(thread_id)
+
+    async def run(self, input_path: str, output_path: str, id_field: str = "id",
+                  question_field: str = "question") -> dict:
+        """Answers every question of the input not yet answered in the output, returns the run's metrics."""
+        done = completed_ids(output_path)
+        pending = [item for item in read_questions(input_path, id_field, question_field) if item.id not in done]
+        self.console.log(f"{len(pending)} questions to answer, {len(done)} already answered in {output_path}")
+
+        queue: asyncio.Queue[BatchQuestion] = asyncio.Queue()
+        for item in pending:
+            queue.put_nowait(item)
+        results: list[BatchResult] = []
+        start = time.perf_counter()
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        with open(output_path, "a+b") as output:
+            # The previous run may have stopped in the middle of a row
+            if output.tell() > 0:
+                output.seek(-1, os.SEEK_END)
+                if output.read(1) != b"\n":
+                    output.write(b"\n")
+
+            async def worker():
+                while not queue.empty():
+                    result = await self._run_one(queue.get_nowait())
+                    output.write(result.model_dump_json().encode() + b"\n")
+                    output.flush()
+                    results.append(result)
+                    style = "green" if result.status == "ok" else "red"
+                    self.console.log(f"[{style}]{result.id}: {result.status}[/{style}] in {result.latency:.1f}s "
+                                     f"({len(results)}/{len(pending)})")
+
+            await asyncio.gather(*(worker() for _ in range(min(self.concurrency, len(pending)))))
+
+        return self.summarize(results, time.perf_counter() - start)
+
+    @staticmethod
+    def summarize(results: list[BatchResult], wall_time: float) -> dict:
+        latencies = sorted(result.latency for result in results if result.status == "ok")
+        tool_calls = sum((Counter(result.tool_calls) for result in results), Counter())
+
+        def percentile(p: float) -> float | None:
+            return latencies[min(int(p * len(latencies)), len(latencies) - 1)] if latencies else None
+
+        return {
+            "questions": len(results),
+            "ok": len(latencies),
+            "errors": len(results) - len(latencies),
+            "retries": sum(result.attempts - 1 for result in results),
+            "wall_time": wall_time,
+            "throughput_per_minute": len(results) / wall_time * 60 if wall_time else 0.0,
+            "latency_p50": percentile(0.5),
+            "latency_p95": percentile(0.95),
+            "average_steps": sum(r.steps for r in results if r.status == "ok") / len(latencies) if latencies else None,
+            "tool_calls": dict(tool_calls),
+        }
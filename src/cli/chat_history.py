@@ -0,0 +1,125 @@
+from datetime import datetime
+from typing import Callable
+
+from langchain_core.messages import AIMessage, HumanMessage
+from rich.console import Console
+from rich.panel import Panel
+from rich.prompt import Prompt
+from rich.table import Table
+from rich.text import Text
+
+from src.agent.checkpointer import SQLiteDeltaSaver, ThreadSummary
+from src.cli.chat_session import ChatSession
+from src.stream.parser import parse_message
+
+
+class ChatHistory:
+    """
+    Browses past threads of the checkpointer one page at a time, only the shown page of
+    threads or messages is ever read, so long threads open as fast as short ones.
+    """
+
+    def __init__(self, console: Console, history: SQLiteDeltaSaver, stream: Callable, page_size: int = 10):
+        self.console = console
+        self.history = history
+        self.stream = stream
+        self.page_size = page_size
+
+    @staticmethod
+    def _format_time(timestamp: str) -> str:
+        return datetime.fromisoformat(timestamp).astimezone().strftime("%Y-%m-%d %H:%M")
+
+    def _show_threads(self, threads: list[ThreadSummary], page: int, pages: int):
+        table = Table(title=f"Chat History (page {page + 1} of {pages})", border_style="green")
+        table.add_column("#", justify="right", style="bold")
+        table.add_column("Question")
+        table.add_column("Messages", justify="right")
+        table.add_column("Last active")
+        for ix, thread in enumerate(threads, start=1):
+            title = thread.title or "[dim]No question[/dim]"
+            table.add_row(str(ix), title, str(thread.message_count), self._format_time(thread.updated_at))
+        self.console.print(table)
+
+    def _show_message(self, message):
+        if isinstance(message, HumanMessage):
+            self.console.print(Panel(
+                Text(str(message.content), justify="full"), title="[yellow]You[/yellow]", border_style="yellow",
+                expand=False
+            ))
+        elif isinstance(message, AIMessage) and not message.tool_calls:
+            self.console.print(Panel(
+                Text(str(message.content), justify="full"), title="[bold cyan]Agent[/bold cyan]",
+                border_style="blue", expand=False
+            ))
+        else:
+            for parsed in parse_message(message):
+                content = parsed.content if len(parsed.content) <= 300 else parsed.content[:300] + "..."
+                line = Text.from_markup(f"[bold green]{parsed.message_type.name}:[/bold green] ")
+                line.append(Text(content, style="dim white"))
+                self.console.print(line)
+
+    async def _open_thread(self, thread: ThreadSummary) -> bool:
+        """Pages through a thread's messages. Returns whether the thread was resumed."""
+        offset = 0
+        while True:
+            self.console.clear()
+            self.console.print(Panel(thread.title or thread.thread_id, title="Thread", border_style="magenta"))
+            for message in self.history.get_thread_messages(thread.thread_id, offset, self.page_size):
+                self._show_message(message)
+
+            end = min(offset + self.page_size, thread.message_count)
+            self.console.print(f"\n[dim]Messages {offset + 1}-{end} of {thread.message_count}[/dim]")
+            choices = ["r", ""]
+            if end < thread.message_count:
+                choices.append("n")
+            if offset > 0:
+                choices.append("p")
+            choice = Prompt.ask(
+                "[bold][n]ext, [p]revious, [r]esume the chat or Enter to go back[/bold]",
+                choices=choices, show_choices=False, default=""
+            )
+            if choice == "n":
+                offset += self.page_size
+            elif choice == "p":
+                offset = max(offset - self.page_size, 0)
+            elif choice == "r":
+                await ChatSession(self.console, self.stream, thread_id=thread.thread_id).run()
+                return True
+            else:
+                return False
+
+    async def run(self):
+        page = 0
+        while True:
+            self.console.clear()
+            total = self.history.count_threads()
+            if not total:
+                self.console.print(Panel("[bold yellow]No chats yet.[/bold yellow]", title="Chat History",
+                                         border_style="red"))
+                Prompt.ask("\n[bold]Press Enter to return to the menu[/bold]")
+                return
+
+            pages = (total + self.page_size - 1) // self.page_size
+            page = min(page, pages - 1)
+            threads = self.history.list_threads(self.page_size, page * self.page_size)
+            self._show_threads(threads, page, pages)
+
+            choices = [str(ix) for ix in range(1, len(threads) + 1)] + [""]
+            if page + 1 < pages:
+                choices.append("n")
+            if page > 0:
+                choices.append("p")
+            choice = Prompt.ask(
+                "[bold]Open a chat by its #, [n]ext, [p]revious or Enter to return to the menu[/bold]",
+                choices=choices, show_choices=False, default=""
+            )
+            if choice == "n":
+                page += 1
+            elif choice == "p":
+                page -= 1
+            elif choice:
+                if await self._open_thread(threads[int(choice) - 1]):
+                    # The resumed thread moved to the top of the list
+                    page = 0
+            else:
+                return
@@ -1,17 +1,28 @@
+import asyncio
+import signal
+import uuid
+from contextlib import aclosing, contextmanager
 from typing import Callable
 
-from rich.console import Console
+from rich.console import Console, Group
+from rich.live import Live
 from rich.panel import Panel
 from rich.prompt import Prompt
+from rich.spinner import Spinner
+from rich.table import Table
 from rich.text import Text
 
-from src.stream.parser import MessageType
+from src.stream.parser import MessageType, ParserMessage, StreamMetrics
 
 
 class ChatSession:
-    def __init__(self, console: Console, stream: Callable):
+    def __init__(self, console: Console, stream: Callable, thread_id: str | None = None):
+        """
+        :param thread_id: the thread to continue, a new thread is started when not given
+        """
         self.console = console
         self.stream = stream
+        self.thread_id = thread_id or f"thread-{uuid.uuid4()}"
 
     def _get_user_massage(self):
         """
@@ -37,24 +48,121 @@ class ChatSession:
         )
 
     def _handle_progress(self, title: str, content: str):
-        self.console.status(f"[bold green]{title}...[/bold green]")
         message = Text.from_markup(f"[bold green]{title}:[/bold green] ")
         message.append(Text(content, style="dim white"))
         self.console.log(message)
 
+    @staticmethod
+    def _live_view(status: str, message_type: MessageType | None, partial: str):
+        """The spinner with the message currently being generated underneath it."""
+        spinner = Spinner("dots", text=Text.from_markup(f"[bold green]{status}...[/bold green]"))
+        if not partial:
+            return spinner
+        if message_type == MessageType.FINAL_ANSWER:
+            panel = Panel(Text(partial, justify="full"), title="[bold cyan]Agent[/bold cyan]", border_style="blue",
+                          expand=False)
+        else:
+            panel = Panel(Text(partial, style="dim white"), title=f"[bold green]{message_type.name}[/bold green]",
+                          border_style="green", expand=False)
+        return Group(spinner, panel)
+
+    def _show_metrics(self, metrics: StreamMetrics):
+        if metrics.cached:
+            self.console.print(f"[dim]Answered from the answer cache in {metrics.total_time:.2f}s, "
+                               f"about {metrics.saved_time:.1f}s faster than the original run[/dim]")
+            return
+        first = metrics.time_to_first_token or metrics.time_to_first_message
+        if first is None or metrics.total_time is None:
+            return
+        self.console.print(f"[dim]First output after {first:.2f}s, answered in {metrics.total_time:.2f}s[/dim]")
+        if metrics.trace is not None and metrics.trace.spans:
+            self._show_breakdown(metrics)
+
+    def _show_breakdown(self, metrics: StreamMetrics):
+        """Where the time of the answer went, per model, tool and store operation, slowest first."""
+        table = Table(title="Time breakdown", title_style="dim", style="dim", header_style="dim bold")
+        table.add_column("Step")
+        table.add_column("Calls", justify="right")
+        table.add_column("Time", justify="right")
+        table.add_column("Share", justify="right")
+        table.add_column("Tokens in/out", justify="right")
+        table.add_column("Errors", justify="right")
+        summary = sorted(metrics.trace.summary().items(), key=lambda item: item[1]["duration"], reverse=True)
+        for name, entry in summary:
+            tokens = f"{entry['input_tokens']:.0f}/{entry['output_tokens']:.0f}" if name.startswith("llm:") else ""
+            table.add_row(
+                name, f"{entry['count']:.0f}", f"{entry['duration']:.2f}s",
+                f"{entry['duration'] / metrics.total_time:.0%}" if metrics.total_time else "",
+                tokens, f"{entry['errors']:.0f}" if entry["errors"] else ""
+            )
+        self.console.print(table)
+
+    @staticmethod
+    @contextmanager
+    def _ctrl_c_cancels_task():
+        """
+        Ctrl-C cancels the current task instead of quitting the app, yields a list that holds True once it did.
+        """
+        task, loop, interrupted = asyncio.current_task(), asyncio.get_running_loop(), []
+        previous = signal.getsignal(signal.SIGINT)
+
+        def cancel():
+            interrupted.append(True)
+            task.cancel()
+        try:
+            loop.add_signal_handler(signal.SIGINT, cancel)
+        except (NotImplementedError, RuntimeError):
+            # Not on Windows or outside the main thread, Ctrl-C quits as before
+            yield interrupted
+            return
+        try:
+            yield interrupted
+        finally:
+            loop.remove_signal_handler(signal.SIGINT)
+            signal.signal(signal.SIGINT, previous)
+
     async def _handle_single_prompt_cycle(self):
         question = self._get_user_massage()
         if not question:
             return False  # Signal to stop chat
 
-        async for message in self.stream(question):
-            if message.message_type in MessageType.in_progress_types():
-                self._handle_progress(message.message_type.name, message.content)
-            elif message.message_type == MessageType.FINAL_ANSWER:
-                self._send_answer(message.content)
-                break
-            else:
-                self.console.print("[bold red]Sorry, something went wrong![/red]")
+        metrics = StreamMetrics()
+        answer: ParserMessage | None = None
+        partial_type, partial = None, ""
+        # Transient, the live view is replaced by the complete messages once they arrive
+        with Live(self._live_view("Thinking", None, ""), console=self.console, transient=True,
+                  refresh_per_second=15) as live, self._ctrl_c_cancels_task() as interrupted:
+            try:
+                # Closed right away on the final answer, so the run's trace is complete and written by then.
+                # Closing it early stops the run, cancelling its model and tool calls.
+                async with aclosing(self.stream(question, thread_id=self.thread_id, metrics=metrics)) as stream:
+                    async for message in stream:
+                        if message.delta:
+                            if message.message_type != partial_type:
+                                partial_type, partial = message.message_type, ""
+                            partial += message.content
+                            status = "Answering" if partial_type == MessageType.FINAL_ANSWER else "Thinking"
+                            live.update(self._live_view(status, partial_type, partial))
+                        elif message.message_type in MessageType.in_progress_types():
+                            partial_type, partial = None, ""
+                            self._handle_progress(message.message_type.name, message.content)
+                            status = "Acting" if message.message_type == MessageType.ACTION else "Thinking"
+                            live.update(self._live_view(status, None, ""))
+                        elif message.message_type == MessageType.FINAL_ANSWER:
+                            answer = message
+                            break
+                        else:
+                            self.console.print("[bold red]Sorry, something went wrong![/red]")
+            except asyncio.CancelledError:
+                if not interrupted:
+                    raise
+                asyncio.current_task().uncancel()
+
+        if interrupted:
+            self.console.print("[dim]Stopped, ask another question or type exit.[/dim]")
+        elif answer is not None:
+            self._send_answer(answer.content)
+            self._show_metrics(metrics)
         return True  # Signal to continue
 
     async def run(self):
@@ -1,5 +1,5 @@
 import os
-from typing import Callable
+from typing import TYPE_CHECKING, Callable
 
 from rich.console import Console
 from rich.panel import Panel
@@ -8,16 +8,23 @@ from rich.prompt import Prompt
 from src.cli.chat_session import ChatSession
 from src.cli.menu import Menu
 
+if TYPE_CHECKING:
+    from src.agent.checkpointer import SQLiteDeltaSaver
+
 
 class ConsoleApp:
     """
     An interactive CLI application for an AI agent, structured within a class.
     """
 
-    def __init__(self, stream: Callable):
-        """Initializes the console and the AI agent."""
+    def __init__(self, stream: Callable, history: Callable[[], "SQLiteDeltaSaver"] | None = None):
+        """
+        Initializes the console and the AI agent.
+        :param history: returns the checkpointer holding past chats, only called once the history is opened
+        """
         self.console = Console()
         self.stream = stream
+        self.history = history
         self.menu = Menu(self.console)
 
     def _clear_screen(self):
@@ -25,12 +32,17 @@ class ConsoleApp:
         os.system('cls' if os.name == 'nt' else 'clear')
 
     async def show_chat_history(self):
-        """Placeholder for showing chat history."""
-        self._clear_screen()
-        self.console.print(
-            Panel("[bold yellow]Chat history feature is not yet implemented.[/bold yellow]", title="Coming Soon",
-                  border_style="red"))
-        Prompt.ask("\n[bold]Press Enter to return to the menu[/bold]")
+        """Lists past chats, which can be read page by page and resumed."""
+        if self.history is None:
+            self._clear_screen()
+            self.console.print(
+                Panel("[bold yellow]Chat history is not persisted for this agent.[/bold yellow]",
+                      title="Chat History", border_style="red"))
+            Prompt.ask("\n[bold]Press Enter to return to the menu[/bold]")
+            return
+        # Imported here, the checkpointer it browses is slow to import and not needed for the menu
+        from src.cli.chat_history import ChatHistory
+        await ChatHistory(self.console, self.history(), self.stream).run()
 
     async def run(self):
         """The main entry point to run the interactive CLI."""
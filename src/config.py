@@ -1,17 +1,117 @@
 """Configuration for the AI agent."""
 import uuid
-from pydantic import Field
+from typing import Literal
+from pydantic import BaseModel, Field
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
 load_dotenv()  # loads API keys
 
 
+class StorePolicy(BaseModel):
+    """How the memories of a namespace are kept, see `src/agent/store_maintenance.py`."""
+    # Seconds after its last write or read an item is removed, None keeps it
+    ttl: float | None = None
+    # Items kept at most, the least recently ("lru") or least often ("lfu") read are evicted first
+    max_items: int | None = None
+    eviction: Literal["lru", "lfu"] = "lru"
+    # Similarity above which a put updates the existing memory instead of adding another one
+    dedup_threshold: float | None = None
+    # Similarity above which the background compaction merges related memories into one
+    merge_threshold: float | None = None
+
+
 class AgentSettings(BaseSettings):
     provider: str = "google_genai"
     intelligence_model: str = "gemini-2.5-pro"
+    # Model of the tool-selection turns between planning and the final answer, None runs every turn on
+    # intelligence_model. Turns are escalated to intelligence_model after a tool error or this many steps.
+    fast_model: str | None = "gemini-2.5-flash"
+    escalate_after_steps: int = 6
+    escalate_on_tool_error: bool = True
     embedding_model: str = "models/text-embedding-004"
+    embedding_dims: int = 768
+    embedding_cache_size: int = 50_000
+    store_path: str = ".agent_memory"
+    # "ivf" searches large namespaces approximately, "exact" scores every vector
+    store_vector_index: str = "ivf"
+    store_index_nprobe: int = 32
+    store_index_min_size: int = 5000
+    # Policies by namespace prefix, e.g. "user_id.memories", the longest matching prefix applies. Deduplication
+    # and merging rewrite memories, so they are only done in the namespaces whose policy sets their thresholds.
+    store_policies: dict[str, StorePolicy] = {
+        "": StorePolicy(),
+        "answer_cache": StorePolicy(ttl=7 * 86400.0, max_items=10_000, eviction="lfu"),
+    }
+    store_maintenance_interval: float = 300.0
     temperature: float = 0.0
+    http_max_connections: int = 100
+    http_max_connections_per_host: int = 8
+    http_timeout: float = 10.0
+    # Base URL of the Tavily search API, its key is read from TAVILY_API_KEY
+    tavily_api_url: str = "https://api.tavily.com"
+    web_page_max_bytes: int = 2_000_000
+    web_page_parse_workers: int = 2
+    # Top results of each search_web call read ahead in the background for read_web_page, off (0) by default
+    prefetch_top_k: int = 0
+    prefetch_concurrency: int = 4
+    prefetch_ttl: float = 120.0
+    prefetch_max_bytes: int = 20_000_000
+    tool_cache_path: str = ".agent_memory/tool_cache.sqlite"
+    tool_cache_ttls: dict[str, float] = {"read_web_page": 3600.0, "search_web": 900.0, "search_wikipedia": 86400.0}
+    # Queries or URLs one call of search_web_many, search_wikipedia_many or read_web_pages runs, how many of
+    # them at a time, and the seconds each may take
+    multi_tool_max_items: int = 8
+    multi_tool_concurrency: int = 4
+    multi_tool_item_timeout: float = 20.0
+    # Compiled expressions the calculate tool keeps, the rows of a list result it shows, and the length of the
+    # longest list or range it accepts
+    calculator_cache_size: int = 512
+    calculator_max_rows: int = 100
+    calculator_max_values: int = 100_000
+    # Seconds a call of each tool may take. The multi tools get the time all their batches of items may take,
+    # multi_tool_item_timeout * ceil(multi_tool_max_items / multi_tool_concurrency), plus a margin.
+    tool_timeouts: dict[str, float] = {"read_web_page": 20.0, "search_web": 15.0, "search_wikipedia": 15.0}
+    tool_default_timeout: float = 30.0
+    tool_concurrency: dict[str, int] = {"read_web_page": 4}
+    tool_default_concurrency: int = 8
+    # Limits of one question, see `src/agent/budget.py`. As the timeout nears, or once the steps or tool calls
+    # are used up, the agent stops calling tools and writes the final answer from what it has found so far.
+    question_timeout: float | None = 180.0
+    question_max_steps: int | None = 10
+    question_max_tool_calls: int | None = 30
+    # Seconds of the timeout kept for the final answer, at most a quarter of the timeout
+    question_answer_reserve: float = 20.0
+    # Graph steps of one question, every ReAct step takes two (the model's turn and its tool calls)
+    recursion_limit: int = 25
+    observation_max_tokens: int = 2000
+    # Budget of all observations of one question, earlier questions of the thread don't count
+    thread_observation_max_tokens: int = 12000
+    observation_chunk_tokens: int = 250
+    checkpoint_path: str = ".agent_memory/checkpoints.sqlite"
+    checkpoint_retention: int = 20
+    checkpoint_compaction_interval: float = 60.0
+    answer_cache_enabled: bool = True
+    # Similarity an earlier question needs for its answer to be reused, None only reuses the same question.
+    # Templated and time-sensitive questions score high while needing other answers, keep it at 0.97 or above.
+    answer_cache_threshold: float | None = None
+    answer_cache_ttl: float | None = 7 * 86400.0
+    batch_concurrency: int = 8
+    batch_max_retries: int = 3
+    batch_retry_backoff: float = 2.0
+    server_host: str = "127.0.0.1"
+    server_port: int = 8080
+    server_max_active_runs: int = 16
+    server_max_queued_runs: int = 64
+    server_queue_timeout: float = 30.0
+    # Questions per minute of one session once it has used up its burst
+    server_session_rate: float = 10.0
+    server_session_burst: int = 3
+    # Bearer tokens of the server's clients, each a session of its own. Requests without one of them are a
+    # session per peer address, e.g. SERVER_API_TOKENS='["token-a", "token-b"]'
+    server_api_tokens: list[str] = []
+    # JSONL file every question's trace is appended to, not written when None
+    trace_path: str | None = None
     thread_id: str = Field(default_factory=lambda: f"thread-{uuid.uuid4()}")
 
 
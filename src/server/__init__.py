@@ -0,0 +1 @@
+from src.server.app import AgentServer  # noqa
@@ -0,0 +1,256 @@
+import asyncio
+import hashlib
+import json
+import time
+import uuid
+from contextlib import aclosing, asynccontextmanager
+from typing import TYPE_CHECKING, AsyncIterator, Iterable
+
+from pydantic import BaseModel, ValidationError
+
+from src.stream.parser import ParserMessage, StreamMetrics, console_agent_stream_wrapper
+
+if TYPE_CHECKING:
+    from aiohttp import web
+
+
+class ChatRequest(BaseModel):
+    question: str
+    # The conversation to continue, one the same session started, a new one is started when not given.
+    # Thread ids start with their session's id, so the server can tell who started one without keeping track.
+    thread_id: str | None = None
+
+
+class Rejected(Exception):
+    """A question the server won't run now, with the HTTP status and the seconds after which to retry."""
+
+    def __init__(self, status: int, reason: str, retry_after: float | None = None):
+        super().__init__(reason)
+        self.status = status
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Per-key rate limiter, each key may ask `burst` questions at once and `rate` per second after that."""
+
+    def __init__(self, rate: float, burst: int, max_keys: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def take(self, key: str) -> float:
+        """Takes a token of the key, returns 0 or the seconds until the key has one again."""
+        now = time.monotonic()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            return (1 - tokens) / self.rate
+        if key not in self._buckets and len(self._buckets) >= self.max_keys:
+            # Forget the buckets that have refilled, they are the same as new ones
+            self._buckets = {k: (t, u) for k, (t, u) in self._buckets.items()
+                             if t + (now - u) * self.rate < self.burst}
+        self._buckets[key] = (tokens - 1, now)
+        return 0.0
+
+
+def _token_id(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()[:32]
+
+
+def request_session(request: "web.Request", token_ids: frozenset[str]) -> str:
+    """
+    Who is asking, derived by the server and never taken from the request body: the bearer of the
+    Authorization header if it is one of the server's tokens, else the peer address. Made up tokens don't
+    make new sessions, they would get around the session's rate limit.
+    """
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    if scheme.lower() == "bearer" and _token_id(token.strip()) in token_ids:
+        return f"token-{_token_id(token.strip())}"
+    return f"peer-{request.remote}"
+
+
+def _event(parsed: ParserMessage) -> dict:
+    return {"type": parsed.message_type.name, "content": parsed.content, "delta": parsed.delta}
+
+
+class AgentServer:
+    """
+    Serves many concurrent conversations from one agent, so they share its compiled graph, model clients,
+    store and HTTP pool, each question running in its own thread_id.
+
+    Questions are streamed back as the same messages the console shows, as NDJSON over `POST /chat` or as
+    JSON messages over the `/ws` WebSocket. At most `max_active_runs` questions run at once, up to
+    `max_queued_runs` more wait for a slot for `queue_timeout` seconds, and any beyond are turned away
+    right away. Each session, see `request_session`, may ask `session_burst` questions at once and
+    `session_rate` per minute, and may only continue the threads it started. Clients with one of the
+    `api_tokens` are sessions of their own, the others a session per address.
+    """
+
+    def __init__(self, agent, *, max_active_runs: int = 16, max_queued_runs: int = 64, queue_timeout: float = 30.0,
+                 session_rate: float = 10.0, session_burst: int = 3, api_tokens: Iterable[str] = (),
+                 trace_path: str | None = None):
+        """
+        :param agent: the agent, or a LazyAgent still being built
+        :param session_rate: questions per minute a session may ask once its burst is used up
+        """
+        self.stream = console_agent_stream_wrapper(agent, trace_path=trace_path)
+        self.max_active_runs = max_active_runs
+        self.max_queued_runs = max_queued_runs
+        self.queue_timeout = queue_timeout
+        self.limits = TokenBucket(session_rate / 60, session_burst)
+        # Only hashes of the tokens are kept, the sessions are named after them
+        self.token_ids = frozenset(_token_id(token) for token in api_tokens)
+        self._slots = asyncio.Semaphore(max_active_runs)
+        self._active_threads: set[str] = set()
+        self.active = 0
+        self.queued = 0
+        self.served = 0
+        self.failed = 0
+        self.rejected: dict[int, int] = {}
+
+    @property
+    def stats(self) -> dict:
+        return {"active": self.active, "queued": self.queued, "served": self.served, "failed": self.failed,
+                "rejected": dict(self.rejected)}
+
+    @asynccontextmanager
+    async def admit(self, request: ChatRequest, session: str) -> AsyncIterator[str]:
+        """
+        Waits for a slot to run the question, yielding its thread_id. Raises Rejected when the thread isn't
+        one the session started, the thread is already answering a question, the server is full or the
+        session is over its rate. Only questions let in take from the session's rate.
+        """
+        thread_id = request.thread_id or f"{session}/{uuid.uuid4()}"
+        try:
+            if not thread_id.startswith(f"{session}/"):
+                raise Rejected(403, "The thread belongs to another session, leave thread_id out to start a new one")
+            if thread_id in self._active_threads:
+                raise Rejected(409, "The thread is still answering a question")
+            if self.active + self.queued >= self.max_active_runs + self.max_queued_runs:
+                raise Rejected(503, "The server is full", 1.0)
+            retry_after = self.limits.take(session)
+            if retry_after:
+                raise Rejected(429, "Too many questions in this session", retry_after)
+        except Rejected as e:
+            self.rejected[e.status] = self.rejected.get(e.status, 0) + 1
+            raise
+
+        self._active_threads.add(thread_id)
+        self.queued += 1
+        try:
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected[503] = self.rejected.get(503, 0) + 1
+                raise Rejected(503, "No slot became free in time", 1.0)
+            finally:
+                self.queued -= 1
+            self.active += 1
+            try:
+                yield thread_id
+            finally:
+                self.active -= 1
+                self._slots.release()
+        finally:
+            self._active_threads.discard(thread_id)
+
+    async def events(self, request: ChatRequest, session: str) -> AsyncIterator[dict]:
+        """The question's messages as events, ending with a `DONE` event holding its thread and timings."""
+        async with self.admit(request, session) as thread_id:
+            metrics = StreamMetrics()
+            try:
+                async with aclosing(self.stream(request.question, thread_id=thread_id, metrics=metrics)) as messages:
+                    async for parsed in messages:
+                        yield _event(parsed)
+            except Exception as e:
+                self.failed += 1
+                yield {"type": "ERROR", "content": f"{type(e).__name__}: {e}"}
+                return
+            self.served += 1
+            yield {"type": "DONE", "thread_id": thread_id, "cached": metrics.cached,
+                   "time_to_first_token": metrics.time_to_first_token, "total_time": metrics.total_time}
+
+    # HTTP
+
+    @staticmethod
+    def _rejection(e: Rejected) -> "web.Response":
+        from aiohttp import web
+
+        headers = {"Retry-After": str(max(1, round(e.retry_after)))} if e.retry_after else None
+        return web.json_response({"error": e.reason}, status=e.status, headers=headers)
+
+    @staticmethod
+    async def _parse(payload) -> ChatRequest:
+        try:
+            return ChatRequest.model_validate(payload)
+        except ValidationError as e:
+            raise Rejected(400, str(e))
+
+    async def chat(self, request: "web.Request") -> "web.StreamResponse":
+        from aiohttp import web
+
+        try:
+            chat_request = await self._parse(await request.json())
+        except (Rejected, json.JSONDecodeError) as e:
+            return web.json_response({"error": str(e)}, status=400)
+
+        async with aclosing(self.events(chat_request, request_session(request, self.token_ids))) as stream:
+            # The first event is only produced once the question is admitted, so a rejection is still a status
+            try:
+                first = await anext(stream)
+            except Rejected as e:
+                return self._rejection(e)
+            response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+            await response.prepare(request)
+            await response.write(json.dumps(first).encode() + b"\n")
+            async for event in stream:
+                await response.write(json.dumps(event).encode() + b"\n")
+            await response.write_eof()
+            return response
+
+    async def websocket(self, request: "web.Request") -> "web.WebSocketResponse":
+        """Answers every question sent over the socket in turn, rejections are sent as `REJECTED` events."""
+        from aiohttp import WSMsgType, web
+
+        session = request_session(request, self.token_ids)
+        socket = web.WebSocketResponse(heartbeat=30.0)
+        await socket.prepare(request)
+        async for message in socket:
+            if message.type != WSMsgType.TEXT:
+                continue
+            try:
+                async with aclosing(self.events(await self._parse(json.loads(message.data)), session)) as stream:
+                    async for event in stream:
+                        await socket.send_json(event)
+            except Rejected as e:
+                await socket.send_json({"type": "REJECTED", "status": e.status, "content": e.reason,
+                                        "retry_after": e.retry_after})
+            except json.JSONDecodeError as e:
+                await socket.send_json({"type": "REJECTED", "status": 400, "content": str(e)})
+        return socket
+
+    async def health(self, request: "web.Request") -> "web.Response":
+        from aiohttp import web
+
+        return web.json_response(self.stats)
+
+    def app(self) -> "web.Application":
+        from aiohttp import web
+
+        async def close_pools(_):
+            from src.agent.tools.http_pool import close_http_pool
+            from src.agent.tools.web_reader import close_parse_pool
+            await close_http_pool()
+            close_parse_pool()
+
+        application = web.Application()
+        application.on_cleanup.append(close_pools)
+        application.add_routes([
+            web.post("/chat", self.chat),
+            web.get("/ws", self.websocket),
+            web.get("/health", self.health),
+        ])
+        return application
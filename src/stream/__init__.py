@@ -1 +1 @@
-from src.stream.parser import console_agent_stream_wrapper  # noqa
+from src.stream.parser import console_agent_stream_wrapper, StreamMetrics  # noqa
@@ -1,9 +1,18 @@
+import asyncio
+import contextvars
+import time
 from enum import Enum, auto
 from typing import AsyncGenerator, Callable
 
-from langchain_core.messages import HumanMessage, BaseMessage, AIMessage, ToolMessage
+from langchain_core.messages import HumanMessage, BaseMessage, AIMessage, AIMessageChunk, ToolMessage
+from langchain_core.utils.json import parse_partial_json
 from pydantic import BaseModel
 
+from src.agent.answer_cache import CachedAnswer
+from src.agent.budget import RunBudget
+from src.agent.lazy import LazyAgent
+from src.agent.tracing import Span, Trace, TracingCallbackHandler, current_trace
+
 
 class Message(BaseModel):
     messages: list[dict[str, str]]
@@ -25,6 +34,23 @@ class MessageType(Enum):
 class ParserMessage(BaseModel):
     message_type: MessageType
     content: str
+    # A delta is a piece of a message still being generated, the complete message follows once it is done
+    delta: bool = False
+    # Spans of the trace that ended since the previous message, empty for deltas
+    spans: list[Span] = []
+
+
+class StreamMetrics(BaseModel):
+    """Timings of one streamed agent run, in seconds from the start of the run."""
+    time_to_first_token: float | None = None
+    time_to_first_message: float | None = None
+    total_time: float | None = None
+    chunks: int = 0
+    # Set when the answer came from the answer cache instead of a run of the agent
+    cached: bool = False
+    saved_time: float | None = None
+    # Every span of the run, for a breakdown of where the time went
+    trace: Trace | None = None
 
 
 def parse_message(message: BaseMessage) -> list[ParserMessage]:
@@ -50,21 +76,192 @@ def parse_message(message: BaseMessage) -> list[ParserMessage]:
     return parsed_messages
 
 
-def console_agent_stream_wrapper(agent) -> Callable[[str], AsyncGenerator[ParserMessage, None]]:
-    async def wrapped(input_message: str):
+def _chunk_text(chunk: AIMessageChunk) -> str:
+    if isinstance(chunk.content, str):
+        return chunk.content
+    return "".join(part if isinstance(part, str) else part.get("text", "") for part in chunk.content)
+
+
+class _FinalAnswerDeltas:
+    """Turns the streamed JSON of the structured response into deltas of its final_answer field."""
+
+    def __init__(self):
+        self.raw = ""
+        self.emitted = ""
+
+    def feed(self, chunk: AIMessageChunk) -> str:
+        # Function calling streams the JSON as tool call arguments, json mode as the content
+        self.raw += "".join(c.get("args") or "" for c in chunk.tool_call_chunks) or _chunk_text(chunk)
+        try:
+            answer = (parse_partial_json(self.raw) or {}).get("final_answer")
+        except ValueError:
+            return ""
+        if not isinstance(answer, str) or not answer.startswith(self.emitted):
+            return ""
+        delta, self.emitted = answer[len(self.emitted):], answer
+        return delta
+
+
+async def _cached_answer(agent, input_message: str, config: dict | None) -> tuple[CachedAnswer | None, bool]:
+    """
+    Looks the question up in the agent's answer cache when it starts a thread. Returns the cached answer,
+    if any, and whether the run's answer should be recorded.
+    """
+    # Imported here, it pulls in langsmith which slows down the start of the CLI
+    from langchain_core.runnables.config import ensure_config, merge_configs
+
+    answer_cache = getattr(agent, "answer_cache", None)
+    if answer_cache is None:
+        return None, False
+    thread_config = ensure_config(merge_configs(getattr(agent, "config", None), config))
+    if (await agent.aget_state(thread_config)).values.get("messages"):
+        return None, False
+
+    hit = await answer_cache.lookup(input_message)
+    if hit is None:
+        return None, True
+    # The thread gets the question and answer as if the agent had answered, so follow-ups have the context
+    await agent.aupdate_state(
+        thread_config, {"messages": [HumanMessage(input_message), AIMessage(hit.answer)]},
+        as_node="generate_structured_response"
+    )
+    return hit, False
+
+
+async def _close_pending_tool_calls(agent, config: dict | None):
+    """
+    Answers the tool calls a stopped run left without results with error Observations, models refuse a
+    thread with unanswered tool calls, so the thread can still be continued.
+    """
+    from langchain_core.runnables.config import ensure_config, merge_configs
+
+    thread_config = ensure_config(merge_configs(getattr(agent, "config", None), config))
+    messages = (await agent.aget_state(thread_config)).values.get("messages") or []
+    answered = {message.tool_call_id for message in messages if isinstance(message, ToolMessage)}
+    last_ai = next((message for message in reversed(messages) if isinstance(message, AIMessage)), None)
+    pending = [call for call in last_ai.tool_calls if call["id"] not in answered] if last_ai else []
+    if pending:
+        await agent.aupdate_state(thread_config, {"messages": [
+            ToolMessage(content=f"Error: {call['name']} was stopped, the question was abandoned.",
+                        name=call["name"], tool_call_id=call["id"], status="error")
+            for call in pending
+        ]}, as_node="tools")
+
+
+def console_agent_stream_wrapper(
+    agent, stream_tokens: bool = True, trace_path: str | None = None
+) -> Callable[..., AsyncGenerator[ParserMessage, None]]:
+    """
+    Wraps the agent into a generator of ParserMessages. With `stream_tokens` the text of Thoughts and the
+    Final Answer is also yielded as deltas while the model generates it, instead of only once a turn is done.
+    Questions found in the agent's answer cache are answered without running the agent.
+
+    Every model call, tool call and store operation of a run is traced, the spans are attached to the
+    messages and the whole trace to the metrics. With `trace_path` each trace is also appended to that
+    JSONL file.
+
+    Each question runs within the agent's `run_budget` unless the run is given its own `budget`. Closing
+    the generator, or cancelling the task consuming it, stops the run and cancels its tool calls.
+    """
+    recording: set[asyncio.Task] = set()
+
+    def traced(parsed: ParserMessage, trace: Trace) -> ParserMessage:
+        if not parsed.delta:
+            parsed.spans = trace.take_new()
+        return parsed
+
+    async def wrapped(input_message: str, thread_id: str | None = None, metrics: StreamMetrics | None = None,
+                      budget: RunBudget | None = None):
         message = Message(messages=[{"role": "user", "content": input_message}])
-        async for step in agent.astream(message, stream_mode="updates"):
-            if "generate_structured_response" in step and "structured_response" in step["generate_structured_response"]:
-                final_answer = step["generate_structured_response"]["structured_response"].final_answer
-                yield ParserMessage(message_type=MessageType.FINAL_ANSWER, content=final_answer)
-                break
-
-            messages = step.get("agent", {}) or step.get("tools", {})
-            if not messages or "messages" not in messages:
-                continue
-
-            response = messages["messages"][-1]
-            response_parsed = parse_message(response)
-            for parsed in response_parsed:
-                yield parsed
+        # Top level keys end up in `configurable` and override the thread the agent was bound to
+        config = {"thread_id": thread_id} if thread_id else {}
+        metrics = metrics if metrics is not None else StreamMetrics()
+        metrics.trace = trace = Trace(question=input_message, thread_id=thread_id)
+        trace_token = current_trace.set(trace)
+        start = time.perf_counter()
+        final_answer = _FinalAnswerDeltas()
+        stream_mode = ["updates", "messages"] if stream_tokens else ["updates"]
+        runnable = await agent.aget() if isinstance(agent, LazyAgent) else agent
+        budget = budget or getattr(runnable, "run_budget", None)
+        started = finished = False
+
+        try:
+            cached, record = await _cached_answer(runnable, input_message, config)
+            if cached is not None:
+                finished = True
+                metrics.cached = True
+                metrics.total_time = metrics.time_to_first_message = time.perf_counter() - start
+                metrics.saved_time = max(cached.latency - metrics.total_time, 0.0)
+                yield traced(ParserMessage(message_type=MessageType.FINAL_ANSWER, content=cached.answer), trace)
+                return
+
+            config = {**config, "callbacks": [TracingCallbackHandler(trace)]}
+            if budget is not None:
+                config["configurable"] = budget.configurable()
+            started = True
+            async for mode, step in runnable.astream(message, config=config, stream_mode=stream_mode):
+                if mode == "messages":
+                    chunk, metadata = step
+                    if not isinstance(chunk, AIMessageChunk):
+                        continue
+                    if metadata.get("langgraph_node") == "agent":
+                        parsed = ParserMessage(message_type=MessageType.THOUGHT, content=_chunk_text(chunk), delta=True)
+                    elif metadata.get("langgraph_node") == "generate_structured_response":
+                        parsed = ParserMessage(
+                            message_type=MessageType.FINAL_ANSWER, content=final_answer.feed(chunk), delta=True
+                        )
+                    else:
+                        continue
+                    if parsed.content:
+                        metrics.chunks += 1
+                        if metrics.time_to_first_token is None:
+                            metrics.time_to_first_token = time.perf_counter() - start
+                        yield parsed
+                    continue
+
+                if metrics.time_to_first_message is None:
+                    metrics.time_to_first_message = time.perf_counter() - start
+                if "generate_structured_response" in step \
+                        and "structured_response" in step["generate_structured_response"]:
+                    answer = step["generate_structured_response"]["structured_response"].final_answer
+                    metrics.total_time = time.perf_counter() - start
+                    finished = True
+                    if record:
+                        # Recording embeds the question, the answer is shown without waiting for it. It
+                        # outlives the run, so it is left out of the trace.
+                        context = contextvars.copy_context()
+                        context.run(current_trace.set, None)
+                        task = asyncio.create_task(
+                            runnable.answer_cache.record(input_message, answer, metrics.total_time),
+                            context=context
+                        )
+                        recording.add(task)
+                        task.add_done_callback(recording.discard)
+                    yield traced(ParserMessage(message_type=MessageType.FINAL_ANSWER, content=answer), trace)
+                    break
+
+                messages = step.get("agent", {}) or step.get("tools", {})
+                if not messages or "messages" not in messages:
+                    continue
+
+                # The tools node returns one ToolMessage per tool call of the turn
+                for response in messages["messages"]:
+                    for parsed in parse_message(response):
+                        yield traced(parsed, trace)
+        finally:
+            if metrics.total_time is None:
+                metrics.total_time = time.perf_counter() - start
+            if started and not finished:
+                try:
+                    await _close_pending_tool_calls(runnable, {k: v for k, v in config.items() if k != "callbacks"})
+                except Exception:
+                    # The thread stays as the run left it, its next question reports the unanswered calls
+                    pass
+            try:
+                current_trace.reset(trace_token)
+            except ValueError:
+                # Closed from another context, e.g. by the event loop's async generator finalizer
+                pass
+            if trace_path:
+                trace.write_jsonl(trace_path)
     return wrapped
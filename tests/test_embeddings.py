@@ -0,0 +1,23 @@
+import asyncio
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.agent.embeddings import CachedEmbeddings
+
+
+def test_cancelled_leader_does_not_block_later_embeddings(tmp_path):
+    embeddings = CachedEmbeddings(DeterministicFakeEmbedding(size=8), "fake", str(tmp_path / "embeddings.sqlite"),
+                                  batch_window=0.05)
+
+    async def run():
+        # The first miss leads the batch, cancel it while it waits for others to join
+        leader = asyncio.create_task(embeddings.aembed_query("first"))
+        follower = asyncio.create_task(embeddings.aembed_query("first"))
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        later = await asyncio.wait_for(embeddings.aembed_query("second"), 1)
+        return await asyncio.wait_for(follower, 1), later
+
+    first, second = asyncio.run(run())
+    assert len(first) == len(second) == 8
+    embeddings.close()
@@ -0,0 +1,25 @@
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from src.agent.store import get_store_with_embeddings
+from src.agent.vector_index import IVFIndex
+
+
+def test_search_with_standard_embeddings_override(tmp_path):
+    store = get_store_with_embeddings("unused", str(tmp_path), dims=16, embeddings=DeterministicFakeEmbedding(size=16))
+    store.put(("memories",), "greeting", {"text": "hello world"})
+    assert [item.key for item in store.search(("memories",), query="hello world")] == ["greeting"]
+    store.close()
+
+
+def test_ivf_index_clusters_namespaces_smaller_than_its_cluster_count(tmp_path):
+    index = IVFIndex(min_size=3)
+    store = get_store_with_embeddings("unused", str(tmp_path), dims=16, embeddings=DeterministicFakeEmbedding(size=16),
+                                      vector_index=index)
+    for i in range(5):
+        store.put(("memories",), f"memory-{i}", {"text": f"memory {i}"})
+    # Searched exactly while the namespace is clustered in the background
+    assert len(store.search(("memories",), query="memory 3")) == 5
+    index.wait_for_builds()
+    assert index.stats["builds"] == 1
+    assert len(store.search(("memories",), query="memory 3")) == 5
+    store.close()